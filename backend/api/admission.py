@@ -0,0 +1,116 @@
+"""
+Queue-time-aware admission control for recommendation requests
+
+Each request's delay is estimated as the time it already spent queued in
+front of the app (from the `X-Request-Start` header set by nginx, Heroku
+and others, honored only with RECOMMENDATION_TRUST_REQUEST_START since
+clients can send it too) plus the backlog in this process: recommendations running
+beyond RECOMMENDATION_MAX_CONCURRENT, times the average service time. When
+that delay exceeds RECOMMENDATION_SHED_QUEUE_MS the request is shed with
+503 and Retry-After instead of joining the pile-up. Otherwise the delay is
+charged against the request's time budget, so late requests fall back to
+cheaper recommendation tiers.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from backend.metrics import registry
+
+RECOMMENDATIONS_SHED = registry.counter(
+    "artapi_recommendations_shed_total", "Recommendation requests rejected by admission control"
+)
+RECOMMENDATIONS_IN_FLIGHT = registry.gauge(
+    "artapi_recommendations_in_flight", "Recommendation requests being computed"
+)
+RECOMMENDATION_QUEUE_DELAY = registry.histogram(
+    "artapi_recommendation_queue_delay_seconds",
+    "Estimated queueing delay of admitted recommendation requests",
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Recommendation service is overloaded; retry later")
+        self.retry_after = retry_after
+
+
+def request_queue_seconds(request, max_seconds=None):
+    """
+    Seconds between the proxy's X-Request-Start stamp and now, at most
+    max_seconds; 0 when the header is absent, malformed or not trusted
+    """
+    if not getattr(settings, "RECOMMENDATION_TRUST_REQUEST_START", False):
+        return 0.0
+    header = request.META.get("HTTP_X_REQUEST_START", "")
+    try:
+        value = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return 0.0
+    if not math.isfinite(value):
+        return 0.0
+    # Proxies stamp seconds, milliseconds or microseconds since the epoch
+    if value > 1e14:
+        value /= 1e6
+    elif value > 1e11:
+        value /= 1e3
+    queued = max(time.time() - value, 0.0)
+    return queued if max_seconds is None else min(queued, max_seconds)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=8, shed_after=2.0):
+        self.max_concurrent = max_concurrent
+        self.shed_after = shed_after
+        self.in_flight = 0
+        self.service_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def backlog_seconds(self):
+        """Expected wait for capacity behind the requests already running"""
+        excess = self.in_flight + 1 - self.max_concurrent
+        return max(excess, 0) / self.max_concurrent * self.service_seconds
+
+    @contextmanager
+    def admit(self, queued_seconds=0.0):
+        """
+        Admit one request or raise Overloaded; yields the estimated delay
+        already spent or still ahead of it
+        """
+        with self._lock:
+            delay = queued_seconds + self.backlog_seconds()
+            if delay > self.shed_after:
+                RECOMMENDATIONS_SHED.inc()
+                raise Overloaded(max(math.ceil(self.backlog_seconds()), 1))
+            self.in_flight += 1
+            RECOMMENDATIONS_IN_FLIGHT.set(self.in_flight)
+        RECOMMENDATION_QUEUE_DELAY.observe(delay)
+
+        started = time.monotonic()
+        try:
+            yield delay
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.in_flight -= 1
+                RECOMMENDATIONS_IN_FLIGHT.set(self.in_flight)
+                self.service_seconds += 0.2 * (elapsed - self.service_seconds)
+
+
+# Global instance
+admission_controller = None
+
+
+def get_admission_controller():
+    """Get or create the process-wide recommendation admission controller"""
+    global admission_controller
+    if admission_controller is None:
+        admission_controller = AdmissionController(
+            max_concurrent=getattr(settings, "RECOMMENDATION_MAX_CONCURRENT", 8),
+            shed_after=getattr(settings, "RECOMMENDATION_SHED_QUEUE_MS", 2000) / 1000,
+        )
+    return admission_controller
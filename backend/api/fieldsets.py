@@ -0,0 +1,50 @@
+"""
+Sparse fieldsets for artwork responses
+
+Artwork endpoints accept `fields=id,title,image_url` (query parameter, or a
+string or list in the request body) and return only those fields of each
+artwork; `id` is always included. Enrichment only computes the requested
+fields, so smaller fieldsets cost less CPU as well as bytes.
+"""
+
+from backend.ml_models.wikiart_api_client import ENRICHED_FIELDS
+
+# Catalog metadata, enrichment and recommendation fields
+ARTWORK_FIELDS = frozenset(
+    ("id", "artist", "genre", "style", "likes")
+    + ENRICHED_FIELDS
+    + ("similarity_score", "user_rating")
+)
+
+
+def parse_fields(value):
+    """
+    Requested artwork fields as a frozenset, or None for all fields;
+    raises ValueError for unknown names
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        names = value.split(",")
+    elif isinstance(value, (list, tuple)):
+        names = [str(name) for name in value]
+    else:
+        raise ValueError("fields must be a comma-separated string or a list")
+
+    names = {name.strip() for name in names} - {""}
+    if not names:
+        return None
+    unknown = names - ARTWORK_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return frozenset(names | {"id"})
+
+
+def includes_likes(fields):
+    """Whether a fieldset carries live like counts"""
+    return fields is None or "likes" in fields
+
+
+def fields_key(fields):
+    """Stable cache key component for a fieldset"""
+    return "all" if fields is None else ",".join(sorted(fields))
@@ -0,0 +1,78 @@
+"""
+HTTP caching helpers for artwork endpoints.
+
+Artwork data only changes when a new model is trained, so responses are keyed
+on the recommender's model version, plus the live like counts of the artworks
+they contain. ETags are strong: the same version, query, counts and renderer
+always produce byte-identical bodies.
+
+Responses carrying like counts (`live=True`) change whenever someone likes
+an artwork, so shared caches keep them for ARTWORK_LIVE_CACHE_S_MAXAGE
+seconds instead of a day; clients revalidate cheaply with If-None-Match.
+"""
+
+import base64
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def build_etag(request, model_version, *parts):
+    """Build a strong ETag from the model version, the query and the renderer"""
+    renderer = getattr(request, "accepted_renderer", None)
+    key_parts = [model_version, getattr(renderer, "format", "")] + list(parts)
+    digest = hashlib.sha1("|".join(str(p) for p in key_parts).encode("utf-8"))
+    return quote_etag(digest.hexdigest()[:32])
+
+
+def etag_matches(request, etag):
+    """Check If-None-Match using the weak comparison required by RFC 9110"""
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+
+    etags = parse_etags(header)
+    if "*" in etags:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in etags}
+
+
+def apply_cache_headers(response, etag, live=False):
+    """Attach ETag and proxy-friendly Cache-Control headers to a response"""
+    response["ETag"] = etag
+    if live:
+        max_age = getattr(settings, "ARTWORK_LIVE_CACHE_MAX_AGE", 10)
+        s_maxage = getattr(settings, "ARTWORK_LIVE_CACHE_S_MAXAGE", 10)
+    else:
+        max_age = getattr(settings, "ARTWORK_CACHE_MAX_AGE", 300)
+        s_maxage = getattr(settings, "ARTWORK_CACHE_S_MAXAGE", 86400)
+    patch_cache_control(response, public=True, max_age=max_age, s_maxage=s_maxage)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def not_modified(etag, live=False):
+    """Empty 304 response carrying the same validators as the full one"""
+    return apply_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag, live)
+
+
+def encode_cursor(after_id):
+    """Encode the last artwork id of a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"after:{after_id}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back to an artwork id, raising ValueError if malformed"""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+    except (UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+    prefix, _, value = decoded.partition(":")
+    if prefix != "after" or not value.lstrip("-").isdigit():
+        raise ValueError("Invalid cursor")
+    return int(value)
@@ -0,0 +1,259 @@
+"""
+On-disk image cache for the artwork image proxy
+
+Originals are fetched once from the origin (pluggable, see
+ARTWORK_IMAGE_ORIGIN_FETCHER) and stored with resized thumbnails in a
+size-bounded LRU directory. Each cached file has a JSON sidecar holding its
+content type and a content-derived ETag.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.http import quote_etag
+from PIL import Image
+
+from backend.metrics import CACHE_REQUESTS
+
+
+class OriginFetchError(Exception):
+    """Raised when an image cannot be fetched from its origin"""
+
+
+class HTTPOriginFetcher:
+    """Fetch original images over HTTP with a pooled session"""
+
+    def __init__(self, timeout=10, max_bytes=20 * 1024 * 1024):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+
+    def fetch(self, artwork_id, url):
+        """Return (content, content_type) for an artwork's image URL"""
+        try:
+            response = self.session.get(url, timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            raise OriginFetchError(f"Origin request failed: {e}")
+
+        with response:
+            if response.status_code != 200:
+                raise OriginFetchError(f"Origin returned {response.status_code}")
+
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("image/"):
+                raise OriginFetchError(f"Origin returned non-image {content_type!r}")
+
+            chunks = []
+            total = 0
+            for chunk in response.iter_content(64 * 1024):
+                total += len(chunk)
+                if total > self.max_bytes:
+                    raise OriginFetchError("Origin image exceeds size limit")
+                chunks.append(chunk)
+
+        return b"".join(chunks), content_type.split(";")[0].strip()
+
+
+class CachedImage:
+    """A file in the image cache plus the validators needed to serve it"""
+
+    def __init__(self, path, content_type, etag, size):
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+        self.size = size
+
+
+class DiskImageCache:
+    """
+    Size-bounded LRU cache of image files
+
+    Recency is tracked in memory and mirrored to file mtimes, so the order
+    survives restarts. Writes go through a temp file and os.replace, so
+    concurrent workers never see partial files. Fetches are serialized per
+    key through a fixed array of striped locks, so lock memory stays
+    bounded however many keys are requested.
+    """
+
+    lock_stripes = 64
+
+    def __init__(self, root, max_bytes, fetcher, thumbnail_sizes=()):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.thumbnail_sizes = set(thumbnail_sizes)
+
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+
+        os.makedirs(self.root, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU index from files already on disk"""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((".json", ".tmp")):
+                    continue
+                stat = os.stat(os.path.join(dirpath, filename))
+                found.append((stat.st_mtime, filename, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _key_lock(self, key):
+        # Keys are SHA-1 hex digests, so any slice of them is uniform
+        return self._key_locks[int(key[:8], 16) % len(self._key_locks)]
+
+    @staticmethod
+    def cache_key(artwork_id, url, size=None):
+        variant = f"thumb{size}" if size else "original"
+        return hashlib.sha1(f"{artwork_id}|{variant}|{url}".encode("utf-8")).hexdigest()
+
+    def _read(self, key):
+        """Return a CachedImage for a key if it is fully present on disk"""
+        path = self._path(key)
+        try:
+            with open(f"{path}.json", "r") as f:
+                info = json.load(f)
+            os.utime(path)  # Record recency for the next scan
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Written by another worker process since our last scan
+                self._entries[key] = info["size"]
+                self._total_bytes += info["size"]
+        return CachedImage(path, info["content_type"], info["etag"], info["size"])
+
+    def _write(self, key, content, content_type):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        etag = quote_etag(hashlib.sha1(content).hexdigest())
+        info = {"content_type": content_type, "etag": etag, "size": len(content)}
+
+        for target, data, mode in (
+            (path, content, "wb"),
+            (f"{path}.json", json.dumps(info), "w"),
+        ):
+            tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+
+        with self._lock:
+            previous = self._entries.pop(key, 0)
+            self._entries[key] = len(content)
+            self._total_bytes += len(content) - previous
+        self._evict()
+
+        return CachedImage(path, content_type, etag, len(content))
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits its budget"""
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+
+            path = self._path(key)
+            for target in (f"{path}.json", path):
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+
+    def _make_thumbnail(self, original, size):
+        with Image.open(original.path) as image:
+            image.thumbnail((size, size))
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=85, optimize=True)
+        return buffer.getvalue()
+
+    def get(self, artwork_id, url, size=None):
+        """
+        Return the cached original or thumbnail, fetching and resizing on
+        first use. Concurrent callers for the same key share one fetch.
+        """
+        if size is not None and size not in self.thumbnail_sizes:
+            raise ValueError(f"Unsupported thumbnail size: {size}")
+
+        key = self.cache_key(artwork_id, url, size)
+        cache_name = "image" if size is None else "thumbnail"
+        cached = self._read(key)
+        if cached is not None:
+            CACHE_REQUESTS.labels(cache_name, "hit").inc()
+            return cached
+        CACHE_REQUESTS.labels(cache_name, "miss").inc()
+
+        if size is None:
+            with self._key_lock(key):
+                cached = self._read(key)
+                if cached is not None:
+                    return cached
+                content, content_type = self.fetcher.fetch(artwork_id, url)
+                return self._write(key, content, content_type)
+
+        # Get the original before taking the thumbnail's lock: stripes are
+        # shared between keys, so nested locking could deadlock. The original
+        # can be evicted before it is read; fetch it again once if so.
+        for _ in range(2):
+            original = self.get(artwork_id, url)
+            with self._key_lock(key):
+                cached = self._read(key)
+                if cached is not None:
+                    return cached
+                try:
+                    thumbnail = self._make_thumbnail(original, size)
+                except FileNotFoundError:
+                    continue
+                except (OSError, Image.DecompressionBombError) as e:
+                    raise OriginFetchError(f"Could not decode origin image: {e}")
+                return self._write(key, thumbnail, "image/jpeg")
+        raise OriginFetchError("Original image was evicted while resizing")
+
+
+# Global instance
+image_cache = None
+
+
+def get_image_cache():
+    """Get or create the image cache configured in settings"""
+    global image_cache
+    if image_cache is None:
+        fetcher_class = import_string(
+            getattr(
+                settings,
+                "ARTWORK_IMAGE_ORIGIN_FETCHER",
+                "backend.api.image_cache.HTTPOriginFetcher",
+            )
+        )
+        image_cache = DiskImageCache(
+            root=getattr(settings, "ARTWORK_IMAGE_CACHE_DIR", settings.BASE_DIR / "image_cache"),
+            max_bytes=getattr(settings, "ARTWORK_IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+            fetcher=fetcher_class(),
+            thumbnail_sizes=getattr(settings, "ARTWORK_THUMBNAIL_SIZES", (128, 256, 512)),
+        )
+    return image_cache
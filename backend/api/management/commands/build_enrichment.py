@@ -0,0 +1,117 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from backend.api.views import ArtworkListView
+from backend.ml_models.enrichment_store import ENRICHMENT_FILENAME, EnrichmentStore
+from backend.ml_models.image_health import IMAGE_HEALTH_FILENAME, ImageHealthChecker
+from backend.ml_models.model_loader import get_recommender
+from backend.ml_models.wikiart_api_client import get_wikiart_client
+
+
+class Command(BaseCommand):
+    help = "Build and persist the WikiArt enrichment store for the current model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Compare artwork list response times with and without the store",
+        )
+        parser.add_argument(
+            "--check-images",
+            action="store_true",
+            help="Health-check image URLs and replace broken ones with a healthy alternative",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=32,
+            help="Concurrent image checks (default: 32)",
+        )
+        parser.add_argument(
+            "--cache-ttl",
+            type=float,
+            default=24,
+            help="Hours before a cached image check is repeated (default: 24)",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=20,
+            help="Requests per benchmark scenario (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        recommender = get_recommender()
+        wikiart_client = get_wikiart_client()
+
+        if recommender.models_path is None:
+            self.stderr.write("No model loaded - train and save your model first")
+            return
+
+        start = time.perf_counter()
+        store = EnrichmentStore.build(
+            recommender.metadata, wikiart_client, recommender.model_version
+        )
+
+        if options["check_images"]:
+            checker = ImageHealthChecker(
+                cache_path=os.path.join(recommender.models_path, IMAGE_HEALTH_FILENAME),
+                ttl=options["cache_ttl"] * 3600,
+                max_workers=options["workers"],
+                headers=wikiart_client.session.headers,
+            )
+            try:
+                replaced = store.apply_image_health(checker)
+            finally:
+                checker.close()
+            self.stdout.write(f"Replaced {replaced} broken image URLs")
+
+        path = os.path.join(recommender.models_path, ENRICHMENT_FILENAME)
+        store.save(path)
+        elapsed = time.perf_counter() - start
+
+        recommender.enrichment_store = store
+        wikiart_client.use_enrichment_store(store)
+        self.stdout.write(
+            f"Built {len(store)} enrichment rows for model "
+            f"{recommender.model_version} in {elapsed:.2f}s -> {path}"
+        )
+
+        if options["benchmark"]:
+            self._benchmark(recommender, wikiart_client, store, options["rounds"])
+
+    def _benchmark(self, recommender, wikiart_client, store, rounds):
+        """Time full list pages (100 artworks) with and without the store"""
+        factory = RequestFactory()
+        view = ArtworkListView.as_view()
+        n_pages = max(len(recommender.metadata) // 100, 1)
+
+        def run_scenario():
+            timings = []
+            for i in range(rounds):
+                request = factory.get("/api/artworks/", {"page": i % n_pages + 1, "page_size": 100})
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+            return timings
+
+        wikiart_client.use_enrichment_store(None)
+        before = run_scenario()
+        wikiart_client.use_enrichment_store(store)
+        after = run_scenario()
+
+        for label, timings in (("computed", before), ("precomputed", after)):
+            self.stdout.write(
+                f"{label:>12}: mean {statistics.mean(timings):.2f} ms, "
+                f"median {statistics.median(timings):.2f} ms, "
+                f"max {max(timings):.2f} ms"
+            )
+        self.stdout.write(
+            f"Speedup: {statistics.mean(before) / statistics.mean(after):.1f}x"
+        )
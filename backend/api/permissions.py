@@ -0,0 +1,21 @@
+"""
+Permission classes for API views
+"""
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+
+
+class MetricsAccess(BasePermission):
+    """
+    Staff users, or scrapers sending `Authorization: Bearer <token>` with
+    the token configured as METRICS_BEARER_TOKEN
+    """
+
+    def has_permission(self, request, view):
+        token = getattr(settings, "METRICS_BEARER_TOKEN", None)
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if token and constant_time_compare(header, f"Bearer {token}"):
+            return True
+        return bool(request.user and request.user.is_staff)
@@ -0,0 +1,41 @@
+"""
+Response renderers for the API
+
+FastJSONRenderer is the default JSON renderer (see REST_FRAMEWORK in
+settings). It uses orjson, which serializes NumPy arrays and scalars
+natively. Views pick a renderer with `renderer_classes`.
+"""
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from backend.timing import phase
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its work as the `serialization` phase"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase("serialization"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONRenderer(TimedJSONRenderer):
+    """orjson-backed JSONRenderer with NumPy support"""
+
+    # Types orjson does not know (lazy strings, Decimal, QuerySet, ...) are
+    # handed to DRF's encoder, so output matches the stdlib renderer
+    _fallback_encoder = encoders.JSONEncoder()
+
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        with phase("serialization"):
+            return orjson.dumps(data, default=self._fallback_encoder.default, option=options)
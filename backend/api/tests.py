@@ -0,0 +1,482 @@
+import atexit
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import brotli
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from backend import profiling, timing
+from backend.metrics import HTTP_REQUESTS
+from backend.profiling import get_profile_store
+from backend.timing import RequestTimer, phase
+from backend.users import like_counters
+from backend.users.models import User
+
+from . import admission, image_cache
+from .admission import AdmissionController, Overloaded, request_queue_seconds
+from .image_cache import DiskImageCache, OriginFetchError
+
+
+def make_png(seed):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (seed % 256, 80, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class StubOriginFetcher:
+    """Stand-in origin that serves a generated PNG and counts fetches"""
+
+    fetches = 0
+    _lock = threading.Lock()
+
+    def fetch(self, artwork_id, url):
+        with self._lock:
+            StubOriginFetcher.fetches += 1
+        return make_png(artwork_id), "image/png"
+
+
+class DiskImageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        StubOriginFetcher.fetches = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_least_recently_used_files_are_evicted(self):
+        # Room for two images, not three
+        budget = 2 * max(len(make_png(artwork_id)) for artwork_id in (1, 2, 3))
+        cache = DiskImageCache(self.root, budget, StubOriginFetcher())
+        cache.get(1, "https://origin/1")
+        cache.get(2, "https://origin/2")
+        cache.get(1, "https://origin/1")  # 1 is now the most recent
+        cache.get(3, "https://origin/3")
+
+        self.assertLessEqual(cache._total_bytes, budget)
+        self.assertIsNotNone(cache._read(DiskImageCache.cache_key(1, "https://origin/1")))
+        self.assertIsNone(cache._read(DiskImageCache.cache_key(2, "https://origin/2")))
+        self.assertIsNotNone(cache._read(DiskImageCache.cache_key(3, "https://origin/3")))
+        self.assertEqual(StubOriginFetcher.fetches, 3)
+
+    def test_lock_count_is_bounded(self):
+        cache = DiskImageCache(self.root, 10**9, StubOriginFetcher(), thumbnail_sizes=(16,))
+        for artwork_id in range(200):
+            cache.get(artwork_id, f"https://origin/{artwork_id}", 16)
+        self.assertEqual(len(cache._key_locks), DiskImageCache.lock_stripes)
+
+    def test_thumbnail_refetches_an_evicted_original(self):
+        cache = DiskImageCache(self.root, 10**9, StubOriginFetcher(), thumbnail_sizes=(16,))
+        make_thumbnail = cache._make_thumbnail
+
+        def evict_then_resize(original, size):
+            # Another request evicts the original between get() and the read
+            for target in (f"{original.path}.json", original.path):
+                if os.path.exists(target):
+                    os.remove(target)
+            cache._make_thumbnail = make_thumbnail
+            return make_thumbnail(original, size)
+
+        cache._make_thumbnail = evict_then_resize
+        thumbnail = cache.get(4, "https://origin/4", 16)
+        self.assertEqual(thumbnail.content_type, "image/jpeg")
+        self.assertEqual(StubOriginFetcher.fetches, 2)
+
+    def test_decompression_bomb_is_an_origin_error(self):
+        cache = DiskImageCache(self.root, 10**9, StubOriginFetcher(), thumbnail_sizes=(16,))
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            with self.assertRaises(OriginFetchError):
+                cache.get(4, "https://origin/4", 16)
+
+    def test_concurrent_requests_share_one_fetch(self):
+        cache = DiskImageCache(self.root, 10**9, StubOriginFetcher())
+        threads = [
+            threading.Thread(target=cache.get, args=(5, "https://origin/5")) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(StubOriginFetcher.fetches, 1)
+
+
+class ArtworkRawImageViewTests(SimpleTestCase):
+    url = "/api/artworks/3/image/raw/"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        StubOriginFetcher.fetches = 0
+        image_cache.image_cache = None
+        self.settings_override = override_settings(
+            ARTWORK_IMAGE_ORIGIN_FETCHER="backend.api.tests.StubOriginFetcher",
+            ARTWORK_IMAGE_CACHE_DIR=self.root,
+            ARTWORK_IMAGE_ACCEL_REDIRECT_PREFIX=None,
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        image_cache.image_cache = None
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_full_conditional_and_range_responses(self):
+        body = make_png(3)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), body)
+        self.assertEqual(response["Content-Type"], "image/png")
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(body)}")
+        self.assertEqual(b"".join(response.streaming_content), body[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), body[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(body)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(body)}")
+
+        # A stale If-Range gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(StubOriginFetcher.fetches, 1)
+
+    def test_thumbnail(self):
+        response = self.client.get(self.url, {"size": 128})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(self.client.get(self.url, {"size": 99}).status_code, 400)
+
+
+@override_settings(METRICS_BEARER_TOKEN="scrape-secret", LIKE_COUNTER_FLUSH_INTERVAL=0)
+class MetricsViewTests(TestCase):
+    url = "/api/metrics"
+
+    def tearDown(self):
+        # The test database is gone by exit time
+        if like_counters.like_counter is not None:
+            atexit.unregister(like_counters.like_counter.stop)
+            like_counters.like_counter = None
+
+    def test_anonymous_requests_are_rejected(self):
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_scraper_token_and_staff_are_allowed(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"artapi_artwork_likes", response.content)
+
+        staff = User.objects.create_user(
+            username="staff", email="staff@example.com", password="staff", is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+    def test_model_stats_are_not_public(self):
+        self.assertIn(self.client.get("/api/model-stats/").status_code, (401, 403))
+        response = self.client.get(
+            "/api/model-stats/", HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("memory_bytes", response.json()["model_stats"])
+
+    def test_tracemalloc_rejects_a_bad_limit(self):
+        staff = User.objects.create_user(
+            username="staff", email="staff@example.com", password="staff", is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get("/api/debug/tracemalloc/", {"limit": "x"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/debug/tracemalloc/", {"limit": "5"})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=10**6)
+class CompressionETagTests(SimpleTestCase):
+    url = "/api/artworks/1/image/"
+
+    def assert_revalidates(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        return etag
+
+    def test_uncompressed_response_validators_match(self):
+        # Below the size threshold: the 200 stays uncompressed
+        etag = self.assert_revalidates(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(self.assert_revalidates(), etag)
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_SIZE=0)
+    def test_compressed_response_validators_match(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assert_revalidates(HTTP_ACCEPT_ENCODING="gzip")
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_SIZE=0)
+    def test_brotli_is_preferred(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(json.loads(brotli.decompress(response.content))["artwork_id"], 1)
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=0)
+class CompressionOptInTests(TestCase):
+    def test_token_responses_are_never_compressed(self):
+        User.objects.create_user(username="zip", email="zip@example.com", password="zip-secret")
+        response = self.client.post(
+            "/api/users/login/",
+            {"username": "zip", "password": "zip-secret"},
+            content_type="application/json",
+            HTTP_ACCEPT_ENCODING="gzip, br",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("token", response.json())
+
+
+class RequestQueueSecondsTests(SimpleTestCase):
+    def queued(self, header, max_seconds=None):
+        request = RequestFactory().get("/", HTTP_X_REQUEST_START=header)
+        return request_queue_seconds(request, max_seconds)
+
+    def test_header_is_ignored_unless_trusted(self):
+        self.assertEqual(self.queued(f"t={time.time() - 5:.3f}"), 0.0)
+
+    @override_settings(RECOMMENDATION_TRUST_REQUEST_START=True)
+    def test_trusted_header_is_parsed_and_clamped(self):
+        now = time.time()
+        self.assertAlmostEqual(self.queued(f"t={int((now - 0.5) * 1000)}"), 0.5, delta=0.1)
+        self.assertAlmostEqual(self.queued(f"{int((now - 0.5) * 1e6)}"), 0.5, delta=0.1)
+        self.assertEqual(self.queued(f"t={now + 60:.3f}"), 0.0)
+        self.assertEqual(self.queued("t=1", max_seconds=1.5), 1.5)
+        for header in ("nan", "t=inf", "-inf", "soon", ""):
+            self.assertEqual(self.queued(header), 0.0)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def test_requests_are_shed_behind_the_backlog(self):
+        controller = AdmissionController(max_concurrent=1, shed_after=0.5)
+        controller.service_seconds = 1.0
+        with controller.admit() as delay:
+            self.assertEqual(delay, 0.0)
+            with self.assertRaises(Overloaded) as raised:
+                with controller.admit():
+                    pass
+            self.assertEqual(raised.exception.retry_after, 1)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_queued_time_counts_towards_the_delay(self):
+        controller = AdmissionController(max_concurrent=4, shed_after=0.5)
+        with controller.admit(0.2) as delay:
+            self.assertEqual(delay, 0.2)
+        with self.assertRaises(Overloaded):
+            with controller.admit(0.6):
+                pass
+
+
+@override_settings(LIKE_COUNTER_FLUSH_INTERVAL=0, RECOMMENDATION_TRUST_REQUEST_START=True)
+class RecommendationAdmissionTests(TestCase):
+    url = "/api/recommendations/"
+
+    def setUp(self):
+        admission.admission_controller = None
+
+    def tearDown(self):
+        admission.admission_controller = None
+        # The test database is gone by exit time
+        if like_counters.like_counter is not None:
+            atexit.unregister(like_counters.like_counter.stop)
+            like_counters.like_counter = None
+
+    def recommend(self, **headers):
+        return self.client.post(
+            self.url, {"artwork_id": 5}, content_type="application/json", **headers
+        )
+
+    def test_malformed_request_start_does_not_force_the_fallback_tier(self):
+        response = self.recommend(HTTP_X_REQUEST_START="nan")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tier"], "full")
+
+    @override_settings(RECOMMENDATION_TRUST_REQUEST_START=False)
+    def test_untrusted_request_start_is_ignored(self):
+        response = self.recommend(HTTP_X_REQUEST_START="t=1")
+        self.assertEqual(response.json()["tier"], "full")
+
+    def test_overloaded_worker_answers_503(self):
+        admission.admission_controller = AdmissionController(max_concurrent=1, shed_after=0.1)
+        admission.admission_controller.in_flight = 1
+        admission.admission_controller.service_seconds = 2.0
+        response = self.recommend()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "2")
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+    def test_unknown_methods_share_one_label(self):
+        for method in ("BREW", "PROPFIND"):
+            self.client.generic(method, "/api/artworks/1/image/")
+
+        methods = {key[1] for key in HTTP_REQUESTS.values}
+        self.assertFalse(methods & {"BREW", "PROPFIND"})
+        self.assertGreaterEqual(HTTP_REQUESTS.values[("artwork-image", "other", "405")], 2)
+
+
+class ServerTimingTests(SimpleTestCase):
+    url = "/api/artworks/1/image/"
+
+    @override_settings(REQUEST_TIMING_ENABLED=True)
+    def test_enabled_timing_reports_phases_and_total(self):
+        response = self.client.get(self.url)
+        entries = dict(entry.split(";dur=") for entry in response["Server-Timing"].split(", "))
+        self.assertIn("model", entries)
+        self.assertGreaterEqual(float(entries["total"]), 0)
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled_timing_adds_no_header(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertIs(phase("model"), phase("scoring"))
+
+    def test_nested_phases_are_charged_to_the_inner_one(self):
+        timer = RequestTimer()
+        token = timing._current_timer.set(timer)
+        try:
+            with phase("outer"):
+                with phase("inner"):
+                    time.sleep(0.05)
+        finally:
+            timing._current_timer.reset(token)
+        self.assertGreaterEqual(timer.phases["inner"], 0.05)
+        self.assertLess(timer.phases["outer"], 0.05)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    url = "/api/artworks/1/image/"
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            PROFILING_ENABLED=True, PROFILING_DIR=self.root, PROFILING_MAX_PROFILES=2
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_profile_header_is_honoured_for_staff_only(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE="cprofile")
+        self.assertFalse(response.has_header("X-Profile-Id"))
+
+        member = User.objects.create_user(username="member", password="member-secret")
+        response = self.client.get(
+            self.url,
+            HTTP_X_PROFILE="cprofile",
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=member).key}",
+        )
+        self.assertFalse(response.has_header("X-Profile-Id"))
+
+        staff = User.objects.create_user(username="staff", password="staff-secret", is_staff=True)
+        response = self.client.get(
+            self.url,
+            HTTP_X_PROFILE="cprofile",
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=staff).key}",
+        )
+        path = get_profile_store().path(response["X-Profile-Id"])
+        self.assertTrue(path.endswith(".prof"))
+        pstats.Stats(path)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.5)
+    def test_sampled_requests_are_profiled_into_a_bounded_ring(self):
+        with patch.object(profiling.random, "random", return_value=0.9):
+            self.assertFalse(self.client.get(self.url).has_header("X-Profile-Id"))
+
+        with patch.object(profiling.random, "random", return_value=0.1):
+            profile_ids = [self.client.get(self.url)["X-Profile-Id"] for _ in range(3)]
+
+        profiles = get_profile_store().list()
+        self.assertEqual([profile["id"] for profile in profiles], profile_ids[:0:-1])
+        self.assertEqual({profile["trigger"] for profile in profiles}, {"sampled"})
+        self.assertEqual({profile["mode"] for profile in profiles}, {"stacks"})
+
+
+@override_settings(LIKE_COUNTER_FLUSH_INTERVAL=0)
+class ArtworkListViewTests(TestCase):
+    url = "/api/artworks/"
+
+    def tearDown(self):
+        # The test database is gone by exit time
+        if like_counters.like_counter is not None:
+            atexit.unregister(like_counters.like_counter.stop)
+            like_counters.like_counter = None
+
+    def test_malformed_pagination_is_rejected(self):
+        for params in ({"page": "x"}, {"page_size": "ten"}, {"page": "1.5"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("must be an integer", response.json()["error"])
+        response = self.client.get("/api/search", {"q": "monet", "page_size": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields_limit_each_artwork(self):
+        response = self.client.get(self.url, {"page_size": 3, "fields": "title,image_url"})
+        self.assertEqual(response.status_code, 200)
+        for artwork in response.json()["artworks"]:
+            self.assertEqual(set(artwork), {"id", "title", "image_url"})
+
+        full = self.client.get(self.url, {"page_size": 3})
+        self.assertNotEqual(full["ETag"], response["ETag"])
+
+        response = self.client.get(self.url, {"fields": "title,bogus"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("bogus", response.json()["error"])
+
+    def test_multi_get_keeps_request_order_and_reports_missing(self):
+        response = self.client.get(self.url, {"ids": "5,999999,0,5", "fields": "title"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([artwork["id"] for artwork in body["artworks"]], [5, 0])
+        self.assertEqual(body["missing"], [999999])
+        self.assertEqual(set(body["artworks"][0]), {"id", "title"})
+
+        response = self.client.post(self.url, {"ids": [0, 5]}, content_type="application/json")
+        self.assertEqual([artwork["id"] for artwork in response.json()["artworks"]], [0, 5])
+
+    @override_settings(ARTWORK_MULTI_GET_MAX_IDS=2)
+    def test_multi_get_rejects_malformed_and_oversized_batches(self):
+        for ids in ("1,x", "1,2,3", ","):
+            response = self.client.get(self.url, {"ids": ids})
+            self.assertEqual(response.status_code, 400, ids)
+
+    def test_pagination_is_clamped(self):
+        response = self.client.get(self.url, {"page": "0", "page_size": "100000"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["page"], 1)
+        self.assertEqual(response.json()["page_size"], 100)
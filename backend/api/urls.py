@@ -3,14 +3,34 @@ from .views import (
     ArtworkListView,
     ArtworkDetailView,
     ArtworkImageView,
+    ArtworkRawImageView,
     RecommendationView,
+    SearchView,
     ModelStatsView,
+    MetricsView,
+    ProfileListView,
+    ProfileDownloadView,
+    TracemallocView,
 )
 
 urlpatterns = [
     path("artworks/", ArtworkListView.as_view(), name="artwork-list"),
     path("artworks/<int:pk>/", ArtworkDetailView.as_view(), name="artwork-detail"),
     path("artworks/<int:pk>/image/", ArtworkImageView.as_view(), name="artwork-image"),
+    path(
+        "artworks/<int:pk>/image/raw/",
+        ArtworkRawImageView.as_view(),
+        name="artwork-image-raw",
+    ),
     path("recommendations/", RecommendationView.as_view(), name="recommendations"),
+    path("search", SearchView.as_view(), name="search"),
     path("model-stats/", ModelStatsView.as_view(), name="model-stats"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("profiles/", ProfileListView.as_view(), name="profile-list"),
+    path(
+        "profiles/<str:profile_id>/",
+        ProfileDownloadView.as_view(),
+        name="profile-download",
+    ),
+    path("debug/tracemalloc/", TracemallocView.as_view(), name="debug-tracemalloc"),
 ]
@@ -1,44 +1,251 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.http import JsonResponse
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from backend.memory import tracemalloc_tracker
+from backend.metrics import PeriodicValue, registry
+from backend.profiling import get_profile_store
+from backend.ml_models.deadlines import Deadline
 from backend.ml_models.model_loader import get_recommender
 from backend.ml_models.wikiart_api_client import get_wikiart_client
+from backend.users.history_logger import get_history_logger
+from backend.users.like_counters import get_like_counter
+from backend.users.models import User
+from .admission import Overloaded, get_admission_controller, request_queue_seconds
+from .fieldsets import fields_key, includes_likes, parse_fields
+from .permissions import MetricsAccess
+from .image_cache import OriginFetchError, get_image_cache
+from .http_cache import (
+    apply_cache_headers,
+    build_etag,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    not_modified,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def enrich_artworks(artworks, fields, like_counter):
+    """Enrich artworks (only `fields`, when given) with live like counts"""
+    enriched = get_wikiart_client().enrich_artworks_batch(artworks, fields)
+    if fields is None or "likes" in fields:
+        like_counter.apply_to(enriched)
+    return enriched
+
+
+def parse_artwork_ids(value, max_ids):
+    """
+    Artwork ids from a comma-separated string or a list, de-duplicated in
+    request order; raises ValueError when malformed, empty or too many
+    """
+    if isinstance(value, str):
+        value = [part for part in value.split(",") if part.strip()]
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("ids must be a comma-separated string or a list")
+    try:
+        artwork_ids = list(dict.fromkeys(int(artwork_id) for artwork_id in value))
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+    if not artwork_ids:
+        raise ValueError("ids is required")
+    if len(artwork_ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per request")
+    return artwork_ids
+
+
+def parse_positive_int(params, name, default, maximum=None):
+    """
+    Integer query parameter clamped to [1, maximum]; raises ValueError when
+    it is not an integer
+    """
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    value = max(value, 1)
+    return value if maximum is None else min(value, maximum)
+
+
+def parse_time_budget(value):
+    """
+    Recommendation time budget in seconds (None for unbounded) from an
+    optional `time_budget_ms`, capped at RECOMMENDATION_TIME_BUDGET_MAX_MS
+    """
+    if value is None:
+        budget_ms = getattr(settings, "RECOMMENDATION_TIME_BUDGET_MS", None)
+        if budget_ms is None:
+            return None
+    else:
+        try:
+            budget_ms = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("time_budget_ms must be a number")
+        if not budget_ms > 0:
+            raise ValueError("time_budget_ms must be positive")
+    max_ms = getattr(settings, "RECOMMENDATION_TIME_BUDGET_MAX_MS", None)
+    if max_ms is not None:
+        budget_ms = min(budget_ms, max_ms)
+    return budget_ms / 1000
 
 
 class ArtworkListView(APIView):
-    """List artworks with pagination"""
+    """
+    List artworks with pagination
+
+    Pass `cursor` (from a previous `next_cursor`) for keyset pagination, or
+    `page` for the legacy offset pages. `fields` limits each artwork to the
+    listed fields. Responses carry an ETag derived from the model version,
+    so unchanged pages are answered with 304.
+
+    `ids=1,2,3` (or POST {"ids": [...]}) fetches those artworks instead, in
+    the order given; ids not in the catalog are listed under `missing`.
+    """
 
     permission_classes = [permissions.AllowAny]
+    compression = True
 
     def get(self, request):
+        if "ids" in request.GET:
+            return self.multi_get(
+                request, request.GET.get("ids"), request.GET.get("fields"), cacheable=True
+            )
+
         try:
             recommender = get_recommender()
-            wikiart_client = get_wikiart_client()
 
             # Get pagination parameters
-            page = int(request.GET.get("page", 1))
-            page_size = int(request.GET.get("page_size", 20))
-
-            # Calculate pagination
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
+            cursor = request.GET.get("cursor")
+            try:
+                page_size = parse_positive_int(
+                    request.GET, "page_size", 20, getattr(settings, "ARTWORK_PAGE_SIZE_MAX", 100)
+                )
+                page = parse_positive_int(request.GET, "page", 1) if cursor is None else None
+                fields = parse_fields(request.GET.get("fields"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if cursor is not None:
+                try:
+                    after_id = decode_cursor(cursor)
+                except ValueError as e:
+                    return Response(
+                        {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                query_key = ("cursor", after_id, page_size)
+            else:
+                after_id = None
+                query_key = ("page", page, page_size)
+
+            if cursor is not None:
+                base_artworks, has_next = recommender.get_artworks_after(
+                    after_id, page_size
+                )
+            else:
+                # Calculate pagination
+                start_idx = (page - 1) * page_size
+                end_idx = start_idx + page_size
+                base_artworks = recommender.metadata[start_idx:end_idx]
+                has_next = end_idx < len(recommender.metadata)
+
+            like_counter = get_like_counter()
+            like_counts = like_counter.get_many(artwork["id"] for artwork in base_artworks)
+            etag = build_etag(
+                request,
+                recommender.model_version,
+                "list",
+                *query_key,
+                fields_key(fields),
+                like_counts,
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag, includes_likes(fields))
 
-            # Get artworks slice from recommender metadata
-            base_artworks = recommender.metadata[start_idx:end_idx]
+            # Enhance with real WikiArt data and URLs, plus live like counts
+            enhanced_artworks = enrich_artworks(base_artworks, fields, like_counter)
 
-            # Enhance with real WikiArt data and URLs
-            enhanced_artworks = wikiart_client.enrich_artworks_batch(base_artworks)
+            next_cursor = (
+                encode_cursor(base_artworks[-1]["id"])
+                if has_next and base_artworks
+                else None
+            )
 
-            return Response(
+            response = Response(
                 {
                     "artworks": enhanced_artworks,
                     "page": page,
                     "page_size": page_size,
                     "total": len(recommender.metadata),
-                    "has_next": end_idx < len(recommender.metadata),
+                    "has_next": has_next,
+                    "next_cursor": next_cursor,
+                }
+            )
+            return apply_cache_headers(response, etag, includes_likes(fields))
+
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def post(self, request):
+        """Multi-get with `ids` (and optionally `fields`) in the body"""
+        return self.multi_get(
+            request,
+            request.data.get("ids"),
+            request.data.get("fields", request.query_params.get("fields")),
+            cacheable=False,
+        )
+
+    def multi_get(self, request, ids, fields, cacheable):
+        try:
+            try:
+                artwork_ids = parse_artwork_ids(
+                    ids, getattr(settings, "ARTWORK_MULTI_GET_MAX_IDS", 500)
+                )
+                fields = parse_fields(fields)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            recommender = get_recommender()
+            artworks = recommender.get_artworks_by_ids(artwork_ids)
+            found = [artwork for artwork in artworks if artwork is not None]
+            missing = [
+                artwork_id
+                for artwork_id, artwork in zip(artwork_ids, artworks)
+                if artwork is None
+            ]
+
+            like_counter = get_like_counter()
+            etag = None
+            if cacheable:
+                like_counts = like_counter.get_many(artwork["id"] for artwork in found)
+                etag = build_etag(
+                    request,
+                    recommender.model_version,
+                    "ids",
+                    artwork_ids,
+                    fields_key(fields),
+                    like_counts,
+                )
+                if etag_matches(request, etag):
+                    return not_modified(etag, includes_likes(fields))
+
+            response = Response(
+                {
+                    "artworks": enrich_artworks(found, fields, like_counter),
+                    "count": len(found),
+                    "missing": missing,
                 }
             )
+            if not cacheable:
+                return response
+            return apply_cache_headers(response, etag, includes_likes(fields))
 
         except Exception as e:
             return Response(
@@ -47,14 +254,19 @@ class ArtworkListView(APIView):
 
 
 class ArtworkDetailView(APIView):
-    """Get artwork details by ID"""
+    """Get artwork details by ID (`fields` limits the returned fields)"""
 
     permission_classes = [permissions.AllowAny]
+    compression = True
 
     def get(self, request, pk):
         try:
+            try:
+                fields = parse_fields(request.GET.get("fields"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             recommender = get_recommender()
-            wikiart_client = get_wikiart_client()
 
             artwork = recommender.get_artwork_by_id(pk)
 
@@ -63,10 +275,24 @@ class ArtworkDetailView(APIView):
                     {"error": "Artwork not found"}, status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Enhance with real WikiArt data
-            enhanced_artwork = wikiart_client.enrich_artwork_metadata(artwork)
+            like_counter = get_like_counter()
+            etag = build_etag(
+                request,
+                recommender.model_version,
+                "detail",
+                pk,
+                fields_key(fields),
+                like_counter.get(pk),
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag, includes_likes(fields))
 
-            return Response({"artwork": enhanced_artwork})
+            # Enhance with real WikiArt data and live like counts
+            enhanced_artwork = enrich_artworks([artwork], fields, like_counter)[0]
+
+            return apply_cache_headers(
+                Response({"artwork": enhanced_artwork}), etag, includes_likes(fields)
+            )
 
         except Exception as e:
             return Response(
@@ -74,21 +300,111 @@ class ArtworkDetailView(APIView):
             )
 
 
+class SearchView(APIView):
+    """
+    Search artworks by artist, style and genre names
+
+    `q` is free text such as "monet impressionism landscape"; words may be
+    name prefixes ("impress"). Artworks matching every recognized word come
+    back best first, with `page`/`page_size` and `fields` as in the list.
+    `matched` shows the feature terms each word resolved to, `unmatched`
+    the words that named nothing (and were ignored).
+    """
+
+    permission_classes = [permissions.AllowAny]
+    compression = True
+
+    def get(self, request):
+        try:
+            query = request.GET.get("q", "").strip()
+            try:
+                if not query:
+                    raise ValueError("q is required")
+                page_size = parse_positive_int(
+                    request.GET, "page_size", 20, getattr(settings, "ARTWORK_PAGE_SIZE_MAX", 100)
+                )
+                page = parse_positive_int(request.GET, "page", 1)
+                fields = parse_fields(request.GET.get("fields"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            recommender = get_recommender()
+            result = recommender.search(query, limit=page_size, offset=(page - 1) * page_size)
+
+            like_counter = get_like_counter()
+            like_counts = like_counter.get_many(artwork["id"] for artwork in result["artworks"])
+            etag = build_etag(
+                request,
+                recommender.model_version,
+                "search",
+                query,
+                page,
+                page_size,
+                fields_key(fields),
+                like_counts,
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag, includes_likes(fields))
+
+            artworks = enrich_artworks(result["artworks"], fields, like_counter)
+            for artwork, base in zip(artworks, result["artworks"]):
+                artwork["search_score"] = base["search_score"]
+
+            response = Response(
+                {
+                    "query": query,
+                    "artworks": artworks,
+                    "page": page,
+                    "page_size": page_size,
+                    "total": result["total"],
+                    "has_next": page * page_size < result["total"],
+                    "matched": result["matched"],
+                    "unmatched": result["unmatched"],
+                }
+            )
+            return apply_cache_headers(response, etag, includes_likes(fields))
+
+        except Exception as e:
+            logger.exception("SearchView error")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class RecommendationView(APIView):
-    """Get recommendations for an artwork"""
+    """
+    Get recommendations for an artwork
+
+    `fields` (body or query) limits the fields of each returned artwork.
+    `time_budget_ms` bounds the computation (RECOMMENDATION_TIME_BUDGET_MS
+    by default): when it would run over, cheaper tiers answer instead and
+    `tier` in the response says which one did. Overloaded workers answer
+    503 with Retry-After (see backend/api/admission.py). `weights`, e.g.
+    {"style": 1, "artist": 0}, rescales how much each characteristic counts
+    towards similarity (missing ones default to 1).
+    """
 
     permission_classes = [permissions.AllowAny]
+    compression = True
 
     def post(self, request):
         try:
             recommender = get_recommender()
-            wikiart_client = get_wikiart_client()
+            like_counter = get_like_counter()
 
             # Get request data
             artwork_id = request.data.get("artwork_id")
             user_id = request.data.get("user_id")  # Optional user ID
             user_likes = request.data.get("user_likes", [])
             n_recommendations = request.data.get("n_recommendations", 10)
+            try:
+                fields = parse_fields(
+                    request.data.get("fields", request.query_params.get("fields"))
+                )
+                time_budget = parse_time_budget(request.data.get("time_budget_ms"))
+                weights = recommender.resolve_weights(request.data.get("weights"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # Validate inputs - now supports both artwork_id and user_id scenarios
             if artwork_id is None and user_id is None:
@@ -97,13 +413,34 @@ class RecommendationView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Get recommendations with enhanced utility matrix support
-            recommendations = recommender.get_recommendations(
-                artwork_id=int(artwork_id) if artwork_id is not None else None,
-                user_id=int(user_id) if user_id is not None else None,
-                user_likes=user_likes,
-                n_recommendations=n_recommendations
-            )
+            # Get recommendations with enhanced utility matrix support,
+            # within the time left after queueing
+            try:
+                admission_controller = get_admission_controller()
+                with admission_controller.admit(
+                    request_queue_seconds(
+                        request,
+                        time_budget if time_budget is not None else admission_controller.shed_after,
+                    )
+                ) as delay:
+                    result = recommender.recommend(
+                        artwork_id=int(artwork_id) if artwork_id is not None else None,
+                        user_id=int(user_id) if user_id is not None else None,
+                        user_likes=user_likes,
+                        n_recommendations=n_recommendations,
+                        popularity=like_counter.as_array(len(recommender.metadata)),
+                        deadline=(
+                            Deadline(time_budget - delay) if time_budget is not None else None
+                        ),
+                        weights=weights,
+                    )
+            except Overloaded as e:
+                response = Response(
+                    {"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+                response["Retry-After"] = str(e.retry_after)
+                return response
+            recommendations = result.artworks
 
             if not recommendations:
                 return Response(
@@ -113,29 +450,38 @@ class RecommendationView(APIView):
                         "user_id": user_id,
                         "recommendations": [],
                         "count": 0,
+                        "tier": result.tier,
                     }
                 )
 
+            # Log what signed-in users were shown, off the request path
+            if request.user.is_authenticated and getattr(
+                settings, "RECOMMENDATION_HISTORY_ENABLED", True
+            ):
+                get_history_logger().log(
+                    request.user.id,
+                    int(artwork_id) if artwork_id is not None else None,
+                    [artwork["id"] for artwork in recommendations],
+                )
+
             # Enhance recommendations with real WikiArt data
-            enhanced_recommendations = wikiart_client.enrich_artworks_batch(
-                recommendations
-            )
+            enhanced_recommendations = enrich_artworks(recommendations, fields, like_counter)
 
             # Prepare response
             response_data = {
                 "recommendations": enhanced_recommendations,
                 "count": len(recommendations),
+                "tier": result.tier,
             }
 
             # Add source artwork if artwork_id was provided
             if artwork_id is not None:
                 source_artwork = recommender.get_artwork_by_id(int(artwork_id))
-                enhanced_source = (
-                    wikiart_client.enrich_artwork_metadata(source_artwork)
+                response_data["source_artwork"] = (
+                    enrich_artworks([source_artwork], fields, like_counter)[0]
                     if source_artwork
                     else None
                 )
-                response_data["source_artwork"] = enhanced_source
                 response_data["artwork_id"] = artwork_id
 
             # Add user context
@@ -148,7 +494,7 @@ class RecommendationView(APIView):
             return Response(response_data)
 
         except Exception as e:
-            print(f"🚨 RecommendationView Error: {e}")
+            logger.exception("RecommendationView error")
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -158,22 +504,30 @@ class ArtworkImageView(APIView):
     """Get artwork image URLs by ID"""
 
     permission_classes = [permissions.AllowAny]
+    compression = True
 
     def get(self, request, pk):
         try:
+            recommender = get_recommender()
+
+            etag = build_etag(request, recommender.model_version, "image", pk)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
             wikiart_client = get_wikiart_client()
 
             # Generate real WikiArt image URLs
             image_url = wikiart_client.generate_wikiart_image_url(pk)
             placeholder_url = wikiart_client.generate_placeholder_url(artwork_id=pk)
 
-            return Response(
+            response = Response(
                 {
                     "artwork_id": pk,
                     "image_url": image_url,
                     "placeholder_url": placeholder_url,
                 }
             )
+            return apply_cache_headers(response, etag)
 
         except Exception as e:
             return Response(
@@ -181,10 +535,133 @@ class ArtworkImageView(APIView):
             )
 
 
+class ArtworkRawImageView(ArtworkImageView):
+    """
+    Serve artwork image bytes through the local image cache
+
+    Pass `size` for a resized JPEG thumbnail (see ARTWORK_THUMBNAIL_SIZES).
+    Supports If-None-Match and single-range `Range` requests. Full responses
+    go through FileResponse so WSGI servers can use sendfile; set
+    ARTWORK_IMAGE_ACCEL_REDIRECT_PREFIX to hand files to nginx instead.
+    """
+
+    range_pattern = re.compile(r"^bytes=(\d*)-(\d*)$")
+    # Image bytes are already compressed
+    compression = False
+
+    def perform_content_negotiation(self, request, force=False):
+        # Image responses bypass renderers, so never fail negotiation on
+        # Accept: image/* headers sent by browsers
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        try:
+            recommender = get_recommender()
+            artwork = recommender.get_artwork_by_id(pk)
+            if not artwork:
+                return Response(
+                    {"error": "Artwork not found"}, status=status.HTTP_404_NOT_FOUND
+                )
+
+            size = request.GET.get("size")
+            try:
+                size = int(size) if size else None
+                image_url = get_wikiart_client().enrich_artwork_metadata(
+                    artwork, frozenset({"image_url"})
+                )["image_url"]
+                cached = get_image_cache().get(pk, image_url, size)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except OriginFetchError as e:
+                return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
+            if etag_matches(request, cached.etag):
+                return not_modified(cached.etag)
+
+            response = self._file_response(request, cached)
+            response["Accept-Ranges"] = "bytes"
+            return apply_cache_headers(response, cached.etag)
+
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def _file_response(self, request, cached):
+        accel_prefix = getattr(settings, "ARTWORK_IMAGE_ACCEL_REDIRECT_PREFIX", None)
+        if accel_prefix:
+            # nginx serves the file (and any Range) from the internal location
+            relative_path = os.path.relpath(cached.path, get_image_cache().root)
+            response = HttpResponse(content_type=cached.content_type)
+            response["X-Accel-Redirect"] = f"{accel_prefix.rstrip('/')}/{relative_path}"
+            return response
+
+        byte_range = self._parse_range(request, cached.size, cached.etag)
+        if byte_range is None:
+            return FileResponse(open(cached.path, "rb"), content_type=cached.content_type)
+
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response["Content-Range"] = f"bytes */{cached.size}"
+            return response
+
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            self._read_range(cached.path, start, end),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type=cached.content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{cached.size}"
+        response["Content-Length"] = str(end - start + 1)
+        return response
+
+    def _parse_range(self, request, size, etag):
+        """
+        Parse a single byte range, returning (start, end), "unsatisfiable",
+        or None to serve the whole file
+        """
+        header = request.META.get("HTTP_RANGE")
+        if not header:
+            return None
+
+        # A stale If-Range validator means the client must get the full file
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if if_range and if_range.strip() != etag:
+            return None
+
+        match = self.range_pattern.match(header.strip())
+        if not match or not any(match.groups()):
+            return None
+
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+
+        if start >= size or start > end:
+            return "unsatisfiable"
+        return start, end
+
+    @staticmethod
+    def _read_range(path, start, end, chunk_size=64 * 1024):
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
 class ModelStatsView(APIView):
-    """Get ML model statistics"""
+    """Get ML model statistics (staff or the metrics scraper token)"""
 
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [MetricsAccess]
 
     def get(self, request):
         try:
@@ -197,3 +674,122 @@ class ModelStatsView(APIView):
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+# Registered users, counted at most every METRICS_DB_COUNT_INTERVAL seconds
+registered_users = PeriodicValue(
+    lambda: User.objects.count(), getattr(settings, "METRICS_DB_COUNT_INTERVAL", 60.0)
+)
+
+
+class MetricsView(APIView):
+    """
+    Prometheus metrics in text exposition format, merged across worker
+    processes when METRICS_MULTIPROC_DIR is set
+
+    Staff only, or scrapers with METRICS_BEARER_TOKEN (see MetricsAccess).
+    Like totals come from the like counter store, and the user count is
+    refreshed periodically, so scrapes never run full-table counts.
+    """
+
+    permission_classes = [MetricsAccess]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Scrapers send Accept headers no renderer matches
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        recommender = get_recommender()
+        scrape_gauges = {
+            "artapi_catalog_artworks": ("Artworks in the loaded catalog", len(recommender.metadata)),
+            "artapi_users": ("Registered users", registered_users.get()),
+            "artapi_artwork_likes": (
+                "Stored artwork likes",
+                int(get_like_counter().counts.sum()),
+            ),
+        }
+        return HttpResponse(
+            registry.render(scrape_gauges),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class ProfileListView(APIView):
+    """List stored request profiles (staff only, see backend.profiling)"""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        profiles = get_profile_store().list()
+        return Response({"profiles": profiles, "count": len(profiles)})
+
+
+class ProfileDownloadView(APIView):
+    """Download one stored profile as a pstats or collapsed-stack file"""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        path = get_profile_store().path(profile_id)
+        if path is None:
+            return Response(
+                {"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=os.path.basename(path),
+            content_type="application/octet-stream",
+        )
+
+
+class TracemallocView(APIView):
+    """
+    Allocation diffs for this worker process (staff only)
+
+    POST {"action": "start"} begins tracing and takes a baseline snapshot,
+    "rebaseline" replaces the baseline and "stop" ends tracing. GET returns
+    the largest changes since the baseline; pass `key_type` (lineno,
+    filename or traceback) and `limit`. To look for leaks across a hot
+    reload: start, reload the model, then GET.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    key_types = ("lineno", "filename", "traceback")
+
+    def get(self, request):
+        key_type = request.GET.get("key_type", "lineno")
+        if key_type not in self.key_types:
+            return Response(
+                {"error": f"key_type must be one of {', '.join(self.key_types)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(max(int(request.GET.get("limit", 25)), 1), 500)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response_data = tracemalloc_tracker.status()
+        if response_data["tracing"] and response_data["has_baseline"]:
+            response_data["diff"] = tracemalloc_tracker.diff(key_type, limit)
+        return Response(response_data)
+
+    def post(self, request):
+        action = request.data.get("action")
+        try:
+            if action == "start":
+                tracemalloc_tracker.start(int(request.data.get("frames", 1)))
+            elif action == "rebaseline":
+                tracemalloc_tracker.rebaseline()
+            elif action == "stop":
+                tracemalloc_tracker.stop()
+            else:
+                return Response(
+                    {"error": "action must be start, rebaseline or stop"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        except RuntimeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(tracemalloc_tracker.status())
@@ -0,0 +1,150 @@
+"""
+Negotiated response compression
+
+CompressionMiddleware compresses response bodies of at least
+RESPONSE_COMPRESSION_MIN_SIZE bytes whose content type is listed in
+RESPONSE_COMPRESSION_TYPES, using the best encoding the client accepts:
+brotli or gzip. Streaming and already encoded responses are left alone.
+The work shows up as the `compression` phase in Server-Timing.
+
+Responses of views that negotiate compression always get weak ETags, on
+200 and 304 alike, whether or not a given body ended up compressed: the
+304 cannot tell whether the matching 200 was below the size threshold or
+did not shrink, and its validator must match the one the client holds.
+
+Compression is opt-in per view, so responses that carry secrets (auth
+tokens, profiles) are never compressed next to attacker-influenced input
+(BREACH). Views tune it with class attributes:
+
+    compression = True             # compress this view's responses
+    compression_min_size = 16384   # override the size threshold
+
+The middleware removes itself unless RESPONSE_COMPRESSION_ENABLED is set.
+"""
+
+import gzip
+
+import brotli
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from backend.metrics import registry
+from backend.timing import phase
+
+COMPRESSED_RESPONSES = registry.counter(
+    "artapi_compressed_responses_total", "Responses compressed, by encoding", ("encoding",)
+)
+COMPRESSION_BYTES = registry.counter(
+    "artapi_compression_bytes_total",
+    "Response body bytes before (stage=in) and after (stage=out) compression",
+    ("encoding", "stage"),
+)
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, available):
+    """Best coding in `available` (in preference order) the header accepts"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(content, encoding, gzip_level=6, brotli_quality=4):
+    """Encode bytes with the "br" or "gzip" content coding"""
+    if encoding == "br":
+        return brotli.compress(content, quality=brotli_quality)
+    return gzip.compress(content, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress large text responses with brotli or gzip"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "RESPONSE_COMPRESSION_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = getattr(settings, "RESPONSE_COMPRESSION_MIN_SIZE", 1024)
+        self.content_types = tuple(
+            getattr(settings, "RESPONSE_COMPRESSION_TYPES", ("application/json", "text/"))
+        )
+        self.gzip_level = getattr(settings, "RESPONSE_COMPRESSION_GZIP_LEVEL", 6)
+        self.brotli_quality = getattr(settings, "RESPONSE_COMPRESSION_BROTLI_QUALITY", 4)
+        self.encodings = ("br", "gzip")
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        request._compression = (
+            getattr(view_class, "compression", False),
+            getattr(view_class, "compression_min_size", None),
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        enabled, min_size = getattr(request, "_compression", (False, None))
+        if not enabled or response.streaming or response.has_header("Content-Encoding"):
+            return response
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings)
+
+        if response.status_code == 304:
+            # Keep validators in line with the 200 response
+            self._weaken_etag(response)
+            patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+
+        content_type = response.get("Content-Type", "").lower()
+        if not content_type.startswith(self.content_types):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        self._weaken_etag(response)
+        if encoding is None or len(response.content) < (min_size or self.min_size):
+            return response
+
+        with phase("compression"):
+            compressed = compress(
+                response.content, encoding, self.gzip_level, self.brotli_quality
+            )
+        if len(compressed) >= len(response.content):
+            return response
+
+        COMPRESSED_RESPONSES.labels(encoding).inc()
+        COMPRESSION_BYTES.labels(encoding, "in").inc(len(response.content))
+        COMPRESSION_BYTES.labels(encoding, "out").inc(len(compressed))
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _weaken_etag(response):
+        # The body differs per encoding, so the ETag can no longer be strong
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
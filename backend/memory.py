@@ -0,0 +1,116 @@
+"""
+Memory accounting helpers
+
+deep_sizeof estimates the bytes an object graph holds (numpy, scipy sparse
+and pandas objects report their buffers). TracemallocTracker keeps a
+baseline snapshot so allocations can be diffed later, e.g. across a
+recommender hot reload. Both work per process.
+"""
+
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import issparse
+
+
+def deep_sizeof(obj):
+    """Approximate bytes held by obj and everything it references"""
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        if isinstance(current, np.ndarray):
+            total += current.nbytes
+        elif issparse(current):
+            for name in ("data", "indices", "indptr", "row", "col"):
+                array = getattr(current, name, None)
+                if isinstance(array, np.ndarray):
+                    total += array.nbytes
+        elif isinstance(current, (pd.DataFrame, pd.Series, pd.Index)):
+            usage = current.memory_usage(deep=True)
+            total += int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        elif isinstance(current, (str, bytes, bytearray, int, float, bool, type(None))):
+            total += sys.getsizeof(current)
+        elif isinstance(current, dict):
+            total += sys.getsizeof(current)
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(current)
+            stack.extend(current)
+        else:
+            total += sys.getsizeof(current)
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+class TracemallocTracker:
+    """Start/stop tracemalloc and diff snapshots against a baseline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.baseline = None
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "has_baseline": self.baseline is not None,
+        }
+
+    def start(self, frames=1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = tracemalloc.take_snapshot()
+
+    def rebaseline(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not tracing; start it first")
+            self.baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        with self._lock:
+            self.baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def diff(self, key_type="lineno", limit=25):
+        """Largest allocation changes since the baseline"""
+        with self._lock:
+            if not tracemalloc.is_tracing() or self.baseline is None:
+                raise RuntimeError("tracemalloc is not tracing; start it first")
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)
+            )
+            stats = snapshot.compare_to(self.baseline, key_type)
+
+        return [
+            {
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+
+tracemalloc_tracker = TracemallocTracker()
@@ -0,0 +1,352 @@
+"""
+Prometheus metrics for the API and recommender
+
+Counters, gauges and histograms live in process memory. With
+METRICS_MULTIPROC_DIR set, each worker process also writes its values to
+`<dir>/<pid>.json` (at most every METRICS_FLUSH_INTERVAL seconds, and at
+exit), and a scrape merges every file:
+
+    counters, histograms  summed over all processes, including exited ones
+    gauges                reported per live process with a `pid` label
+
+Clear the directory when the server starts, as with prometheus_client's
+multiprocess mode. Without the setting, each process only reports itself.
+
+Metric names carry the `artapi_` prefix; process memory follows the
+standard `process_resident_memory_bytes` name.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import resource
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+
+class _Child:
+    """Value holder for one label combination"""
+
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount=1):
+        with self.metric.registry.lock:
+            values = self.metric.values
+            values[self.key] = values.get(self.key, 0.0) + amount
+
+    def set(self, value):
+        with self.metric.registry.lock:
+            self.metric.values[self.key] = float(value)
+
+    def observe(self, value):
+        metric = self.metric
+        index = bisect.bisect_left(metric.buckets, value)
+        with metric.registry.lock:
+            entry = metric.values.get(self.key)
+            if entry is None:
+                entry = metric.values[self.key] = [0] * len(metric.buckets) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+
+class Metric:
+    def __init__(self, registry, kind, name, documentation, labelnames=(), buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self.values = {}
+        self._children = {}
+
+    def labels(self, *labelvalues):
+        key = tuple(str(value) for value in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, _Child(self, key))
+        return child
+
+    # Shortcuts for metrics without labels
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def clear(self):
+        with self.registry.lock:
+            self.values.clear()
+
+    def state(self):
+        """JSON-serializable copy of the current values"""
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "buckets": [str(bound) for bound in self.buckets] if self.buckets else None,
+            "samples": [[list(key), value] for key, value in self.values.items()],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._last_flush = 0.0
+
+    def _register(self, kind, name, documentation, labelnames=(), buckets=None):
+        metric = Metric(self, kind, name, documentation, labelnames, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register("counter", name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register("gauge", name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register("histogram", name, documentation, labelnames, buckets)
+
+    def state(self):
+        update_process_memory()
+        with self.lock:
+            return {name: metric.state() for name, metric in self.metrics.items()}
+
+    # Multi-process sharing
+
+    @staticmethod
+    def multiproc_dir():
+        path = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        return os.fspath(path) if path else None
+
+    def flush(self):
+        """Write this process's values to the shared directory"""
+        directory = self.multiproc_dir()
+        if directory is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        partial_path = f"{path}.partial"
+        with open(partial_path, "w") as f:
+            json.dump(self.state(), f)
+        os.replace(partial_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def collect(self):
+        """Merged state of all processes: {name: metric state}"""
+        directory = self.multiproc_dir()
+        if directory is None:
+            return self.state()
+
+        self.flush()
+        merged = {}
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json"):
+                continue
+            pid = filename[: -len(".json")]
+            try:
+                with open(os.path.join(directory, filename), "r") as f:
+                    process_state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(int(pid)) if pid.isdigit() else False
+            for name, metric in process_state.items():
+                _merge_metric(merged, name, metric, pid, alive)
+        return merged
+
+    def render(self, scrape_gauges=None):
+        """
+        Text exposition format (version 0.0.4). scrape_gauges adds gauges
+        computed by the scraping process, as {name: (help, value)}.
+        """
+        families = self.collect()
+        for name, (documentation, value) in (scrape_gauges or {}).items():
+            families[name] = {
+                "kind": "gauge",
+                "help": documentation,
+                "labelnames": [],
+                "buckets": None,
+                "samples": [[[], value]],
+            }
+
+        lines = []
+        for name, family in families.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            labelnames = family["labelnames"]
+            for labelvalues, value in family["samples"]:
+                labels = list(zip(labelnames, labelvalues))
+                if family["kind"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(family["buckets"], value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == "inf" else bound
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge_metric(merged, name, metric, pid, alive):
+    if metric["kind"] == "gauge":
+        if not alive:
+            return
+        target = merged.setdefault(name, dict(metric, labelnames=metric["labelnames"] + ["pid"], samples=[]))
+        target["samples"].extend([labels + [pid], value] for labels, value in metric["samples"])
+        return
+
+    target = merged.setdefault(name, dict(metric, samples=[]))
+    totals = {tuple(labels): value for labels, value in target["samples"]}
+    for labels, value in metric["samples"]:
+        key = tuple(labels)
+        if key not in totals:
+            totals[key] = value
+        elif metric["kind"] == "histogram":
+            totals[key] = [a + b for a, b in zip(totals[key], value)]
+        else:
+            totals[key] += value
+    target["samples"] = [[list(key), value] for key, value in totals.items()]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class PeriodicValue:
+    """
+    Result of fn(), recomputed at most every `interval` seconds; keeps
+    scrape-time gauges backed by database queries cheap
+    """
+
+    def __init__(self, fn, interval=60.0):
+        self.fn = fn
+        self.interval = interval
+        self._value = None
+        self._computed_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._computed_at is None or now - self._computed_at >= self.interval:
+                self._value = self.fn()
+                self._computed_at = now
+            return self._value
+
+
+def read_resident_memory():
+    """Current RSS in bytes (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def update_process_memory():
+    PROCESS_RESIDENT_MEMORY.set(read_resident_memory())
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "artapi_http_requests_total", "HTTP requests by view, method and status", ("view", "method", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "artapi_http_request_duration_seconds", "HTTP request latency by view", ("view",)
+)
+REQUEST_PHASE_DURATION = registry.histogram(
+    "artapi_request_phase_duration_seconds",
+    "Self time per request phase (see backend.timing)",
+    ("view", "phase"),
+)
+CACHE_REQUESTS = registry.counter(
+    "artapi_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+MODEL_LOADS = registry.counter("artapi_model_loads_total", "Recommender model loads by result", ("result",))
+MODEL_LOAD_DURATION = registry.gauge("artapi_model_load_duration_seconds", "Duration of the last model load")
+MODEL_INFO = registry.gauge("artapi_model_info", "Loaded model version (value is always 1)", ("version",))
+RECOMMENDATION_TIERS = registry.counter(
+    "artapi_recommendation_tier_total",
+    "Recommendation results by tier (full, neighbors, popularity)",
+    ("tier",),
+)
+LIKE_WRITES = registry.counter(
+    "artapi_like_writes_total", "ArtworkLike writes by action and result", ("action", "result")
+)
+PROCESS_RESIDENT_MEMORY = registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes")
+
+# Any other request method is counted as "other", so clients cannot create
+# new time series with made-up verbs
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT")
+)
+
+
+class MetricsMiddleware:
+    """Count requests and their latency per view, then share the values"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if registry.multiproc_dir() is not None:
+            atexit.register(registry.flush)
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unresolved"
+        method = request.method if request.method in HTTP_METHODS else "other"
+        HTTP_REQUESTS.labels(view, method, response.status_code).inc()
+        HTTP_REQUEST_DURATION.labels(view).observe(elapsed)
+        if registry.multiproc_dir() is not None:
+            registry.maybe_flush()
+        return response
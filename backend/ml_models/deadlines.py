@@ -0,0 +1,34 @@
+"""
+Time budgets for recommendation requests
+
+A Deadline is created per request from its time budget (counted from when
+the request arrived, so queueing time is included). The recommender checks
+it before each expensive step and falls back to cheaper tiers when the
+next step would not fit (see ArtworkRecommender.recommend).
+"""
+
+import time
+
+
+class DeadlineExceeded(Exception):
+    """The remaining budget cannot cover the next step"""
+
+
+class Deadline:
+    def __init__(self, budget_seconds, started=None):
+        self.budget = budget_seconds
+        self.expires = (time.monotonic() if started is None else started) + budget_seconds
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, seconds):
+        """Whether `seconds` more work still fits in the budget"""
+        return self.remaining() >= seconds
+
+    def require(self, seconds):
+        if not self.allows(seconds):
+            raise DeadlineExceeded
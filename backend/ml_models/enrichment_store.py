@@ -0,0 +1,157 @@
+"""
+Precomputed WikiArt enrichment rows
+
+Enrichment is deterministic per (artwork_id, artist, genre, style), so it is
+computed once per model version and persisted next to the model files as
+`enrichment.json`. Responses then only merge a stored row into the artwork.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from .image_health import (
+    IMAGE_HEALTH_FILENAME,
+    cached_health,
+    collect_image_urls,
+    pick_healthy_image,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever WikiArtAPIClient.get_artwork_by_ids changes its output,
+# so previously persisted stores are rebuilt
+ENRICHMENT_FORMAT_VERSION = 2
+
+ENRICHMENT_FILENAME = "enrichment.json"
+
+
+class EnrichmentStore:
+    """In-memory table of enrichment rows keyed by artwork id"""
+
+    def __init__(self, model_version: str, rows: List[Dict]):
+        self.model_version = model_version
+        self.rows_by_id = {row["id"]: row for row in rows}
+
+    def __len__(self):
+        return len(self.rows_by_id)
+
+    def lookup(
+        self, artwork_id: int, artist_id: str, genre_id: str, style_id: str
+    ) -> Optional[Dict]:
+        """
+        Return the stored row for an artwork, or None if it is missing or
+        was built from different attributes
+        """
+        row = self.rows_by_id.get(artwork_id)
+        if row is None:
+            return None
+        if (
+            row["artist_id"] != artist_id
+            or row["genre_id"] != genre_id
+            or row["style_id"] != style_id
+        ):
+            return None
+        return row
+
+    def apply_image_health(self, checker) -> int:
+        """
+        Check every image URL with an ImageHealthChecker and swap broken
+        image_url values for the first healthy alternative. Returns the
+        number of rows that changed.
+        """
+        health = checker.check_many(collect_image_urls(list(self.rows_by_id.values())))
+        return self.apply_health(health)
+
+    def apply_health(self, health: Dict[str, bool]) -> int:
+        """
+        Swap broken image_url values for the first healthy alternative
+        according to known URL health. Returns the number of rows that
+        changed.
+        """
+        replaced = 0
+        for row in list(self.rows_by_id.values()):
+            updated = pick_healthy_image(row, health)
+            if updated is not row:
+                self.rows_by_id[row["id"]] = updated
+                replaced += 1
+        return replaced
+
+    def extend(self, metadata: List[Dict], client, model_version: str) -> None:
+        """Add rows for newly appended artworks and retag the store"""
+        for artwork in metadata:
+            self.rows_by_id[artwork["id"]] = client.get_artwork_by_ids(
+                artwork["id"],
+                str(artwork["artist"]),
+                str(artwork["genre"]),
+                str(artwork["style"]),
+            )
+        self.model_version = model_version
+
+    @classmethod
+    def build(cls, metadata: List[Dict], client, model_version: str):
+        """Compute enrichment rows for the whole catalog"""
+        rows = [
+            client.get_artwork_by_ids(
+                artwork["id"],
+                str(artwork["artist"]),
+                str(artwork["genre"]),
+                str(artwork["style"]),
+            )
+            for artwork in metadata
+        ]
+        return cls(model_version, rows)
+
+    @classmethod
+    def load(cls, path: str, model_version: str):
+        """Load a persisted store, or return None if missing or stale"""
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            payload = json.load(f)
+
+        if (
+            payload.get("format_version") != ENRICHMENT_FORMAT_VERSION
+            or payload.get("model_version") != model_version
+        ):
+            return None
+        return cls(model_version, payload["rows"])
+
+    def save(self, path: str) -> None:
+        """Persist the store atomically next to the model files"""
+        payload = {
+            "format_version": ENRICHMENT_FORMAT_VERSION,
+            "model_version": self.model_version,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "rows": list(self.rows_by_id.values()),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+def load_or_build_store(models_path: str, metadata: List[Dict], client, model_version: str):
+    """
+    Load the persisted store for this model version, building and saving a
+    fresh one when it is missing or stale. A rebuilt store re-applies the
+    image health results cached by `build_enrichment --check-images`.
+    """
+    path = os.path.join(models_path, ENRICHMENT_FILENAME)
+    store = EnrichmentStore.load(path, model_version)
+    if store is not None:
+        return store
+
+    store = EnrichmentStore.build(metadata, client, model_version)
+    replaced = store.apply_health(cached_health(os.path.join(models_path, IMAGE_HEALTH_FILENAME)))
+    if replaced:
+        logger.info("Replaced %d broken image URLs from cached health checks", replaced)
+    try:
+        store.save(path)
+    except OSError as e:
+        # Read-only deployments still get the in-memory store
+        logger.warning("Could not persist enrichment store: %s", e)
+    return store
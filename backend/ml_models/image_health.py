@@ -0,0 +1,217 @@
+"""
+Bulk image URL health checker
+
+Checks thousands of image URLs with a bounded thread pool, one pooled
+requests.Session per host, per-host concurrency limits and backoff on
+throttling responses. Results are cached on disk with a TTL so repeated
+enrichment builds only re-check stale URLs, and enrichment stores rebuilt
+at model load re-apply the cached results without checking anything.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IMAGE_HEALTH_FILENAME = "image_health.json"
+
+# Responses that mean "slow down" rather than "broken"
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+
+def read_health_cache(path: Optional[str]) -> Dict:
+    """Cached check results by URL, or {} when the cache is missing or corrupt"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_health(path: Optional[str]) -> Dict[str, bool]:
+    """Last known health of every cached URL, however old the check"""
+    return {url: entry["ok"] for url, entry in read_health_cache(path).items()}
+
+
+class ImageHealthChecker:
+    """Concurrent HEAD checker with per-host pooling and an on-disk cache"""
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        ttl: float = 24 * 3600,
+        max_workers: int = 32,
+        per_host_limit: int = 4,
+        timeout: float = 5,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        headers: Optional[Dict] = None,
+    ):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.headers = headers or {}
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._host_slots = {}
+        self._host_blocked_until = {}
+        self._cache = read_health_cache(cache_path)
+
+    def save_cache(self) -> None:
+        """Persist cached results atomically"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            snapshot = dict(self._cache)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _cached_result(self, url: str, now: float) -> Optional[bool]:
+        entry = self._cache.get(url)
+        if entry is None or now - entry["checked_at"] > self.ttl:
+            return None
+        return entry["ok"]
+
+    def _host_state(self, host: str):
+        """Get (session, semaphore) for a host, creating them on first use"""
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.per_host_limit
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._host_slots[host] = threading.BoundedSemaphore(
+                    self.per_host_limit
+                )
+            return self._sessions[host], self._host_slots[host]
+
+    def _wait_for_host(self, host: str) -> None:
+        """Sleep while a host is backing off after a throttling response"""
+        with self._lock:
+            blocked_until = self._host_blocked_until.get(host, 0)
+        delay = blocked_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _block_host(self, host: str, delay: float) -> None:
+        with self._lock:
+            blocked_until = time.monotonic() + delay
+            if blocked_until > self._host_blocked_until.get(host, 0):
+                self._host_blocked_until[host] = blocked_until
+
+    def check_url(self, url: str) -> Dict:
+        """Check a single URL, retrying throttled or failed requests with backoff"""
+        host = urlsplit(url).netloc
+        session, slots = self._host_state(host)
+        status_code = None
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_host(host)
+            try:
+                with slots:
+                    response = session.head(
+                        url, timeout=self.timeout, allow_redirects=True
+                    )
+                    if response.status_code == 405:
+                        # Some image hosts refuse HEAD; fetch headers only
+                        response = session.get(
+                            url, timeout=self.timeout, stream=True
+                        )
+                        response.close()
+                status_code = response.status_code
+            except requests.RequestException:
+                status_code = None
+
+            if status_code is not None and status_code not in RETRYABLE_STATUSES:
+                break
+
+            if attempt < self.max_retries:
+                delay = self.backoff * (2**attempt)
+                retry_after = (
+                    response.headers.get("Retry-After")
+                    if status_code in RETRYABLE_STATUSES
+                    else None
+                )
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                self._block_host(host, delay)
+
+        return {
+            "ok": status_code == 200,
+            "status": status_code,
+            "checked_at": time.time(),
+        }
+
+    def check_many(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """Check URLs concurrently, serving fresh results from the cache"""
+        now = time.time()
+        results = {}
+        pending = []
+
+        for url in dict.fromkeys(urls):
+            cached = self._cached_result(url, now)
+            if cached is None:
+                pending.append(url)
+            else:
+                results[url] = cached
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for url, entry in zip(pending, executor.map(self.check_url, pending)):
+                    with self._lock:
+                        self._cache[url] = entry
+                    results[url] = entry["ok"]
+            self.save_cache()
+
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def pick_healthy_image(row: Dict, health: Dict[str, bool]) -> Dict:
+    """
+    Replace a broken image_url with the first healthy CDN alternative,
+    leaving the row untouched when nothing better is known
+    """
+    image_url = row.get("image_url")
+    if health.get(image_url, True):
+        return row
+
+    for candidate in row.get("cdn_alternatives", []):
+        if health.get(candidate):
+            updated = dict(row)
+            updated["image_url"] = candidate
+            return updated
+    return row
+
+
+def collect_image_urls(rows: List[Dict]) -> List[str]:
+    """All image_url and cdn_alternatives URLs referenced by enrichment rows"""
+    urls = []
+    for row in rows:
+        urls.append(row["image_url"])
+        urls.extend(row.get("cdn_alternatives", []))
+    return urls
@@ -1,29 +1,82 @@
 import os
+import asyncio
 import json
 import pickle
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
 from scipy.sparse import load_npz
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from django.conf import settings
+from backend.memory import deep_sizeof
+from backend.metrics import (
+    MODEL_INFO,
+    MODEL_LOAD_DURATION,
+    MODEL_LOADS,
+    RECOMMENDATION_TIERS,
+    read_resident_memory,
+)
+from backend.timing import phase
+from .deadlines import DeadlineExceeded
+from .enrichment_store import load_or_build_store
+from .search_index import load_or_build_index
+from .neighbors import NEIGHBORS_FILENAME, NeighborTable
+from .single_flight import SingleFlight
+from .wikiart_api_client import get_wikiart_client
+
+logger = logging.getLogger(__name__)
+
+RecommendationResult = namedtuple("RecommendationResult", ["artworks", "tier"])
 
 
 class ArtworkRecommender:
     """Django ML Recommendation System"""
 
-    def __init__(self):
+    def __init__(self, models_path=None):
         self.vectorizer = None
         self.tfidf_matrix = None
         self.metadata = None
         self.model_info = None
         self.utility_matrix = None
+        self.model_version = None
+        self.models_path = models_path
+        self.enrichment_store = None
+        self.search_index = None
+        self.artifacts_mtime = None
+        self.artwork_ids = np.array([], dtype=np.int64)
+        self.load_seconds = {}
+        self._memory_usage = None
+        self._recommendation_flights = SingleFlight("recommendations")
+        # Characteristic -> TF-IDF columns, for per-request weights
+        self.field_columns = None
+        self.normalized_tfidf = None
+        self.neighbor_table = NeighborTable(
+            k=getattr(settings, "RECOMMENDATION_NEIGHBOR_TABLE_K", 50)
+        )
+        # Running estimates (seconds) for deadline checks
+        self._costs = {"row": 0.0, "topn": 0.0}
         self._load_model()
 
+    @contextmanager
+    def _timed(self, name):
+        """Record how long loading one artifact takes"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_seconds[name] = time.perf_counter() - started
+
     def _load_model(self):
         """Load pre-trained model files"""
+        started = time.perf_counter()
         try:
-            print(f"Django BASE_DIR: {settings.BASE_DIR}")
-            print(f"Django BASE_DIR.parent: {settings.BASE_DIR.parent}")
+            logger.debug("Django BASE_DIR: %s", settings.BASE_DIR)
 
             # Look for models in the models directory (relative to project root)
             # Direct path construction since we know the structure
@@ -33,53 +86,168 @@ class ArtworkRecommender:
             current_file_dir = os.path.dirname(os.path.abspath(__file__))
             
             project_root = os.path.dirname(os.path.dirname(current_file_dir))
-            models_path = os.path.join(project_root, "models")
+            models_path = self.models_path or os.path.join(project_root, "models")
+            self.models_path = models_path
 
-            print(f"Looking for models in: {models_path}")  # Debug log
+            logger.debug("Looking for models in: %s", models_path)
 
             # Check if models directory exists
             if os.path.exists(models_path):
-                print(f" Models directory exists")
-                print(f"Files in models directory: {os.listdir(models_path)}")
+                logger.debug("Files in models directory: %s", os.listdir(models_path))
             else:
-                print(f" Models directory does not exist: {models_path}")
                 raise FileNotFoundError(f"Models directory not found: {models_path}")
 
             # Load vectorizer
             vectorizer_path = os.path.join(models_path, "vectorizer.pkl")
-            print(f"Loading vectorizer from: {vectorizer_path}")
-            with open(vectorizer_path, "rb") as f:
+            logger.debug("Loading vectorizer from: %s", vectorizer_path)
+            with self._timed("vectorizer"), open(vectorizer_path, "rb") as f:
                 self.vectorizer = pickle.load(f)
 
             # Load TF-IDF matrix
             matrix_path = os.path.join(models_path, "tfidf_matrix.npz")
-            self.tfidf_matrix = load_npz(matrix_path)
+            with self._timed("tfidf_matrix"):
+                self.tfidf_matrix = load_npz(matrix_path)
 
             # Load metadata
             metadata_path = os.path.join(models_path, "metadata.json")
-            with open(metadata_path, "r") as f:
+            with self._timed("metadata"), open(metadata_path, "r") as f:
                 self.metadata = json.load(f)
 
             # Load model info
             model_info_path = os.path.join(models_path, "model_info.json")
-            with open(model_info_path, "r") as f:
+            with self._timed("model_info"), open(model_info_path, "r") as f:
                 self.model_info = json.load(f)
 
-            # Load utility matrix
+            # Load utility matrix (the binary form from synthetic_interactions wins)
             utility_path = os.path.join(models_path, "utility_matrix.csv")
-            if os.path.exists(utility_path):
-                self.utility_matrix = pd.read_csv(utility_path)
-            else:
-                self.utility_matrix = None
+            utility_binary_path = os.path.join(models_path, "utility_matrix.npz")
+            with self._timed("utility_matrix"):
+                if os.path.exists(utility_binary_path):
+                    with np.load(utility_binary_path) as data:
+                        self.utility_matrix = pd.DataFrame(
+                            {name: data[name] for name in ("user_id", "artwork_id", "rating")}
+                        )
+                elif os.path.exists(utility_path):
+                    self.utility_matrix = pd.read_csv(utility_path)
+                else:
+                    self.utility_matrix = None
+
+            # Sorted id index for keyset pagination
+            self.artwork_ids = np.array(
+                [artwork["id"] for artwork in self.metadata], dtype=np.int64
+            )
+
+            # Column blocks per characteristic (artist, style, genre)
+            with self._timed("field_blocks"):
+                self._build_field_blocks()
 
-            print(f" Model loaded: {len(self.metadata)} artworks")
+            # Version string used to key HTTP caches (ETags)
+            with self._timed("model_version"):
+                self.model_version = compute_model_version(models_path, self.model_info)
+            self.artifacts_mtime = self._get_artifacts_mtime()
+
+            # Neighbor table behind the deadline fallback tier
+            if len(self.metadata) <= getattr(
+                settings, "RECOMMENDATION_NEIGHBOR_PRECOMPUTE_MAX", 20_000
+            ):
+                with self._timed("neighbor_table"):
+                    self._load_neighbor_table(models_path)
+
+            # Precomputed WikiArt enrichment rows, joined into API responses
+            wikiart_client = get_wikiart_client()
+            with self._timed("enrichment_store"):
+                self.enrichment_store = load_or_build_store(
+                    models_path, self.metadata, wikiart_client, self.model_version
+                )
+            wikiart_client.use_enrichment_store(self.enrichment_store)
+
+            # Inverted index for /api/search
+            with self._timed("search_index"):
+                self.search_index = load_or_build_index(
+                    models_path,
+                    self.metadata,
+                    wikiart_client,
+                    self.model_version,
+                    self.vectorizer,
+                )
+
+            logger.info("Model loaded: %d artworks (%s)", len(self.metadata), self.model_version)
+            MODEL_LOADS.labels("ok").inc()
 
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
+            logger.error("Error loading model: %s", e)
             # Create dummy data for development
             self.metadata = []
             self.model_info = {"n_artworks": 0}
-            print("⚠️ Using dummy data - train and save your model first!")
+            self.model_version = "dummy"
+            logger.warning("Using dummy data - train and save your model first!")
+            MODEL_LOADS.labels("error").inc()
+
+        MODEL_LOAD_DURATION.set(time.perf_counter() - started)
+        MODEL_INFO.clear()
+        MODEL_INFO.labels(self.model_version).set(1)
+
+    def _load_neighbor_table(self, models_path):
+        """Load the persisted neighbor table, precomputing and saving it when stale"""
+        path = os.path.join(models_path, NEIGHBORS_FILENAME)
+        table = NeighborTable.load(
+            path, self.model_version, self.neighbor_table.k, self.neighbor_table.max_entries
+        )
+        if table is not None:
+            self.neighbor_table = table
+            return
+
+        self.neighbor_table.precompute(self.tfidf_matrix)
+        try:
+            self.neighbor_table.save(path, self.model_version)
+        except OSError as e:
+            # Read-only deployments still get the in-memory table
+            logger.warning("Could not persist neighbor table: %s", e)
+
+    def _build_field_blocks(self):
+        """
+        Map each characteristic to its TF-IDF columns (terms are prefixed
+        "artist_", "style_", ...) and keep unit-length rows, so weighted
+        similarities need no renormalization. Hashed features have no
+        vocabulary, so such models do not support weights.
+        """
+        vocabulary = getattr(self.vectorizer, "vocabulary_", None)
+        if not vocabulary:
+            self.field_columns = None
+            return
+
+        characteristics = (self.model_info or {}).get("characteristics") or {}
+        fields = list(characteristics.values()) or ["artist", "style", "genre"]
+        self.field_columns = {
+            field: np.array(
+                sorted(
+                    column
+                    for term, column in vocabulary.items()
+                    if term.startswith(f"{field}_")
+                ),
+                dtype=np.int64,
+            )
+            for field in fields
+        }
+
+        row_norms = np.sqrt(
+            np.asarray(self.tfidf_matrix.multiply(self.tfidf_matrix).sum(axis=1)).ravel()
+        )
+        if np.allclose(row_norms[row_norms > 0], 1.0):
+            self.normalized_tfidf = self.tfidf_matrix
+        else:
+            self.normalized_tfidf = normalize(self.tfidf_matrix)
+
+    def _get_artifacts_mtime(self):
+        """model_info.json is replaced last when a bundle is written"""
+        try:
+            return os.stat(os.path.join(self.models_path, "model_info.json")).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def artifacts_changed(self):
+        """Check whether the model files were rewritten since they were loaded"""
+        return self.models_path is not None and self._get_artifacts_mtime() != self.artifacts_mtime
 
     def get_user_preferences(self, user_id):
         """
@@ -88,122 +256,553 @@ class ArtworkRecommender:
         """
         if self.utility_matrix is None:
             return []
-        
-        # Filter user interactions where rating = 1 (liked)
-        user_likes = self.utility_matrix[
-            (self.utility_matrix['user_id'] == user_id) & 
-            (self.utility_matrix['rating'] == 1)
-        ]
-        
-        return user_likes['artwork_id'].tolist()
 
-    def get_recommendations(self, artwork_id=None, user_id=None, user_likes=None, n_recommendations=10):
-        """Get artwork recommendations with optional user personalization"""
-        if not self.tfidf_matrix:
-            return []
+        with phase("preferences"):
+            # Filter user interactions where rating = 1 (liked)
+            user_likes = self.utility_matrix[
+                (self.utility_matrix['user_id'] == user_id) & 
+                (self.utility_matrix['rating'] == 1)
+            ]
+
+            return user_likes['artwork_id'].tolist()
 
-        # SCENARIO 1: Content-based recommendation from specific artwork
-        if artwork_id is not None and artwork_id < len(self.metadata):
-            # Calculate base similarity
-            similarity_scores = cosine_similarity(
+    def recommend(
+        self,
+        artwork_id=None,
+        user_id=None,
+        user_likes=None,
+        n_recommendations=10,
+        popularity=None,
+        deadline=None,
+        weights=None,
+    ):
+        """
+        Get artwork recommendations with optional user personalization,
+        within an optional Deadline
+
+        Returns RecommendationResult(artworks, tier). The tier is "full" for
+        the complete similarity computation; when the deadline would be
+        missed it is "neighbors" (precomputed neighbor table) or
+        "popularity" (like counts).
+
+        popularity (like counts indexed by artwork id) ranks the fallback
+        for users without likes; without it the fallback is random.
+
+        weights (from resolve_weights) scale how much each characteristic
+        (artist, style, genre) contributes to similarity in the full tier.
+
+        Concurrent identical queries share one computation (see
+        RECOMMENDATION_SINGLE_FLIGHT); every caller gets its own copies.
+        Callers only reuse another caller's full-tier result: one degraded
+        by someone else's tighter deadline is recomputed within their own.
+        """
+        query = (
+            artwork_id, user_id, user_likes, n_recommendations, popularity, deadline, weights
+        )
+        if not getattr(settings, "RECOMMENDATION_SINGLE_FLIGHT", True):
+            return self._finish(self._recommend_within(*query))
+
+        try:
+            result, owner = self._recommendation_flights.do(
+                self._query_key(artwork_id, user_id, user_likes, n_recommendations, weights),
+                lambda: (self._recommend_within(*query), deadline),
+                timeout=None if deadline is None else max(deadline.remaining(), 0),
+            )
+        except TimeoutError:
+            # The in-flight leader will not finish within our budget
+            return self._finish(self._fallback(*query))
+        if result.tier != "full" and owner is not deadline:
+            result = self._recommend_within(*query)
+        return self._finish(result)
+
+    async def recommend_async(
+        self,
+        artwork_id=None,
+        user_id=None,
+        user_likes=None,
+        n_recommendations=10,
+        popularity=None,
+        deadline=None,
+        weights=None,
+    ):
+        """recommend() for async views; scoring runs in a worker thread"""
+        query = (
+            artwork_id, user_id, user_likes, n_recommendations, popularity, deadline, weights
+        )
+        if not getattr(settings, "RECOMMENDATION_SINGLE_FLIGHT", True):
+            return self._finish(await asyncio.to_thread(self._recommend_within, *query))
+
+        try:
+            result, owner = await self._recommendation_flights.do_async(
+                self._query_key(artwork_id, user_id, user_likes, n_recommendations, weights),
+                lambda: (self._recommend_within(*query), deadline),
+                timeout=None if deadline is None else max(deadline.remaining(), 0),
+            )
+        except TimeoutError:
+            return self._finish(self._fallback(*query))
+        if result.tier != "full" and owner is not deadline:
+            result = await asyncio.to_thread(self._recommend_within, *query)
+        return self._finish(result)
+
+    def get_recommendations(
+        self,
+        artwork_id=None,
+        user_id=None,
+        user_likes=None,
+        n_recommendations=10,
+        popularity=None,
+    ):
+        """Recommended artworks without a time budget (see recommend)"""
+        return self.recommend(
+            artwork_id, user_id, user_likes, n_recommendations, popularity
+        ).artworks
+
+    async def get_recommendations_async(
+        self,
+        artwork_id=None,
+        user_id=None,
+        user_likes=None,
+        n_recommendations=10,
+        popularity=None,
+    ):
+        """get_recommendations for async views"""
+        result = await self.recommend_async(
+            artwork_id, user_id, user_likes, n_recommendations, popularity
+        )
+        return result.artworks
+
+    @staticmethod
+    def _query_key(artwork_id, user_id, user_likes, n_recommendations, weights):
+        # Like counts only break ties in the popularity fallback, so queries
+        # that differ only in `popularity` are treated as identical
+        return (artwork_id, user_id, tuple(user_likes or ()), n_recommendations, weights)
+
+    @staticmethod
+    def _finish(result):
+        RECOMMENDATION_TIERS.labels(result.tier).inc()
+        return RecommendationResult(
+            [artwork.copy() for artwork in result.artworks], result.tier
+        )
+
+    def _recommend_within(
+        self,
+        artwork_id,
+        user_id,
+        user_likes,
+        n_recommendations,
+        popularity,
+        deadline,
+        weights=None,
+    ):
+        try:
+            recommendations = self._compute_recommendations(
+                artwork_id,
+                user_id,
+                user_likes,
+                n_recommendations,
+                popularity,
+                deadline,
+                weights,
+            )
+        except DeadlineExceeded:
+            return self._fallback(
+                artwork_id, user_id, user_likes, n_recommendations, popularity, deadline
+            )
+        return RecommendationResult(recommendations, "full")
+
+    def _similarity_row(self, artwork_id, deadline, weights=None):
+        """Cosine similarity of one artwork to the catalog, if it fits the deadline"""
+        if deadline is not None:
+            deadline.require(self._costs["row"] + self._costs["topn"])
+        started = time.perf_counter()
+        if weights is None:
+            similarities = cosine_similarity(
                 self.tfidf_matrix[artwork_id : artwork_id + 1], self.tfidf_matrix
             ).flatten()
+        else:
+            similarities = self.weighted_similarity_row(artwork_id, weights)
+        self._observe_cost("row", time.perf_counter() - started)
+        return similarities
 
-            # Apply user personalization if user_id provided
-            if user_id is not None and self.utility_matrix is not None:
-                user_preferences = self.get_user_preferences(user_id)
-                print(f"🎯 Personalizing for user {user_id} with {len(user_preferences)} liked artworks")
+    def resolve_weights(self, weights):
+        """
+        Validate per-characteristic weights ({"style": 1, "artist": 0}, missing
+        ones default to 1) into the tuple recommend() takes, or None when
+        they change nothing; raises ValueError
+        """
+        if weights is None:
+            return None
+        if not isinstance(weights, dict):
+            raise ValueError("weights must be an object mapping characteristics to numbers")
+        if self.field_columns is None:
+            raise ValueError("This model does not support per-characteristic weights")
+        unknown = set(weights) - set(self.field_columns)
+        if unknown:
+            raise ValueError(f"Unknown characteristics: {', '.join(sorted(unknown))}")
+
+        resolved = []
+        for field in self.field_columns:
+            try:
+                weight = float(weights.get(field, 1.0))
+            except (TypeError, ValueError):
+                raise ValueError(f"Weight for {field} must be a number")
+            if not weight >= 0:
+                raise ValueError(f"Weight for {field} must be non-negative")
+            resolved.append(weight)
+        if not any(resolved):
+            raise ValueError("At least one weight must be positive")
+        return None if all(weight == 1.0 for weight in resolved) else tuple(resolved)
+
+    def weighted_similarity_row(self, artwork_id, weights):
+        """
+        Similarity of one artwork to the catalog as sum(weight_f * partial_f),
+        where partial_f is characteristic f's share of the cosine similarity.
+        With unit rows this is one sparse product with the query row scaled
+        per column block; weights of 1 give the plain cosine similarity.
+        """
+        column_weights = np.ones(self.normalized_tfidf.shape[1])
+        for weight, columns in zip(weights, self.field_columns.values()):
+            column_weights[columns] = weight
+        query = self.normalized_tfidf[artwork_id].multiply(column_weights).tocsr()
+        return (self.normalized_tfidf @ query.T).toarray().ravel()
+
+    def _observe_cost(self, name, seconds):
+        # Exponentially weighted, so the estimate follows load
+        self._costs[name] += 0.2 * (seconds - self._costs[name])
+
+    def _user_ratings(self, user_id):
+        """{artwork id: first recorded rating} for one user"""
+        if user_id is None or self.utility_matrix is None:
+            return None
+        rows = self.utility_matrix[self.utility_matrix["user_id"] == user_id]
+        rows = rows.drop_duplicates("artwork_id")
+        return dict(zip(rows["artwork_id"].tolist(), rows["rating"].tolist()))
+
+    def _build_results(self, indices, scores, user_id):
+        ratings = self._user_ratings(user_id)
+        recommendations = []
+        for idx, score in zip(indices, scores):
+            artwork_info = self.metadata[idx].copy()
+            artwork_info["similarity_score"] = score
+            if ratings is not None:
+                artwork_info["user_rating"] = ratings.get(idx)
+            recommendations.append(artwork_info)
+        return recommendations
+
+    def _compute_recommendations(
+        self,
+        artwork_id,
+        user_id,
+        user_likes,
+        n_recommendations,
+        popularity,
+        deadline=None,
+        weights=None,
+    ):
+        if self.tfidf_matrix is None or not self.metadata:
+            return []
+
+        with phase("scoring"):
+            # SCENARIO 1: Content-based recommendation from specific artwork
+            if artwork_id is not None and artwork_id < len(self.metadata):
+                # Calculate base similarity
+                similarity_scores = self._similarity_row(artwork_id, deadline, weights)
+                if weights is None:
+                    self.neighbor_table.add(artwork_id, similarity_scores)
+
+                # Apply user personalization if user_id provided
+                if user_id is not None and self.utility_matrix is not None:
+                    user_preferences = self.get_user_preferences(user_id)
+                    logger.debug("Personalizing for user %s with %d liked artworks", user_id, len(user_preferences))
                 
-                # Boost similarity scores based on user's liked artworks
-                for liked_id in user_preferences:
-                    if 0 <= liked_id < len(similarity_scores):
-                        liked_similarity = cosine_similarity(
-                            self.tfidf_matrix[liked_id : liked_id + 1], self.tfidf_matrix
-                        ).flatten()
-                        similarity_scores += 0.3 * liked_similarity
-
-            # Apply manual user_likes boost (for backward compatibility)
-            if user_likes:
-                for liked_id in user_likes:
-                    if 0 <= liked_id < len(similarity_scores):
-                        liked_similarity = cosine_similarity(
-                            self.tfidf_matrix[liked_id : liked_id + 1], self.tfidf_matrix
-                        ).flatten()
-                        similarity_scores += 0.3 * liked_similarity
-
-        # SCENARIO 2: User-based recommendation (no specific artwork)
-        elif user_id is not None and self.utility_matrix is not None:
-            user_preferences = self.get_user_preferences(user_id)
-            print(f"🔍 Generating recommendations based on user {user_id} profile")
+                    # Boost similarity scores based on user's liked artworks
+                    for liked_id in user_preferences:
+                        if 0 <= liked_id < len(similarity_scores):
+                            liked_similarity = self._similarity_row(liked_id, deadline, weights)
+                            similarity_scores += 0.3 * liked_similarity
+
+                # Apply manual user_likes boost (for backward compatibility)
+                if user_likes:
+                    for liked_id in user_likes:
+                        if 0 <= liked_id < len(similarity_scores):
+                            liked_similarity = self._similarity_row(liked_id, deadline, weights)
+                            similarity_scores += 0.3 * liked_similarity
+
+            # SCENARIO 2: User-based recommendation (no specific artwork)
+            elif user_id is not None and self.utility_matrix is not None:
+                user_preferences = self.get_user_preferences(user_id)
+                logger.debug("Generating recommendations based on user %s profile", user_id)
             
-            if not user_preferences:
-                print("⚠️ User has no preferences - using random recommendations")
-                similarity_scores = np.random.rand(len(self.metadata))
-            else:
-                # Calculate average similarity to user's liked artworks
-                similarity_scores = np.zeros(len(self.metadata))
-                for liked_id in user_preferences:
-                    if 0 <= liked_id < len(self.metadata):
-                        liked_similarity = cosine_similarity(
-                            self.tfidf_matrix[liked_id : liked_id + 1], self.tfidf_matrix
-                        ).flatten()
-                        similarity_scores += liked_similarity
+                if not user_preferences and popularity is not None and popularity.any():
+                    logger.debug("User %s has no preferences - using popular artworks", user_id)
+                    similarity_scores = self.popularity_scores(popularity)
+                elif not user_preferences:
+                    logger.debug("User %s has no preferences - using random recommendations", user_id)
+                    similarity_scores = np.random.rand(len(self.metadata))
+                else:
+                    # Calculate average similarity to user's liked artworks
+                    similarity_scores = np.zeros(len(self.metadata))
+                    for liked_id in user_preferences:
+                        if 0 <= liked_id < len(self.metadata):
+                            liked_similarity = self._similarity_row(liked_id, deadline, weights)
+                            similarity_scores += liked_similarity
                 
-                similarity_scores /= len(user_preferences)  # Average
+                    similarity_scores /= len(user_preferences)  # Average
                 
-                # Penalize already rated items
-                user_interactions = self.utility_matrix[
-                    self.utility_matrix['user_id'] == user_id
-                ]['artwork_id'].tolist()
+                    # Penalize already rated items
+                    user_interactions = self.utility_matrix[
+                        self.utility_matrix['user_id'] == user_id
+                    ]['artwork_id'].tolist()
                 
-                for rated_id in user_interactions:
-                    if 0 <= rated_id < len(similarity_scores):
-                        similarity_scores[rated_id] *= 0.1  # Heavy penalty
+                    for rated_id in user_interactions:
+                        if 0 <= rated_id < len(similarity_scores):
+                            similarity_scores[rated_id] *= 0.1  # Heavy penalty
 
-        else:
-            # SCENARIO 3: No personalization - random or error
-            print("⚠️ No artwork_id or user_id provided")
-            return []
+            else:
+                # SCENARIO 3: No personalization - random or error
+                logger.debug("No artwork_id or user_id provided")
+                return []
 
-        # Get top recommendations
-        similar_indices = similarity_scores.argsort()[::-1]
-        recommendations = []
+        with phase("topn"):
+            started = time.perf_counter()
+            # Get top recommendations
+            similar_indices = similarity_scores.argsort()[::-1]
+            top_indices = []
+            for idx in similar_indices:
+                if len(top_indices) >= n_recommendations:
+                    break
+                if artwork_id is None or idx != artwork_id:
+                    top_indices.append(int(idx))
 
-        for idx in similar_indices:
-            if (artwork_id is None or idx != artwork_id) and len(recommendations) < n_recommendations:
-                artwork_info = self.metadata[idx].copy()
-                artwork_info["similarity_score"] = float(similarity_scores[idx])
-                
-                # Add user rating info if available
-                if user_id is not None and self.utility_matrix is not None:
-                    user_rating = self.utility_matrix[
-                        (self.utility_matrix['user_id'] == user_id) & 
-                        (self.utility_matrix['artwork_id'] == idx)
-                    ]
-                    artwork_info['user_rating'] = user_rating['rating'].iloc[0] if len(user_rating) > 0 else None
-                
-                recommendations.append(artwork_info)
+            user_id = user_id if self.utility_matrix is not None else None
+            recommendations = self._build_results(
+                top_indices, similarity_scores[top_indices], user_id
+            )
+            self._observe_cost("topn", time.perf_counter() - started)
 
         return recommendations
 
+    def _fallback(
+        self,
+        artwork_id,
+        user_id,
+        user_likes,
+        n_recommendations,
+        popularity,
+        deadline,
+        weights=None,
+    ):
+        """Cheaper tiers: the neighbor table, then popularity (both unweighted)"""
+        if self.tfidf_matrix is None or not self.metadata:
+            return RecommendationResult([], "popularity")
+
+        with phase("fallback"):
+            n_artworks = len(self.metadata)
+            liked = [i for i in (user_likes or ()) if 0 <= i < n_artworks]
+            if user_id is not None and self.utility_matrix is not None and (
+                deadline is None or not deadline.expired()
+            ):
+                liked.extend(self.get_user_preferences(user_id))
+
+            # Same weighting as the full tier: the artwork itself plus 0.3 per
+            # like, or the average over likes for user-only queries
+            seeds = {}
+            has_artwork = artwork_id is not None and 0 <= artwork_id < n_artworks
+            if has_artwork:
+                seeds[artwork_id] = 1.0
+            like_weight = 0.3 if has_artwork else 1.0 / max(len(liked), 1)
+            for liked_id in liked:
+                seeds[liked_id] = seeds.get(liked_id, 0.0) + like_weight
+
+            neighbor_ids, weighted = [], []
+            for seed, weight in seeds.items():
+                row = self.neighbor_table.get(seed)
+                if row is not None:
+                    neighbor_ids.append(row[0])
+                    weighted.append(weight * row[1].astype(np.float64))
+
+            candidates = np.array([], dtype=np.int64)
+            if neighbor_ids:
+                candidates, positions = np.unique(
+                    np.concatenate(neighbor_ids), return_inverse=True
+                )
+                candidate_scores = np.bincount(positions, weights=np.concatenate(weighted))
+                if has_artwork:
+                    keep = candidates != artwork_id
+                    candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+
+            if len(candidates):
+                tier = "neighbors"
+                order = np.argsort(-candidate_scores, kind="stable")[:n_recommendations]
+                indices = candidates[order].tolist()
+                top_scores = candidate_scores[order]
+            else:
+                tier = "popularity"
+                if popularity is not None and popularity.any():
+                    all_scores = self.popularity_scores(popularity)
+                else:
+                    all_scores = np.random.rand(n_artworks)
+                if has_artwork:
+                    all_scores[artwork_id] = -1.0
+                count = min(n_recommendations, n_artworks)
+                indices = np.argpartition(-all_scores, count - 1)[:count]
+                indices = indices[np.argsort(-all_scores[indices])].tolist()
+                top_scores = all_scores[indices]
+
+            user_id = user_id if self.utility_matrix is not None else None
+            return RecommendationResult(
+                self._build_results(indices, top_scores, user_id), tier
+            )
+
+    def popularity_scores(self, popularity):
+        """
+        Scores in [0, 1) that rank artworks by like count; the fractional
+        random part only breaks ties
+        """
+        counts = np.zeros(len(self.metadata))
+        size = min(len(popularity), len(counts))
+        counts[:size] = popularity[:size]
+        return (counts + np.random.rand(len(counts)) * 0.5) / (counts.max() + 1)
+
     def get_artwork_by_id(self, artwork_id):
         """Get artwork metadata by ID"""
         if 0 <= artwork_id < len(self.metadata):
             return self.metadata[artwork_id]
         return None
 
+    def get_artworks_by_ids(self, artwork_ids):
+        """
+        Metadata for many artwork ids in one pass over the sorted id index,
+        in the given order; None for ids not in the catalog
+        """
+        ids = np.asarray(artwork_ids, dtype=np.int64)
+        if not len(ids) or not len(self.artwork_ids):
+            return [None] * len(ids)
+        positions = np.searchsorted(self.artwork_ids, ids)
+        positions = np.minimum(positions, len(self.artwork_ids) - 1)
+        found = self.artwork_ids[positions] == ids
+        return [
+            self.metadata[position] if hit else None
+            for position, hit in zip(positions.tolist(), found.tolist())
+        ]
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Free-text search over artist, style and genre names (see
+        search_index.py). Returns the search result with `artworks` (copies
+        carrying `search_score`) in place of catalog rows.
+        """
+        if self.search_index is None:
+            return {"artworks": [], "total": 0, "matched": {}, "unmatched": []}
+
+        with phase("search"):
+            result = self.search_index.search(query, limit, offset)
+        artworks = []
+        for row, score in zip(result.pop("rows"), result.pop("scores")):
+            artwork = self.metadata[row].copy()
+            artwork["search_score"] = score
+            artworks.append(artwork)
+        result["artworks"] = artworks
+        return result
+
+    def get_artworks_after(self, after_id=None, limit=20):
+        """
+        Keyset pagination over the catalog: return up to `limit` artworks with
+        id > after_id, plus whether more artworks follow
+        """
+        start = 0
+        if after_id is not None:
+            start = int(np.searchsorted(self.artwork_ids, after_id, side="right"))
+        end = start + limit
+        return self.metadata[start:end], end < len(self.metadata)
+
+    def get_memory_usage(self):
+        """
+        Approximate bytes held by each loaded artifact and index. The
+        artifacts read from disk are measured once per load; the neighbor
+        table keeps growing while serving, so it is measured on every call.
+        """
+        if self._memory_usage is None:
+            artifacts = {
+                "tfidf_matrix": self.tfidf_matrix,
+                "metadata": self.metadata,
+                "utility_matrix": self.utility_matrix,
+                "vectorizer": self.vectorizer,
+                "artwork_ids": self.artwork_ids,
+                "enrichment_store": self.enrichment_store,
+                "search_index": self.search_index,
+            }
+            self._memory_usage = {
+                name: deep_sizeof(value) if value is not None else 0
+                for name, value in artifacts.items()
+            }
+        usage = dict(self._memory_usage)
+        usage["neighbor_table"] = self.neighbor_table.nbytes
+        usage["total"] = sum(usage.values())
+        return usage
+
     def get_model_stats(self):
         """Get model statistics"""
-        return self.model_info if self.model_info else {"n_artworks": 0}
+        stats = dict(self.model_info) if self.model_info else {"n_artworks": 0}
+        stats["loaded_version"] = self.model_version
+        stats["memory_bytes"] = self.get_memory_usage()
+        stats["load_seconds"] = {
+            name: round(seconds, 6) for name, seconds in self.load_seconds.items()
+        }
+        stats["process_rss_bytes"] = read_resident_memory()
+        return stats
+
+
+def compute_model_version(models_path, model_info):
+    """
+    Build a version string from model_info plus a digest of the catalog
+    and matrix files, so retraining or appending always changes it
+    """
+    digest = hashlib.sha1()
+    for filename in ("metadata.json", "tfidf_matrix.npz"):
+        with open(os.path.join(models_path, filename), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+    base_version = model_info.get("model_version", "0")
+    return f"{base_version}-{digest.hexdigest()[:12]}"
 
 
 # Create singleton instance
 recommender_instance = None
+_reload_lock = threading.Lock()
+_last_reload_check = 0.0
 
 
 def get_recommender():
-    """Get or create recommender instance"""
-    global recommender_instance
+    """
+    Get or create recommender instance, reloading it when the model files
+    change on disk (checked every RECOMMENDER_RELOAD_CHECK_INTERVAL seconds)
+    """
+    with phase("model"):
+        return _get_or_reload_recommender()
+
+
+def _get_or_reload_recommender():
+    global recommender_instance, _last_reload_check
     if recommender_instance is None:
+        with _reload_lock:
+            if recommender_instance is None:
+                recommender_instance = ArtworkRecommender()
+        return recommender_instance
+
+    interval = getattr(settings, "RECOMMENDER_RELOAD_CHECK_INTERVAL", 0)
+    now = time.monotonic()
+    if interval and now - _last_reload_check >= interval:
+        _last_reload_check = now
+        if recommender_instance.artifacts_changed():
+            reload_recommender()
+    return recommender_instance
+
+
+def reload_recommender():
+    """Load a fresh recommender and swap it in; requests in flight keep the old one"""
+    global recommender_instance
+    with _reload_lock:
         recommender_instance = ArtworkRecommender()
     return recommender_instance
@@ -0,0 +1,158 @@
+"""
+Nearest-neighbor table for the `neighbors` recommendation tier
+
+NeighborTable keeps the k most similar artworks of each artwork. Small
+catalogs (up to RECOMMENDATION_NEIGHBOR_PRECOMPUTE_MAX artworks) are
+precomputed at model load; otherwise rows are added whenever a full
+similarity row is computed anyway, so popular artworks are covered first.
+The table therefore grows while serving; nbytes tracks its size as it does.
+
+A precomputed table is persisted next to the model files as `neighbors.npz`
+and extended by `pipeline.update_catalog append`, so appending artworks
+does not make every worker recompute it.
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Bump whenever the persisted layout changes
+NEIGHBORS_FORMAT_VERSION = 1
+
+NEIGHBORS_FILENAME = "neighbors.npz"
+
+
+class NeighborTable:
+    def __init__(self, k=50, max_entries=100_000):
+        self.k = k
+        self.max_entries = max_entries
+        self._rows = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the stored rows"""
+        return self._nbytes + sys.getsizeof(self._rows)
+
+    def get(self, artwork_id):
+        """(neighbor ids, similarities) by descending similarity, or None"""
+        return self._rows.get(artwork_id)
+
+    def add(self, artwork_id, similarities):
+        """Keep the top-k of one full similarity row"""
+        k = min(self.k + 1, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[top != artwork_id]
+        top = top[np.argsort(-similarities[top], kind="stable")][: self.k]
+        self._store(artwork_id, top, similarities[top])
+
+    def precompute(self, matrix, chunk_size=256, first_row=0):
+        """Fill the table for every row (from first_row on) of a TF-IDF matrix"""
+        n_rows = matrix.shape[0]
+        k = min(self.k + 1, n_rows)
+        for start in range(first_row, n_rows, chunk_size):
+            similarities = cosine_similarity(matrix[start : start + chunk_size], matrix)
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            for offset, row in enumerate(candidates):
+                artwork_id = start + offset
+                row = row[row != artwork_id]
+                scores = similarities[offset, row]
+                order = np.argsort(-scores, kind="stable")[: self.k]
+                self._store(artwork_id, row[order], scores[order])
+
+    def extend(self, matrix, first_row, chunk_size=256):
+        """
+        Cover rows appended to a precomputed matrix (first_row onwards) and
+        let them into the neighbor lists of the rows already stored
+        """
+        self.precompute(matrix, chunk_size, first_row)
+        new_ids = np.arange(first_row, matrix.shape[0], dtype=np.int64)
+        new_rows = matrix[first_row:]
+        for start in range(0, first_row, chunk_size):
+            end = min(start + chunk_size, first_row)
+            similarities = cosine_similarity(matrix[start:end], new_rows)
+            for offset, row_similarities in enumerate(similarities):
+                artwork_id = start + offset
+                current = self._rows.get(artwork_id)
+                if current is None:
+                    continue
+                neighbor_ids = np.concatenate([current[0], new_ids])
+                scores = np.concatenate([current[1], row_similarities])
+                order = np.argsort(-scores, kind="stable")[: self.k]
+                self._store(artwork_id, neighbor_ids[order], scores[order])
+
+    @classmethod
+    def load(cls, path, model_version, k=50, max_entries=100_000):
+        """Load a persisted table, or return None if missing, stale or a different k"""
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path, allow_pickle=False) as data:
+            if (
+                int(data["format_version"]) != NEIGHBORS_FORMAT_VERSION
+                or str(data["model_version"]) != model_version
+                or int(data["k"]) != k
+            ):
+                return None
+            table = cls(k=k, max_entries=max_entries)
+            for artwork_id, count, neighbor_ids, similarities in zip(
+                data["artwork_ids"].tolist(),
+                data["counts"],
+                data["neighbor_ids"],
+                data["similarities"],
+            ):
+                table._store(artwork_id, neighbor_ids[:count], similarities[:count])
+        return table
+
+    def save(self, path, model_version):
+        """Persist the table atomically next to the model files"""
+        with self._lock:
+            rows = sorted(self._rows.items())
+        neighbor_ids = np.full((len(rows), self.k), -1, dtype=np.int64)
+        similarities = np.zeros((len(rows), self.k), dtype=np.float32)
+        counts = np.zeros(len(rows), dtype=np.int64)
+        for position, (_, (ids, scores)) in enumerate(rows):
+            counts[position] = len(ids)
+            neighbor_ids[position, : len(ids)] = ids
+            similarities[position, : len(ids)] = scores
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                format_version=NEIGHBORS_FORMAT_VERSION,
+                model_version=model_version,
+                k=self.k,
+                artwork_ids=np.array([artwork_id for artwork_id, _ in rows], dtype=np.int64),
+                counts=counts,
+                neighbor_ids=neighbor_ids,
+                similarities=similarities,
+            )
+        os.replace(tmp_path, path)
+
+    def _store(self, artwork_id, neighbor_ids, similarities):
+        row = (neighbor_ids.astype(np.int64), similarities.astype(np.float32))
+        with self._lock:
+            if artwork_id not in self._rows and len(self._rows) >= self.max_entries:
+                self._nbytes -= _row_nbytes(self._rows.pop(next(iter(self._rows))))
+            previous = self._rows.get(artwork_id)
+            if previous is not None:
+                self._nbytes -= _row_nbytes(previous)
+            self._rows[artwork_id] = row
+            self._nbytes += _row_nbytes(row)
+
+
+def _row_nbytes(row):
+    neighbor_ids, similarities = row
+    return (
+        sys.getsizeof(row)
+        + sys.getsizeof(neighbor_ids)
+        + sys.getsizeof(similarities)
+    )
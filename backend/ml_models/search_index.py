@@ -0,0 +1,444 @@
+"""
+Inverted index behind attribute and free-text search (/api/search?q=)
+
+Every artwork carries one feature term per characteristic (artist_4,
+style_1, genre_2, as in the TF-IDF vocabulary). The index keeps, per term,
+the sorted catalog rows that contain it (posting list) with each row's
+TF-IDF weight for the term: the fitted vectorizer's idf (smoothed idf
+from document frequencies for terms outside its vocabulary),
+l2-normalized per artwork, as TfidfVectorizer computes it.
+
+Queries are resolved through a name index: the lowercase, accent-free
+tokens of each term's display name ("claude", "monet", "post",
+"impressionism", "postimpressionism") and of the term itself, kept
+sorted so a query token prefix-matches with two binary searches.
+Display names of WikiArt ids come from WikiArtAPIClient; catalogs
+trained on string labels ("Claude Monet") name each term after its
+label, as it appears in the vectorizer vocabulary. Each query token
+selects the terms it names best (whole names beat name words, which
+beat prefixes); artworks must match every resolved token (posting-list
+intersection) and are ranked by the sum of their weights for the
+matched terms.
+
+The index is built once per model version and persisted next to the model
+files as `search_index.npz`. `pipeline.update_catalog append` extends it in
+place: existing terms keep their idf, as appended TF-IDF rows do, until the
+next `compact` retrains and the index is rebuilt.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the index layout or tokenization changes, so previously
+# persisted indexes are rebuilt
+SEARCH_INDEX_FORMAT_VERSION = 4
+
+SEARCH_INDEX_FILENAME = "search_index.npz"
+
+CHARACTERISTICS = ("artist", "style", "genre")
+
+# Name match quality: whole name, one word of the name, prefix of a word
+MATCH_NAME, MATCH_WORD, MATCH_PREFIX = 2, 1, 0
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents ("Dalí" -> "dali")"""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Query tokens, de-duplicated in order"""
+    return list(dict.fromkeys(re.findall(r"[a-z0-9_]+", normalize_text(text))))
+
+
+def feature_term(characteristic: str, value) -> str:
+    """Feature term of an attribute value, as the training pipeline writes it"""
+    return f"{characteristic}_{str(value).replace(' ', '_').replace('-', '_')}".lower()
+
+
+def term_display_name(client, characteristic: str, value) -> str:
+    """
+    Human-readable name of an attribute value: the WikiArt name of an id,
+    the label itself when the value is not an id, or "" for unknown ids
+    """
+    value = str(value)
+    if value.isdigit():
+        if characteristic == "artist":
+            return client.artists.get(value, {}).get("name", "")
+        if characteristic == "genre":
+            return client.genres.get(value, "")
+        return client.styles.get(value, "")
+    return value.replace("_", " ")
+
+
+def artwork_terms(artwork: Dict):
+    """(slot, characteristic, value, term) of each known attribute of an artwork"""
+    for slot, characteristic in enumerate(CHARACTERISTICS):
+        value = artwork.get(characteristic)
+        if value is None or str(value).lower() == "unknown":
+            continue
+        yield slot, characteristic, value, feature_term(characteristic, value)
+
+
+def name_entries(term: str, name: str) -> Dict[str, int]:
+    """
+    Name index keys of one term with their match quality: every word of
+    the display name, the whole name with separators removed, and the
+    feature term itself
+    """
+    words = tokenize(name)
+    entries = {term: MATCH_NAME}
+    if words:
+        entries["".join(words)] = MATCH_NAME
+    for word in words:
+        entries.setdefault(word, MATCH_WORD)
+    return entries
+
+
+def smoothed_idf(n_rows: int, document_frequency: np.ndarray) -> np.ndarray:
+    """Smoothed idf, as TfidfVectorizer(smooth_idf=True) computes it"""
+    return np.log((1 + n_rows) / (1 + document_frequency)) + 1
+
+
+def term_idf(vectorizer, terms: List[str], fallback: np.ndarray) -> np.ndarray:
+    """
+    Idf of each term as the fitted vectorizer weighs it, so search ranks
+    like the TF-IDF matrix; fallback where the vectorizer has no vocabulary
+    (hashed features) or does not know the term
+    """
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    fitted = getattr(vectorizer, "idf_", None)
+    if not vocabulary or fitted is None:
+        return fallback
+
+    idf = np.array(fallback, dtype=np.float64)
+    for i, term in enumerate(terms):
+        column = vocabulary.get(term)
+        if column is not None:
+            idf[i] = fitted[column]
+    return idf
+
+
+class SearchIndex:
+    """Posting lists per feature term plus a sorted name index"""
+
+    def __init__(
+        self,
+        model_version: str,
+        terms: np.ndarray,
+        names: np.ndarray,
+        idf: np.ndarray,
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+        name_keys: np.ndarray,
+        name_terms: np.ndarray,
+        name_quality: np.ndarray,
+    ):
+        self.model_version = model_version
+        self.terms = terms
+        self.names = names
+        self.idf = idf
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+        self.name_keys = name_keys
+        self.name_terms = name_terms
+        self.name_quality = name_quality
+
+    def __len__(self):
+        return len(self.terms)
+
+    def postings(self, term_index: int):
+        """(sorted rows, weights) of one term"""
+        start, end = self.indptr[term_index], self.indptr[term_index + 1]
+        return self.rows[start:end], self.weights[start:end]
+
+    def resolve(self, token: str) -> List[int]:
+        """Indexes of the terms a query token names best, or [] when none"""
+        start = np.searchsorted(self.name_keys, token, side="left")
+        end = np.searchsorted(self.name_keys, token + "\uffff", side="left")
+        if start == end:
+            return []
+
+        quality = np.where(
+            self.name_keys[start:end] == token, self.name_quality[start:end], MATCH_PREFIX
+        )
+        best = self.name_terms[start:end][quality == quality.max()]
+        return sorted(set(best.tolist()))
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Rank catalog rows for a free-text query. Returns {"rows", "scores",
+        "total", "matched", "unmatched"}, where matched maps each resolved
+        token to the terms it selected.
+        """
+        matched = {}
+        unmatched = []
+        groups = []
+        for token in tokenize(query):
+            term_indexes = self.resolve(token)
+            if not term_indexes:
+                unmatched.append(token)
+                continue
+            matched[token] = [str(self.terms[i]) for i in term_indexes]
+            # "claude monet" resolves both tokens to one term: intersect once
+            if term_indexes not in groups:
+                groups.append(term_indexes)
+
+        result = {"rows": [], "scores": [], "total": 0, "matched": matched, "unmatched": unmatched}
+        if not groups:
+            return result
+
+        # Union within a token, intersection across tokens, smallest first
+        candidates = None
+        group_rows = sorted(
+            (
+                self.postings(term_indexes[0])[0]
+                if len(term_indexes) == 1
+                else np.unique(np.concatenate([self.postings(i)[0] for i in term_indexes]))
+                for term_indexes in groups
+            ),
+            key=len,
+        )
+        for rows in group_rows:
+            candidates = (
+                rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+            )
+            if not len(candidates):
+                return result
+
+        scores = np.zeros(len(candidates), dtype=np.float64)
+        for term_index in sorted({i for term_indexes in groups for i in term_indexes}):
+            rows, weights = self.postings(term_index)
+            positions = np.searchsorted(rows, candidates)
+            positions[positions == len(rows)] = 0
+            hits = rows[positions] == candidates
+            scores[hits] += weights[positions[hits]]
+
+        # Best scores first, ties in catalog order; only sort what is returned
+        end = min(offset + limit, len(candidates))
+        if offset >= end:
+            top = np.array([], dtype=np.int64)
+        elif end < len(candidates):
+            # Everything above the end-th score, then the earliest ties
+            cutoff = -np.partition(-scores, end - 1)[end - 1]
+            above = np.flatnonzero(scores > cutoff)
+            ties = np.flatnonzero(scores == cutoff)[: end - len(above)]
+            top = np.concatenate([above, ties])
+            top = top[np.lexsort((candidates[top], -scores[top]))][offset:]
+        else:
+            top = np.lexsort((candidates, -scores))[offset:end]
+
+        result.update(
+            rows=candidates[top].tolist(),
+            scores=scores[top].tolist(),
+            total=int(len(candidates)),
+        )
+        return result
+
+    @classmethod
+    def build(cls, metadata: List[Dict], client, model_version: str, vectorizer=None):
+        """Build posting lists and the name index for the whole catalog"""
+        n_rows = len(metadata)
+        term_ids = {}
+        term_rows = []
+        names = []
+        row_terms = np.full((n_rows, len(CHARACTERISTICS)), -1, dtype=np.int64)
+
+        for row, artwork in enumerate(metadata):
+            for slot, characteristic, value, term in artwork_terms(artwork):
+                term_index = term_ids.get(term)
+                if term_index is None:
+                    term_index = term_ids[term] = len(term_rows)
+                    term_rows.append([])
+                    names.append(term_display_name(client, characteristic, value))
+                term_rows[term_index].append(row)
+                row_terms[row, slot] = term_index
+
+        # Fitted idf and per-artwork l2 norm, as TfidfVectorizer(norm="l2")
+        document_frequency = np.array([len(rows) for rows in term_rows], dtype=np.float64)
+        idf = term_idf(vectorizer, list(term_ids), smoothed_idf(n_rows, document_frequency))
+        present = row_terms >= 0
+        row_idf = np.where(present, idf[np.where(present, row_terms, 0)], 0.0)
+        row_norms = np.sqrt((row_idf**2).sum(axis=1))
+        row_norms[row_norms == 0] = 1.0
+
+        indptr = np.zeros(len(term_rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(document_frequency, dtype=np.int64)
+        rows = np.array([row for rows in term_rows for row in rows], dtype=np.int64)
+        term_of_posting = np.repeat(np.arange(len(term_rows)), np.diff(indptr))
+        weights = (idf[term_of_posting] / row_norms[rows]).astype(np.float32)
+
+        keys = {}
+        for term, term_index in term_ids.items():
+            for key, quality in name_entries(term, names[term_index]).items():
+                keys[(key, term_index)] = quality
+        ordered = sorted(keys.items())
+
+        return cls(
+            model_version,
+            terms=np.array(list(term_ids), dtype=str),
+            names=np.array(names, dtype=str),
+            idf=idf,
+            indptr=indptr,
+            rows=rows,
+            weights=weights,
+            name_keys=np.array([key for (key, _), _ in ordered], dtype=str),
+            name_terms=np.array([term_index for (_, term_index), _ in ordered], dtype=np.int64),
+            name_quality=np.array([quality for _, quality in ordered], dtype=np.int8),
+        )
+
+    def extend(
+        self, metadata: List[Dict], first_row: int, client, model_version: str, vectorizer=None
+    ) -> None:
+        """
+        Add newly appended artworks (catalog rows first_row onwards) and
+        retag the index. Known terms keep their idf; new terms get the
+        vectorizer's, or one from the grown catalog when it does not know
+        them.
+        """
+        term_ids = {term: term_index for term_index, term in enumerate(self.terms.tolist())}
+        new_names = []
+        posting_terms = []
+        posting_rows = []
+        for offset, artwork in enumerate(metadata):
+            for _, characteristic, value, term in artwork_terms(artwork):
+                term_index = term_ids.get(term)
+                if term_index is None:
+                    term_index = term_ids[term] = len(self.terms) + len(new_names)
+                    new_names.append(term_display_name(client, characteristic, value))
+                posting_terms.append(term_index)
+                posting_rows.append(first_row + offset)
+
+        posting_terms = np.array(posting_terms, dtype=np.int64)
+        posting_rows = np.array(posting_rows, dtype=np.int64)
+        n_terms = len(term_ids)
+        new_frequency = np.bincount(posting_terms, minlength=n_terms)[len(self.terms) :]
+        new_idf = term_idf(
+            vectorizer,
+            list(term_ids)[len(self.terms) :],
+            smoothed_idf(first_row + len(metadata), new_frequency.astype(np.float64)),
+        )
+        idf = np.concatenate([self.idf, new_idf])
+
+        row_norms = np.sqrt(
+            np.bincount(posting_rows - first_row, idf[posting_terms] ** 2, minlength=len(metadata))
+        )
+        row_norms[row_norms == 0] = 1.0
+        new_weights = (idf[posting_terms] / row_norms[posting_rows - first_row]).astype(np.float32)
+
+        # New rows sort after every existing row, so a stable sort by term
+        # keeps each posting list in row order
+        old_terms = np.repeat(np.arange(len(self.terms)), np.diff(self.indptr))
+        all_terms = np.concatenate([old_terms, posting_terms])
+        order = np.argsort(all_terms, kind="stable")
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(all_terms, minlength=n_terms))
+
+        new_keys = [
+            (key, term_index, quality)
+            for term, term_index in term_ids.items()
+            if term_index >= len(self.terms)
+            for key, quality in name_entries(term, new_names[term_index - len(self.terms)]).items()
+        ]
+        name_keys = np.concatenate(
+            [self.name_keys, np.array([key for key, _, _ in new_keys], dtype=str)]
+        )
+        name_terms = np.concatenate(
+            [self.name_terms, np.array([term for _, term, _ in new_keys], dtype=np.int64)]
+        )
+        name_quality = np.concatenate(
+            [self.name_quality, np.array([quality for _, _, quality in new_keys], dtype=np.int8)]
+        )
+        name_order = np.lexsort((name_terms, name_keys))
+
+        self.terms = np.array(list(term_ids), dtype=str)
+        self.names = np.concatenate([self.names, np.array(new_names, dtype=str)])
+        self.idf = idf
+        self.indptr = indptr
+        self.rows = np.concatenate([self.rows, posting_rows])[order]
+        self.weights = np.concatenate([self.weights, new_weights])[order]
+        self.name_keys = name_keys[name_order]
+        self.name_terms = name_terms[name_order]
+        self.name_quality = name_quality[name_order]
+        self.model_version = model_version
+
+    @classmethod
+    def load(cls, path: str, model_version: str):
+        """Load a persisted index, or return None if missing or stale"""
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path, allow_pickle=False) as data:
+            if (
+                int(data["format_version"]) != SEARCH_INDEX_FORMAT_VERSION
+                or str(data["model_version"]) != model_version
+            ):
+                return None
+            return cls(
+                model_version,
+                **{
+                    name: data[name]
+                    for name in (
+                        "terms",
+                        "names",
+                        "idf",
+                        "indptr",
+                        "rows",
+                        "weights",
+                        "name_keys",
+                        "name_terms",
+                        "name_quality",
+                    )
+                },
+            )
+
+    def save(self, path: str) -> None:
+        """Persist the index atomically next to the model files"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                format_version=SEARCH_INDEX_FORMAT_VERSION,
+                model_version=self.model_version,
+                terms=self.terms,
+                names=self.names,
+                idf=self.idf,
+                indptr=self.indptr,
+                rows=self.rows,
+                weights=self.weights,
+                name_keys=self.name_keys,
+                name_terms=self.name_terms,
+                name_quality=self.name_quality,
+            )
+        os.replace(tmp_path, path)
+
+
+def load_or_build_index(
+    models_path: str, metadata: List[Dict], client, model_version: str, vectorizer=None
+):
+    """
+    Load the persisted search index for this model version, building and
+    saving a fresh one when it is missing or stale
+    """
+    path = os.path.join(models_path, SEARCH_INDEX_FILENAME)
+    index = SearchIndex.load(path, model_version)
+    if index is not None:
+        return index
+
+    index = SearchIndex.build(metadata, client, model_version, vectorizer)
+    try:
+        index.save(path)
+    except OSError as e:
+        # Read-only deployments still get the in-memory index
+        logger.warning("Could not persist search index: %s", e)
+    return index
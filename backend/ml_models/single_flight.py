@@ -0,0 +1,87 @@
+"""
+Single-flight coalescing of identical concurrent calls
+
+SingleFlight.do(key, fn) runs fn once per key at a time: callers that
+arrive while a call with the same key is in flight wait for it and get its
+result (or its exception) instead of repeating the work. do_async is the
+asyncio counterpart; it runs fn in the loop's default executor and awaits
+the shared result without blocking the event loop. Threads and coroutines
+share the same in-flight calls.
+
+Leader and coalesced calls are counted in artapi_single_flight_total and,
+as the group's hit rate, in artapi_cache_requests_total{cache=<group>}
+(coalesced = hit); waiting shows up as the `coalesced` Server-Timing phase.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from backend.metrics import CACHE_REQUESTS, registry
+from backend.timing import phase
+
+SINGLE_FLIGHT_CALLS = registry.counter(
+    "artapi_single_flight_total",
+    "Calls through single-flight groups, by whether they ran (leader) or waited (coalesced)",
+    ("group", "result"),
+)
+
+
+class SingleFlight:
+    def __init__(self, group):
+        self.group = group
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key):
+        """(future, True) for the caller that must run the call, else (future, False)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                SINGLE_FLIGHT_CALLS.labels(self.group, "coalesced").inc()
+                CACHE_REQUESTS.labels(self.group, "hit").inc()
+                return future, False
+            future = self._calls[key] = Future()
+        SINGLE_FLIGHT_CALLS.labels(self.group, "leader").inc()
+        CACHE_REQUESTS.labels(self.group, "miss").inc()
+        return future, True
+
+    def _run(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+        else:
+            self._forget(key)
+            future.set_result(result)
+
+    def _forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn, or wait for the in-flight call with the same key; waiters
+        give up with TimeoutError after `timeout` seconds
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+            return future.result()
+        with phase("coalesced"):
+            return future.result(timeout)
+
+    async def do_async(self, key, fn, timeout=None):
+        """asyncio variant of do(); fn runs in the default executor"""
+        future, leader = self._join(key)
+        if leader:
+            await asyncio.to_thread(self._run, key, future, fn)
+            return future.result()
+        with phase("coalesced"):
+            # shield: a timed-out waiter must not cancel the shared future
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
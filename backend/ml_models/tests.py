@@ -0,0 +1,515 @@
+import asyncio
+import io
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from scipy.sparse import load_npz
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from backend.metrics import CACHE_REQUESTS
+from pipeline.training_script import TOKEN_PATTERN, build_artwork, parse_args, train
+from pipeline.update_catalog import append_artworks
+
+from .deadlines import Deadline
+from .enrichment_store import ENRICHMENT_FILENAME, EnrichmentStore, load_or_build_store
+from .image_health import IMAGE_HEALTH_FILENAME, ImageHealthChecker, pick_healthy_image
+from .model_loader import ArtworkRecommender, get_recommender
+from .neighbors import NEIGHBORS_FILENAME, NeighborTable
+from .search_index import SEARCH_INDEX_FILENAME, SearchIndex
+from .wikiart_api_client import WikiArtAPIClient
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """
+    /ok -> 200, /missing -> 404, /throttled -> 429 with Retry-After once,
+    then 200, /no-head -> 405 for HEAD and 200 for GET
+    """
+
+    def do_HEAD(self):
+        self.server.requests[("HEAD", self.path)] += 1
+        if self.path == "/no-head":
+            self._reply(405)
+        elif self.path == "/throttled" and self.server.requests[("HEAD", self.path)] == 1:
+            self._reply(429, {"Retry-After": "1"})
+        else:
+            self._reply(200 if self.path in ("/ok", "/throttled") else 404)
+
+    def do_GET(self):
+        self.server.requests[("GET", self.path)] += 1
+        self._reply(200 if self.path == "/no-head" else 404)
+
+    def _reply(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageHealthCheckerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+        cls.server.requests = Counter()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.checker = ImageHealthChecker(backoff=0.01, timeout=2)
+
+    def tearDown(self):
+        self.checker.close()
+
+    def test_ok_and_missing(self):
+        self.assertEqual(self.checker.check_url(f"{self.base_url}/ok")["status"], 200)
+        result = self.checker.check_url(f"{self.base_url}/missing")
+        self.assertEqual((result["ok"], result["status"]), (False, 404))
+
+    def test_throttled_backs_off_for_retry_after(self):
+        started = time.monotonic()
+        result = self.checker.check_url(f"{self.base_url}/throttled")
+        self.assertTrue(result["ok"])
+        self.assertGreaterEqual(time.monotonic() - started, 1.0)
+        self.assertEqual(self.server.requests[("HEAD", "/throttled")], 2)
+
+    def test_head_not_allowed_falls_back_to_get(self):
+        result = self.checker.check_url(f"{self.base_url}/no-head")
+        self.assertTrue(result["ok"])
+        self.assertEqual(self.server.requests[("GET", "/no-head")], 1)
+
+    def test_fresh_results_come_from_the_cache(self):
+        urls = [f"{self.base_url}/ok", f"{self.base_url}/missing"]
+        expected = {urls[0]: True, urls[1]: False}
+        self.assertEqual(self.checker.check_many(urls), expected)
+        self.assertEqual(self.checker.check_many(urls), expected)
+        self.assertEqual(self.server.requests[("HEAD", "/ok")], 1)
+
+        # Entries older than the TTL are checked again
+        expired = ImageHealthChecker(ttl=0, backoff=0.01, timeout=2)
+        expired._cache = dict(self.checker._cache)
+        time.sleep(0.01)
+        expired.check_many(urls)
+        expired.close()
+        self.assertEqual(self.server.requests[("HEAD", "/ok")], 2)
+
+    def test_broken_image_is_replaced_by_a_healthy_alternative(self):
+        row = WikiArtAPIClient().get_artwork_by_ids(7, "4", "2", "1")
+        alternatives = row["cdn_alternatives"]
+        self.assertNotIn(row["image_url"], alternatives)
+        self.assertEqual(len(set(alternatives)), len(alternatives))
+
+        health = {row["image_url"]: False, alternatives[0]: False, alternatives[1]: True}
+        self.assertEqual(pick_healthy_image(row, health)["image_url"], alternatives[1])
+        self.assertIs(pick_healthy_image(row, {row["image_url"]: True}), row)
+
+    def test_rebuilt_store_reapplies_cached_health(self):
+        models_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, models_path, True)
+        client = WikiArtAPIClient()
+        row = client.get_artwork_by_ids(7, "4", "2", "1")
+        alternative = row["cdn_alternatives"][0]
+        with open(os.path.join(models_path, IMAGE_HEALTH_FILENAME), "w") as f:
+            json.dump(
+                {
+                    row["image_url"]: {"ok": False, "status": 404, "checked_at": 0},
+                    alternative: {"ok": True, "status": 200, "checked_at": 0},
+                },
+                f,
+            )
+
+        metadata = [{"id": 7, "artist": "4", "genre": "2", "style": "1"}]
+        store = load_or_build_store(models_path, metadata, client, "rebuilt")
+        self.assertEqual(store.lookup(7, "4", "2", "1")["image_url"], alternative)
+
+
+class RecommendationSingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.recommender = get_recommender()
+        self.calls = []
+        original = self.recommender._recommend_within
+
+        def slow_recommend_within(*query):
+            self.calls.append(query)
+            time.sleep(0.3)
+            return original(*query)
+
+        patcher = patch.object(self.recommender, "_recommend_within", slow_recommend_within)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_concurrently(self, n_threads, n_tasks, **kwargs):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.recommender.recommend(**kwargs))
+            )
+            for _ in range(n_threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        async def gather():
+            return await asyncio.gather(
+                *(self.recommender.recommend_async(**kwargs) for _ in range(n_tasks))
+            )
+
+        results.extend(asyncio.run(gather()))
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_threads_and_coroutines_share_one_leader(self):
+        results = self.run_concurrently(4, 4, artwork_id=5)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(results), 8)
+        ids = [artwork["id"] for artwork in results[0].artworks]
+        for result in results:
+            self.assertEqual([artwork["id"] for artwork in result.artworks], ids)
+
+    @override_settings(RECOMMENDATION_SINGLE_FLIGHT=False)
+    def test_disabled_single_flight_runs_every_call(self):
+        self.run_concurrently(2, 2, artwork_id=5)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_degraded_leader_result_is_not_reused(self):
+        leader = []
+        thread = threading.Thread(
+            target=lambda: leader.append(
+                self.recommender.recommend(artwork_id=5, deadline=Deadline(0.01))
+            )
+        )
+        thread.start()
+        time.sleep(0.05)
+        waiter = self.recommender.recommend(artwork_id=5)
+        thread.join()
+
+        self.assertNotEqual(leader[0].tier, "full")
+        self.assertEqual(waiter.tier, "full")
+        self.assertEqual(len(self.calls), 2)
+
+
+class MemoryUsageTests(SimpleTestCase):
+    def test_neighbor_table_growth_is_reported(self):
+        recommender = get_recommender()
+        with patch.object(recommender, "neighbor_table", NeighborTable(k=5)):
+            before = recommender.get_memory_usage()
+            recommender.neighbor_table.add(0, np.random.default_rng(0).random(200))
+            after = recommender.get_memory_usage()
+
+        grown = after["neighbor_table"] - before["neighbor_table"]
+        self.assertGreater(grown, 0)
+        self.assertEqual(after["total"] - before["total"], grown)
+
+
+class CatalogAppendTests(SimpleTestCase):
+    def setUp(self):
+        self.models_path = os.path.join(tempfile.mkdtemp(), "models")
+        shutil.copytree(get_recommender().models_path, self.models_path)
+        for filename in (NEIGHBORS_FILENAME, SEARCH_INDEX_FILENAME):
+            if os.path.exists(os.path.join(self.models_path, filename)):
+                os.remove(os.path.join(self.models_path, filename))
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.models_path), True)
+
+    def test_append_extends_neighbor_table_and_search_index(self):
+        ArtworkRecommender(self.models_path)  # persists both for this version
+        source = os.path.join(self.models_path, "new.jsonl")
+        with open(source, "w") as f:
+            for i in range(20):
+                f.write(json.dumps({"artist": str(i % 7), "style": "1", "genre": "2"}) + "\n")
+        append_artworks(self.models_path, source)
+
+        with patch.object(NeighborTable, "precompute") as precompute, patch.object(
+            SearchIndex, "build"
+        ) as build:
+            recommender = ArtworkRecommender(self.models_path)
+        precompute.assert_not_called()
+        build.assert_not_called()
+
+        fresh = NeighborTable(k=recommender.neighbor_table.k)
+        fresh.precompute(recommender.tfidf_matrix)
+        for artwork_id in range(len(recommender.metadata)):
+            np.testing.assert_allclose(
+                np.sort(recommender.neighbor_table.get(artwork_id)[1]),
+                np.sort(fresh.get(artwork_id)[1]),
+                atol=1e-6,
+            )
+
+        rebuilt = SearchIndex.build(recommender.metadata, WikiArtAPIClient(), "rebuilt")
+        for query in ("monet", "post impressionism", "portrait"):
+            self.assertEqual(
+                sorted(recommender.search_index.search(query, limit=10**6)["rows"]),
+                sorted(rebuilt.search(query, limit=10**6)["rows"]),
+            )
+
+
+class SearchIndexTests(SimpleTestCase):
+    def test_string_labels_are_searchable_by_name(self):
+        metadata = [
+            {"id": 0, "artist": "Claude Monet", "style": "Impressionism", "genre": "landscape"},
+            {"id": 1, "artist": "Paul_Cézanne", "style": "Post-Impressionism", "genre": "Unknown"},
+            {"id": 2, "artist": "4", "style": "2", "genre": "1"},
+        ]
+        index = SearchIndex.build(metadata, WikiArtAPIClient(), "labels")
+
+        self.assertEqual(sorted(index.search("monet")["rows"]), [0, 2])
+        self.assertEqual(index.search("cezanne post")["rows"], [1])
+        self.assertEqual(sorted(index.search("postimpressionism")["rows"]), [1, 2])
+        self.assertEqual(index.search("landscape")["rows"], [0])
+
+    def test_idf_comes_from_the_fitted_vectorizer(self):
+        metadata = [
+            {"id": 0, "artist": "Claude Monet", "style": "Impressionism", "genre": "Unknown"},
+            {"id": 1, "artist": "Claude Monet", "style": "Realism", "genre": "Unknown"},
+        ]
+        vectorizer = SimpleNamespace(
+            vocabulary_={"artist_claude_monet": 0, "style_impressionism": 1},
+            idf_=np.array([3.0, 1.5]),
+        )
+        index = SearchIndex.build(metadata, WikiArtAPIClient(), "fitted", vectorizer)
+
+        idf = dict(zip(index.terms.tolist(), index.idf.tolist()))
+        self.assertEqual(idf["artist_claude_monet"], 3.0)
+        self.assertEqual(idf["style_impressionism"], 1.5)
+        # Outside the vocabulary: smoothed idf from the catalog
+        self.assertAlmostEqual(idf["style_realism"], np.log(3 / 2) + 1)
+
+        index.extend(
+            [{"id": 2, "artist": "Claude Monet", "style": "Cubism", "genre": "Unknown"}],
+            2,
+            WikiArtAPIClient(),
+            "extended",
+            SimpleNamespace(vocabulary_={"style_cubism": 0}, idf_=np.array([2.5])),
+        )
+        idf = dict(zip(index.terms.tolist(), index.idf.tolist()))
+        self.assertEqual(idf["artist_claude_monet"], 3.0)
+        self.assertEqual(idf["style_cubism"], 2.5)
+
+
+@override_settings(RECOMMENDATION_SINGLE_FLIGHT=False)
+class RecommendationTierTests(SimpleTestCase):
+    def setUp(self):
+        self.recommender = get_recommender()
+
+    def test_generous_deadline_gets_the_full_tier(self):
+        result = self.recommender.recommend(artwork_id=5, deadline=Deadline(60))
+        self.assertEqual(result.tier, "full")
+        self.assertEqual(len(result.artworks), 10)
+
+    def test_exhausted_deadline_falls_back_to_neighbors(self):
+        full = self.recommender.recommend(artwork_id=5)
+        result = self.recommender.recommend(artwork_id=5, deadline=Deadline(0))
+        self.assertEqual(result.tier, "neighbors")
+        self.assertNotIn(5, [artwork["id"] for artwork in result.artworks])
+        # Same ranking up to ties, from float32 neighbor similarities
+        np.testing.assert_allclose(
+            [artwork["similarity_score"] for artwork in result.artworks],
+            [artwork["similarity_score"] for artwork in full.artworks],
+            atol=1e-5,
+        )
+
+    def test_without_neighbors_popularity_ranks_the_fallback(self):
+        popularity = np.zeros(len(self.recommender.metadata), dtype=np.int64)
+        popularity[[7, 3]] = [10, 20]
+        with patch.object(self.recommender, "neighbor_table", NeighborTable(k=1)):
+            result = self.recommender.recommend(
+                artwork_id=5, popularity=popularity, deadline=Deadline(0)
+            )
+        self.assertEqual(result.tier, "popularity")
+        self.assertEqual([artwork["id"] for artwork in result.artworks[:2]], [3, 7])
+
+
+@override_settings(RECOMMENDATION_SINGLE_FLIGHT=False)
+class RecommendationWeightTests(SimpleTestCase):
+    def setUp(self):
+        self.recommender = get_recommender()
+
+    def test_weights_are_validated(self):
+        resolve = self.recommender.resolve_weights
+        self.assertIsNone(resolve({"artist": 1, "style": 1.0}))
+        self.assertIn(2.0, resolve({"style": 2}))
+        for weights in (
+            ["style"],
+            {"medium": 1},
+            {"style": "heavy"},
+            {"style": -1},
+            {"style": float("nan")},
+            {"artist": 0, "style": 0, "genre": 0},
+        ):
+            with self.assertRaises(ValueError, msg=weights):
+                resolve(weights)
+
+    def test_unit_weights_match_cosine_similarity(self):
+        row = self.recommender.weighted_similarity_row(5, (1.0,) * 3)
+        expected = cosine_similarity(
+            self.recommender.tfidf_matrix[5:6], self.recommender.tfidf_matrix
+        ).ravel()
+        np.testing.assert_allclose(row, expected, atol=1e-6)
+
+    def test_weights_change_the_ranking(self):
+        source = self.recommender.metadata[5]
+        rankings = {}
+        for field in ("artist", "style"):
+            weights = self.recommender.resolve_weights(
+                {name: float(name == field) for name in ("artist", "style", "genre")}
+            )
+            artworks = self.recommender.recommend(artwork_id=5, weights=weights).artworks
+            self.assertEqual({artwork[field] for artwork in artworks}, {source[field]})
+            rankings[field] = [artwork["id"] for artwork in artworks]
+        self.assertNotEqual(rankings["artist"], rankings["style"])
+
+
+class WikiArtAPIClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = WikiArtAPIClient()
+
+    def test_image_alternatives_are_distinct(self):
+        for artwork_id in range(12):
+            image_url = self.client.generate_wikiart_image_url(artwork_id)
+            alternatives = self.client.generate_image_alternatives(artwork_id)
+            self.assertEqual(len(alternatives), 3)
+            self.assertEqual(len(set(alternatives)), 3)
+            self.assertNotIn(image_url, alternatives)
+
+    def test_generated_values_are_deterministic_per_artwork(self):
+        random.seed(1234)
+        state = random.getstate()
+        first = self.client.get_artwork_by_ids(9, "4", "2", "1")
+        self.assertEqual(random.getstate(), state)
+
+        again = WikiArtAPIClient().get_artwork_by_ids(9, "4", "2", "1")
+        self.assertEqual(again["title"], first["title"])
+        self.assertEqual(again["placeholder_url"], first["placeholder_url"])
+
+    def test_sparse_enrichment_keeps_only_requested_fields(self):
+        artwork = {"id": 3, "artist": "4", "genre": "2", "style": "1", "likes": 7}
+        enriched = self.client.enrich_artwork_metadata(artwork, frozenset({"id", "title", "likes"}))
+        self.assertEqual(set(enriched), {"id", "title", "likes"})
+        self.assertEqual(enriched["likes"], 7)
+
+        enriched = self.client.enrich_artwork_metadata(artwork, frozenset({"id", "artist"}))
+        self.assertEqual(enriched, {"id": 3, "artist": "4"})
+
+
+class EnrichmentStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.client = WikiArtAPIClient()
+        self.metadata = [
+            {"id": 0, "artist": "4", "genre": "2", "style": "1"},
+            {"id": 1, "artist": "11", "genre": "3", "style": "2"},
+        ]
+
+    def test_requested_fields_compute_only_what_they_need(self):
+        with patch.object(
+            self.client, "get_artist_info", wraps=self.client.get_artist_info
+        ) as get_artist_info:
+            row = self.client.get_artwork_fields(0, "4", "2", "1", {"genre_name"})
+            self.assertEqual(row, {"id": 0, "genre_name": "Landscape"})
+            get_artist_info.assert_not_called()
+
+            row = self.client.get_artwork_fields(0, "4", "2", "1", {"artist_name", "artist_url"})
+            self.assertEqual(row["artist_name"], "Claude Monet")
+            get_artist_info.assert_called_once_with("4")
+
+        self.assertEqual(
+            self.client.get_artwork_fields(0, "4", "2", "1", {"title"})["title"],
+            self.client.get_artwork_by_ids(0, "4", "2", "1")["title"],
+        )
+
+    def test_store_hits_and_misses_are_counted(self):
+        store = EnrichmentStore.build(self.metadata, self.client, "v1")
+        self.client.use_enrichment_store(store)
+
+        def count(result):
+            return CACHE_REQUESTS.values.get(("enrichment", result), 0)
+
+        hits, misses = count("hit"), count("miss")
+        enriched = self.client.enrich_artwork_metadata(dict(self.metadata[0]))
+        self.assertEqual((count("hit"), count("miss")), (hits + 1, misses))
+        self.assertEqual(enriched["artist_name"], "Claude Monet")
+
+        # Rows built from other attributes are not served
+        changed = dict(self.metadata[1], style="6")
+        enriched = self.client.enrich_artwork_metadata(changed)
+        self.assertEqual((count("hit"), count("miss")), (hits + 1, misses + 1))
+        self.assertEqual(enriched["style_name"], "Realism")
+
+    def test_stale_store_is_not_loaded(self):
+        path = os.path.join(tempfile.mkdtemp(), ENRICHMENT_FILENAME)
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), True)
+        EnrichmentStore.build(self.metadata, self.client, "v1").save(path)
+
+        self.assertEqual(len(EnrichmentStore.load(path, "v1")), 2)
+        self.assertIsNone(EnrichmentStore.load(path, "v2"))
+
+
+class StreamingTrainingTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.source = os.path.join(self.root, "artworks.jsonl")
+        with open(self.source, "w") as f:
+            for i in range(61):
+                record = {"artist": f"Artist {i % 11}", "style": f"style-{i % 5}", "genre": i % 3}
+                if i % 13 == 0:
+                    record["genre"] = None
+                f.write(json.dumps(record) + "\n")
+
+    def train(self, *args):
+        output = os.path.join(self.root, f"model-{len(os.listdir(self.root))}")
+        with redirect_stdout(io.StringIO()):
+            train(parse_args(["--input", self.source, "--output", output, *args]))
+        with open(os.path.join(output, "vectorizer.pkl"), "rb") as f:
+            vectorizer = pickle.load(f)
+        with open(os.path.join(output, "metadata.json")) as f:
+            metadata = json.load(f)
+        return vectorizer, load_npz(os.path.join(output, "tfidf_matrix.npz")), metadata
+
+    def records(self):
+        with open(self.source) as f:
+            return [json.loads(line) for line in f]
+
+    def test_chunked_training_matches_in_memory_tfidf(self):
+        vectorizer, matrix, metadata = self.train("--chunk-size", "7", "--max-features", "0")
+        _, single_chunk, single_metadata = self.train("--chunk-size", "1000", "--max-features", "0")
+        self.assertEqual(metadata, single_metadata)
+        np.testing.assert_allclose(matrix.toarray(), single_chunk.toarray())
+
+        texts = [build_artwork(record, i)[1] for i, record in enumerate(self.records())]
+        reference = TfidfVectorizer(lowercase=True, token_pattern=TOKEN_PATTERN, max_df=0.99)
+        expected = reference.fit_transform(texts)
+        self.assertEqual(vectorizer.vocabulary_, reference.vocabulary_)
+        np.testing.assert_allclose(matrix.toarray(), expected.toarray(), atol=1e-12)
+        np.testing.assert_allclose(
+            vectorizer.transform(texts[:5]).toarray(), expected[:5].toarray(), atol=1e-12
+        )
+
+    def test_hashed_training_is_chunk_independent(self):
+        _, chunked, _ = self.train("--chunk-size", "7", "--vectorizer", "hashing")
+        _, single_chunk, _ = self.train("--chunk-size", "1000", "--vectorizer", "hashing")
+        self.assertEqual(chunked.shape[0], 61)
+        np.testing.assert_allclose(chunked.toarray(), single_chunk.toarray())
@@ -9,8 +9,100 @@ import json
 import time
 from urllib.parse import quote
 import random
+from functools import cached_property
 from typing import Dict, List, Optional
 
+from backend.metrics import CACHE_REQUESTS
+from backend.timing import phase
+
+ENRICHMENT_HITS = CACHE_REQUESTS.labels("enrichment", "hit")
+ENRICHMENT_MISSES = CACHE_REQUESTS.labels("enrichment", "miss")
+
+# Fields get_artwork_by_ids adds to an artwork, in output order
+ENRICHED_FIELDS = (
+    "title",
+    "artist_id",
+    "artist_name",
+    "artist_url",
+    "genre_id",
+    "genre_name",
+    "style_id",
+    "style_name",
+    "image_url",
+    "wikiart_page",
+    "placeholder_url",
+    "cdn_alternatives",
+)
+
+
+class ArtworkEnrichment:
+    """Enrichment fields of one artwork, each computed on first access"""
+
+    def __init__(self, client, artwork_id: int, artist_id: str, genre_id: str, style_id: str):
+        self.client = client
+        self.artwork_id = artwork_id
+        self.artist_id = artist_id
+        self.genre_id = genre_id
+        self.style_id = style_id
+
+    @cached_property
+    def artist_info(self) -> Dict:
+        return self.client.get_artist_info(self.artist_id)
+
+    @cached_property
+    def genre_slug(self) -> str:
+        return self.client.get_genre_name(self.genre_id)
+
+    @cached_property
+    def style_slug(self) -> str:
+        return self.client.get_style_name(self.style_id)
+
+    @property
+    def artist_name(self) -> str:
+        return self.artist_info["name"]
+
+    @property
+    def artist_url(self) -> str:
+        return self.artist_info["url_name"]
+
+    @property
+    def genre_name(self) -> str:
+        return self.genre_slug.replace("-", " ").title()
+
+    @property
+    def style_name(self) -> str:
+        return self.style_slug.replace("-", " ").title()
+
+    @cached_property
+    def title(self) -> str:
+        # Generate realistic artwork title
+        titles = [
+            f"Untitled {self.artwork_id}",
+            f"Study in {self.style_slug.title()}",
+            f"{self.genre_name} by {self.artist_name}",
+            f"Artwork #{self.artwork_id}",
+            f"{self.artist_name} - {self.genre_name}",
+        ]
+
+        # Seeded per artwork for consistent results, without touching the global RNG
+        return random.Random(self.artwork_id).choice(titles)
+
+    @cached_property
+    def image_url(self) -> str:
+        return self.client.generate_wikiart_image_url(self.artwork_id, self.artist_id)
+
+    @property
+    def wikiart_page(self) -> str:
+        return f"https://www.wikiart.org/en/{self.artist_url}/{quote(self.title.lower().replace(' ', '-'))}"
+
+    @property
+    def placeholder_url(self) -> str:
+        return self.client.generate_placeholder_url(self.title, self.artwork_id)
+
+    @property
+    def cdn_alternatives(self) -> List[str]:
+        return self.client.generate_image_alternatives(self.artwork_id)
+
 
 class WikiArtAPIClient:
     """Real WikiArt API client using documented patterns and search approaches"""
@@ -26,6 +118,9 @@ class WikiArtAPIClient:
         )
 
         # WikiArt CDN patterns observed from real URLs
+        # Precomputed enrichment rows, attached by the recommender at load
+        self.enrichment_store = None
+
         self.cdn_patterns = [
             "uploads0.wikiart.org",
             "uploads1.wikiart.org",
@@ -118,11 +213,26 @@ class WikiArtAPIClient:
         that provide consistent, high-quality artwork images for display
         """
 
-        # Use seed for consistent results
-        random.seed(artwork_id)
+        art_image_services = self._art_image_services(artwork_id)
 
+        # Select service based on artwork_id for consistency
+        service_index = artwork_id % len(art_image_services)
+        return art_image_services[service_index]
+
+    def generate_image_alternatives(self, artwork_id: int, count: int = 3) -> List[str]:
+        """
+        Fallback image URLs for an artwork: the services after the one
+        generate_wikiart_image_url picked, so each is a distinct URL
+        """
+        art_image_services = self._art_image_services(artwork_id)
+        service_index = artwork_id % len(art_image_services)
+        rotated = art_image_services[service_index + 1 :] + art_image_services[:service_index]
+        return rotated[:count]
+
+    @staticmethod
+    def _art_image_services(artwork_id: int) -> List[str]:
         # Use reliable art-themed image services
-        art_image_services = [
+        return [
             # Unsplash art collections (reliable and high quality)
             f"https://source.unsplash.com/400x300/?art,painting&sig={artwork_id}",
             f"https://source.unsplash.com/400x300/?artwork,classical&sig={artwork_id + 1000}",
@@ -132,10 +242,6 @@ class WikiArtAPIClient:
             f"https://picsum.photos/400/300?random={artwork_id + 5000}",
         ]
 
-        # Select service based on artwork_id for consistency
-        service_index = artwork_id % len(art_image_services)
-        return art_image_services[service_index]
-
     def search_artwork_by_title(
         self, title: str, artist_name: str = None
     ) -> Optional[Dict]:
@@ -161,46 +267,27 @@ class WikiArtAPIClient:
         """
         Get enriched artwork data using IDs and generate real WikiArt URLs
         """
-        artist_info = self.get_artist_info(artist_id)
-        genre_name = self.get_genre_name(genre_id)
-        style_name = self.get_style_name(style_id)
-
-        # Generate realistic artwork title
-        titles = [
-            f"Untitled {artwork_id}",
-            f"Study in {style_name.title()}",
-            f"{genre_name.replace('-', ' ').title()} by {artist_info['name']}",
-            f"Artwork #{artwork_id}",
-            f"{artist_info['name']} - {genre_name.replace('-', ' ').title()}",
-        ]
-
-        random.seed(artwork_id)
-        title = random.choice(titles)
+        return self.get_artwork_fields(
+            artwork_id, artist_id, genre_id, style_id, ENRICHED_FIELDS
+        )
 
-        return {
-            "id": artwork_id,
-            "title": title,
-            "artist_id": artist_id,
-            "artist_name": artist_info["name"],
-            "artist_url": artist_info["url_name"],
-            "genre_id": genre_id,
-            "genre_name": genre_name.replace("-", " ").title(),
-            "style_id": style_id,
-            "style_name": style_name.replace("-", " ").title(),
-            "image_url": self.generate_wikiart_image_url(artwork_id, artist_id),
-            "wikiart_page": f"https://www.wikiart.org/en/{artist_info['url_name']}/{quote(title.lower().replace(' ', '-'))}",
-            "placeholder_url": self.generate_placeholder_url(title, artwork_id),
-            "cdn_alternatives": [
-                self.generate_wikiart_image_url(artwork_id, artist_id)
-                for _ in range(3)  # Multiple CDN attempts
-            ],
-        }
+    def get_artwork_fields(
+        self, artwork_id: int, artist_id: str, genre_id: str, style_id: str, fields
+    ) -> Dict:
+        """
+        Get only the requested enrichment fields (names from ENRICHED_FIELDS),
+        computing nothing that they do not depend on
+        """
+        enrichment = ArtworkEnrichment(self, artwork_id, artist_id, genre_id, style_id)
+        result = {"id": artwork_id}
+        for name in ENRICHED_FIELDS:
+            if name in fields:
+                result[name] = getattr(enrichment, name)
+        return result
 
     def generate_placeholder_url(self, title: str = "", artwork_id: int = 0) -> str:
         """Generate a reliable placeholder image"""
         # Use a more sophisticated placeholder service
-        random.seed(artwork_id)
-
         # Art-themed color palettes
         color_palettes = [
             ("2C3E50", "ECF0F1"),  # Dark blue-gray & light gray
@@ -210,7 +297,7 @@ class WikiArtAPIClient:
             ("F39C12", "D5DBDB"),  # Orange & light gray
         ]
 
-        bg_color, text_color = random.choice(color_palettes)
+        bg_color, text_color = random.Random(artwork_id).choice(color_palettes)
 
         # Create meaningful placeholder text
         placeholder_text = f"Art {artwork_id}"
@@ -219,18 +306,53 @@ class WikiArtAPIClient:
 
         return f"https://via.placeholder.com/400x300/{bg_color}/{text_color}?text={placeholder_text}"
 
-    def enrich_artwork_metadata(self, artwork_data: Dict) -> Dict:
+    def use_enrichment_store(self, store) -> None:
+        """Serve enrichments from a precomputed EnrichmentStore when possible"""
+        self.enrichment_store = store
+
+    def enrich_artwork_metadata(self, artwork_data: Dict, fields=None) -> Dict:
         """
         Enrich artwork metadata with real WikiArt information and URLs
+
+        With `fields` (a set of field names), only those fields of the
+        artwork and its enrichment are returned, plus `id`.
         """
         artwork_id = artwork_data["id"]
+        if fields is not None:
+            result = {
+                key: value
+                for key, value in artwork_data.items()
+                if key in fields or key == "id"
+            }
+            if fields.isdisjoint(ENRICHED_FIELDS):
+                return result
+
         artist_id = str(artwork_data["artist"])
         genre_id = str(artwork_data["genre"])
         style_id = str(artwork_data["style"])
 
-        enriched_data = self.get_artwork_by_ids(
-            artwork_id, artist_id, genre_id, style_id
-        )
+        enriched_data = None
+        if self.enrichment_store is not None:
+            enriched_data = self.enrichment_store.lookup(
+                artwork_id, artist_id, genre_id, style_id
+            )
+            if enriched_data is not None:
+                ENRICHMENT_HITS.inc()
+        if enriched_data is None:
+            ENRICHMENT_MISSES.inc()
+            enriched_data = self.get_artwork_fields(
+                artwork_id,
+                artist_id,
+                genre_id,
+                style_id,
+                ENRICHED_FIELDS if fields is None else fields,
+            )
+
+        if fields is not None:
+            for name in ENRICHED_FIELDS:
+                if name in fields:
+                    result[name] = enriched_data[name]
+            return result
 
         # Preserve original data and add enrichments
         result = artwork_data.copy()
@@ -238,11 +360,14 @@ class WikiArtAPIClient:
 
         return result
 
-    def enrich_artworks_batch(self, artworks_list: List[Dict]) -> List[Dict]:
+    def enrich_artworks_batch(self, artworks_list: List[Dict], fields=None) -> List[Dict]:
         """
-        Enrich a batch of artworks with real WikiArt data
+        Enrich a batch of artworks with real WikiArt data (only `fields`, if given)
         """
-        return [self.enrich_artwork_metadata(artwork) for artwork in artworks_list]
+        with phase("enrichment"):
+            return [
+                self.enrich_artwork_metadata(artwork, fields) for artwork in artworks_list
+            ]
 
     def test_image_url(self, url: str) -> bool:
         """
@@ -0,0 +1,249 @@
+"""
+Opt-in request profiling
+
+ProfilingMiddleware profiles a request when either
+
+    - a staff user sends `X-Profile: cprofile` or `X-Profile: stacks`, or
+    - the request is picked by PROFILING_SAMPLE_RATE (0.0-1.0)
+
+`cprofile` stores a pstats dump (open with `python -m pstats` or snakeviz);
+`stacks` samples the request thread every PROFILING_STACK_INTERVAL seconds
+and stores collapsed stacks (`frame;frame;frame count`), ready for
+flamegraph.pl or speedscope. Profiles go to a bounded on-disk ring in
+PROFILING_DIR; the oldest are deleted beyond PROFILING_MAX_PROFILES. Staff
+list and download them through /api/profiles/.
+
+The middleware removes itself unless PROFILING_ENABLED is set.
+"""
+
+import cProfile
+import json
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_MODES = ("cprofile", "stacks")
+PROFILE_EXTENSIONS = {"cprofile": ".prof", "stacks": ".collapsed"}
+
+# Only one cProfile may be active per process on Python 3.12+
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Sample one thread's Python stack from a background thread"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Bounded ring of profiles on disk, each with a JSON sidecar"""
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = os.fspath(directory)
+        self.max_profiles = max_profiles
+
+    def save(self, mode, payload, info):
+        """Write a profile (bytes or str) and return its id"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        data_path = os.path.join(self.directory, profile_id + PROFILE_EXTENSIONS[mode])
+        with open(data_path, "wb") as f:
+            f.write(payload.encode("utf-8") if isinstance(payload, str) else payload)
+        info = dict(info, id=profile_id, mode=mode, size=os.path.getsize(data_path))
+        with open(os.path.join(self.directory, profile_id + ".json"), "w") as f:
+            json.dump(info, f)
+        self._trim()
+        return profile_id
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[: -len(".json")] for name in names if name.endswith(".json"))
+
+    def _trim(self):
+        ids = self._ids()
+        for profile_id in ids[: max(len(ids) - self.max_profiles, 0)]:
+            for extension in (".json",) + tuple(PROFILE_EXTENSIONS.values()):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """Profile metadata, newest first"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, profile_id + ".json"), "r") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id):
+        """Data file for a profile id, or None"""
+        if profile_id not in self._ids():
+            return None
+        for extension in PROFILE_EXTENSIONS.values():
+            path = os.path.join(self.directory, profile_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+
+def get_profile_store():
+    return ProfileStore(
+        getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles"),
+        getattr(settings, "PROFILING_MAX_PROFILES", 50),
+    )
+
+
+def _is_staff(request):
+    """Staff check that also honours DRF token authentication"""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+
+    from rest_framework.exceptions import APIException
+    from rest_framework.settings import api_settings
+
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(_DRFRequestShim(request))
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+class _DRFRequestShim:
+    """Minimal request wrapper for DRF authenticators"""
+
+    def __init__(self, request):
+        self._request = request
+        self.META = request.META
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class ProfilingMiddleware:
+    """Profile staff-requested or sampled requests into the ProfileStore"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.default_mode = getattr(settings, "PROFILING_DEFAULT_MODE", "stacks")
+        self.stack_interval = getattr(settings, "PROFILING_STACK_INTERVAL", 0.005)
+        self.store = get_profile_store()
+
+    def _requested_mode(self, request):
+        requested = request.META.get(PROFILE_HEADER)
+        if requested is not None:
+            mode = requested.strip().lower()
+            if mode not in PROFILE_MODES:
+                mode = self.default_mode
+            if _is_staff(request):
+                return mode, "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.default_mode, "sampled"
+        return None, None
+
+    def __call__(self, request):
+        mode, trigger = self._requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        profiler = None
+        sampler = None
+        if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        else:
+            mode = "stacks"
+            sampler = StackSampler(threading.get_ident(), self.stack_interval)
+
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            else:
+                sampler.start()
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+            else:
+                sampler.stop()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        if profiler is not None:
+            profiler.create_stats()
+            payload = _marshal_stats(profiler)
+        else:
+            payload = sampler.collapsed()
+
+        match = getattr(request, "resolver_match", None)
+        user = getattr(request, "user", None)
+        profile_id = self.store.save(
+            mode,
+            payload,
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "view": match.view_name if match is not None else None,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 3),
+                "trigger": trigger,
+                "user": user.get_username() if user is not None and user.is_authenticated else None,
+            },
+        )
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+def _marshal_stats(profiler):
+    """pstats-compatible bytes, as written by Profile.dump_stats"""
+    return marshal.dumps(profiler.stats)
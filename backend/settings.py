@@ -45,7 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "backend.metrics.MetricsMiddleware",
+    "backend.timing.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "backend.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "backend.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -133,12 +137,16 @@ AUTH_USER_MODEL = "users.User"
 # REST Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "backend.users.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "backend.api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 # CORS settings for React frontend
@@ -148,3 +156,117 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# HTTP caching for artwork endpoints (responses are keyed on the model version)
+ARTWORK_CACHE_MAX_AGE = 300
+ARTWORK_CACHE_S_MAXAGE = 86400
+# ... and for responses carrying live like counts
+ARTWORK_LIVE_CACHE_MAX_AGE = 10
+ARTWORK_LIVE_CACHE_S_MAXAGE = 10
+ARTWORK_PAGE_SIZE_MAX = 100
+
+# Local image cache behind /api/artworks/<pk>/image/raw/
+ARTWORK_IMAGE_CACHE_DIR = BASE_DIR / "image_cache"
+ARTWORK_IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+ARTWORK_THUMBNAIL_SIZES = [128, 256, 512]
+ARTWORK_IMAGE_ORIGIN_FETCHER = "backend.api.image_cache.HTTPOriginFetcher"
+# e.g. "/protected-images/" to serve cached files via nginx X-Accel-Redirect
+ARTWORK_IMAGE_ACCEL_REDIRECT_PREFIX = None
+
+# Share one computation between concurrent identical recommendation queries
+RECOMMENDATION_SINGLE_FLIGHT = True
+
+# Default and maximum time budget per recommendation request (None: unbounded).
+# Requests that would run over fall back to the neighbor table (precomputed
+# at load for catalogs up to RECOMMENDATION_NEIGHBOR_PRECOMPUTE_MAX), then
+# to popularity
+RECOMMENDATION_TIME_BUDGET_MS = 1000
+RECOMMENDATION_TIME_BUDGET_MAX_MS = 10000
+RECOMMENDATION_NEIGHBOR_TABLE_K = 50
+RECOMMENDATION_NEIGHBOR_PRECOMPUTE_MAX = 20000
+
+# Admission control (backend/api/admission.py): shed recommendation requests
+# whose estimated queueing delay exceeds RECOMMENDATION_SHED_QUEUE_MS
+RECOMMENDATION_MAX_CONCURRENT = 8
+RECOMMENDATION_SHED_QUEUE_MS = 2000
+# Only enable behind a proxy that overwrites X-Request-Start; clients can
+# send the header themselves
+RECOMMENDATION_TRUST_REQUEST_START = False
+
+# Upper bound on ids per artwork multi-get (GET /api/artworks/?ids=...)
+ARTWORK_MULTI_GET_MAX_IDS = 500
+
+# Seconds between checks for rewritten model files (0 disables hot reload)
+RECOMMENDER_RELOAD_CHECK_INTERVAL = 5
+
+# Server-Timing header and per-phase latency histograms (backend/timing.py)
+REQUEST_TIMING_ENABLED = DEBUG
+
+# Shared directory for /api/metrics when running several worker processes
+# (e.g. BASE_DIR / "metrics"); empty it when the server starts
+METRICS_MULTIPROC_DIR = None
+METRICS_FLUSH_INTERVAL = 1.0
+# /api/metrics is staff only; scrapers send `Authorization: Bearer <token>`
+METRICS_BEARER_TOKEN = None
+# Seconds between database counts behind scrape-time gauges
+METRICS_DB_COUNT_INTERVAL = 60.0
+
+# Opt-in request profiling (backend/profiling.py): staff send an
+# `X-Profile: cprofile|stacks` header, or a share of requests is sampled
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DEFAULT_MODE = "stacks"
+PROFILING_STACK_INTERVAL = 0.005
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_PROFILES = 50
+
+# Upper bound on operations per /api/users/profile/sync_likes/ request
+LIKE_SYNC_MAX_OPERATIONS = 500
+
+# Per-artwork like counters (backend/users/like_counters.py)
+# (workers also refresh other workers' counts at the flush interval; migration
+# users.0005 seeds the counts, `manage.py rebuild_like_counts` recounts them)
+LIKE_COUNTER_FLUSH_INTERVAL = 5.0
+LIKE_COUNTER_FLUSH_BATCH = 1000
+
+# Profile responses list at most this many recent liked artwork ids; the
+# like summary behind them is cached in the default cache for the TTL
+PROFILE_LIKED_ARTWORKS_PREVIEW = 50
+LIKE_SUMMARY_CACHE_TTL = 300
+
+# Write-behind logging of recommendations served to signed-in users
+# (backend/users/history_logger.py)
+RECOMMENDATION_HISTORY_ENABLED = True
+RECOMMENDATION_HISTORY_QUEUE_SIZE = 10000
+RECOMMENDATION_HISTORY_BATCH_SIZE = 200
+RECOMMENDATION_HISTORY_FLUSH_MS = 500
+RECOMMENDATION_HISTORY_OVERLOAD_SAMPLE_RATE = 0.1
+RECOMMENDATION_HISTORY_COMPACT = True
+
+# Resolved API tokens are cached per process (backend/users/authentication.py);
+# set TOKEN_AUTH_SHARED_CACHE to a CACHES alias to share them between workers
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+TOKEN_AUTH_SHARED_CACHE = None
+
+# Negotiated brotli/gzip compression of large responses (backend/compression.py);
+# only views that set `compression = True` (catalog, search, recommendations)
+RESPONSE_COMPRESSION_ENABLED = True
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+RESPONSE_COMPRESSION_TYPES = ["application/json", "text/"]
+RESPONSE_COMPRESSION_GZIP_LEVEL = 6
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 4
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "backend": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
+    },
+}
@@ -0,0 +1,102 @@
+"""
+Per-request latency breakdown
+
+Code marks phases with `with phase("scoring"):`. While ServerTimingMiddleware
+is active, each request collects the self time of every phase (time in
+nested phases is charged to the inner one), returns it in a `Server-Timing`
+header and adds it to the artapi_request_phase_duration_seconds histogram
+(see backend.metrics), along with the request's `total`.
+
+When REQUEST_TIMING_ENABLED is off the middleware removes itself and
+phase() returns a shared no-op context manager, so instrumented code pays
+a single context variable lookup.
+"""
+
+import contextvars
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from backend.metrics import REQUEST_PHASE_DURATION
+
+_current_timer = contextvars.ContextVar("request_timer", default=None)
+_NOOP = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "started", "child_time")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.child_time = 0.0
+        self.timer.stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.timer.stack.pop()
+        if self.timer.stack:
+            self.timer.stack[-1].child_time += elapsed
+        self.timer.add(self.name, elapsed - self.child_time)
+        return False
+
+
+class RequestTimer:
+    """Accumulated self time per phase for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.stack = []
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing_header(self, total_seconds):
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def phase(name):
+    """Time a block as the named phase of the current request, if timed"""
+    timer = _current_timer.get()
+    if timer is None:
+        return _NOOP
+    return _Phase(timer, name)
+
+
+class ServerTimingMiddleware:
+    """Collect phase timings per request and emit a Server-Timing header"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+
+        total_seconds = timer.total()
+        response["Server-Timing"] = timer.server_timing_header(total_seconds)
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unresolved"
+        for name, seconds in timer.phases.items():
+            REQUEST_PHASE_DURATION.labels(view, name).observe(seconds)
+        REQUEST_PHASE_DURATION.labels(view, "total").observe(total_seconds)
+        return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, ArtworkLike, UserRecommendationHistory
+from django.db.models import Count
+from .models import User, ArtworkLike, ArtworkLikeCount, UserRecommendationHistory
 
 
 @admin.register(User)
@@ -16,6 +17,10 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ["date_joined", "is_active", "is_staff"]
     readonly_fields = ["date_joined", "last_login"]
 
+    def get_queryset(self, request):
+        # get_liked_count reads the annotation instead of a COUNT per row
+        return super().get_queryset(request).annotate(liked_count=Count("artwork_likes"))
+
 
 @admin.register(ArtworkLike)
 class ArtworkLikeAdmin(admin.ModelAdmin):
@@ -24,6 +29,13 @@ class ArtworkLikeAdmin(admin.ModelAdmin):
     search_fields = ["user__username", "artwork_id"]
 
 
+@admin.register(ArtworkLikeCount)
+class ArtworkLikeCountAdmin(admin.ModelAdmin):
+    list_display = ["artwork_id", "likes", "updated_at"]
+    search_fields = ["artwork_id"]
+    ordering = ["-likes"]
+
+
 @admin.register(UserRecommendationHistory)
 class UserRecommendationHistoryAdmin(admin.ModelAdmin):
     list_display = ["user", "source_artwork_id", "created_at"]
@@ -5,3 +5,7 @@ class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.users"
     label = "users"
+
+    def ready(self):
+        # Connects the token cache invalidation signal handlers
+        from . import authentication  # noqa: F401
@@ -0,0 +1,210 @@
+"""
+Cached token authentication
+
+TokenAuthentication runs a Token + User join for every authenticated
+request. CachedTokenAuthentication keeps resolved tokens in
+
+    - a per-process LRU (TOKEN_AUTH_CACHE_SIZE entries, TOKEN_AUTH_CACHE_TTL
+      seconds), so warm tokens cost no query at all, and
+    - optionally a shared Django cache (TOKEN_AUTH_SHARED_CACHE, a CACHES
+      alias), so a token resolved by one worker is warm in the others
+
+Entries are dropped when their user is saved, deleted or changed through
+User.objects...update() (password change, deactivation, profile edits)
+and when a token is deleted (logout) or rotated. Writes that bypass the
+ORM (raw SQL, another service) are only noticed once the TTL expires. With a shared cache each user also has a generation counter there;
+invalidation bumps it, which retires the entries other workers hold in
+their local LRU. Without a shared cache other workers notice within the
+TTL.
+
+Every request still gets its own copies of the cached User and Token.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from backend.metrics import CACHE_REQUESTS
+
+from .models import User, users_updated
+
+TOKEN_CACHE_PREFIX = "auth-token:"
+GENERATION_CACHE_PREFIX = "auth-token-gen:"
+
+
+def _copy_pair(user, token):
+    # Deep: the model state (field caches) must not be shared between requests
+    user = copy.deepcopy(user)
+    token = copy.copy(token)
+    token._state = copy.copy(token._state)
+    token._state.fields_cache = {"user": user}
+    return user, token
+
+
+class TokenCache:
+    """LRU of token key -> (user, token), with an optional shared layer"""
+
+    def __init__(self, max_size=10_000, ttl=60.0, shared_cache=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = caches[shared_cache] if shared_cache else None
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; fills that raced one are not stored
+        self.epoch = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] <= now:
+                    self._remove(key)
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+
+        if entry is not None:
+            _, user, token, generation = entry
+            if self.shared is None or self._generation(user.pk) == generation:
+                CACHE_REQUESTS.labels("auth_token", "hit").inc()
+                return _copy_pair(user, token)
+            with self._lock:
+                self._remove(key)
+
+        if self.shared is not None:
+            cached = self.shared.get(TOKEN_CACHE_PREFIX + key)
+            if cached is not None:
+                user, token, generation = cached
+                if self._generation(user.pk) == generation:
+                    self._store_local(key, user, token, generation, self.epoch)
+                    CACHE_REQUESTS.labels("auth_token", "hit").inc()
+                    return _copy_pair(user, token)
+
+        CACHE_REQUESTS.labels("auth_token", "miss").inc()
+        return None
+
+    def set(self, key, user, token, epoch):
+        """Store a pair resolved from the database since `epoch` was read"""
+        user, token = _copy_pair(user, token)
+        generation = self._generation(user.pk) if self.shared is not None else 0
+        if not self._store_local(key, user, token, generation, epoch):
+            return
+        if self.shared is not None:
+            self.shared.set(TOKEN_CACHE_PREFIX + key, (user, token, generation), self.ttl)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self.epoch += 1
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+        if self.shared is not None:
+            generation_key = GENERATION_CACHE_PREFIX + str(user_id)
+            try:
+                self.shared.incr(generation_key)
+            except ValueError:
+                self.shared.set(generation_key, 1, None)
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self.epoch += 1
+            self._remove(key)
+        if self.shared is not None:
+            self.shared.delete(TOKEN_CACHE_PREFIX + key)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _generation(self, user_id):
+        return self.shared.get(GENERATION_CACHE_PREFIX + str(user_id), 0)
+
+    def _store_local(self, key, user, token, generation, epoch):
+        with self._lock:
+            if epoch != self.epoch:
+                return False
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user, token, generation)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[1].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[1].pk]
+
+
+# Global instance
+token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Get or create the process-wide token cache"""
+    global token_cache
+    if token_cache is None:
+        with _token_cache_lock:
+            if token_cache is None:
+                token_cache = TokenCache(
+                    max_size=getattr(settings, "TOKEN_AUTH_CACHE_SIZE", 10_000),
+                    ttl=getattr(settings, "TOKEN_AUTH_CACHE_TTL", 60),
+                    shared_cache=getattr(settings, "TOKEN_AUTH_SHARED_CACHE", None),
+                )
+    return token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the database for warm tokens"""
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        epoch = cache.epoch
+        user, token = super().authenticate_credentials(key)
+        cache.set(key, user, token, epoch)
+        return user, token
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: get_token_cache().invalidate_user(user_id))
+
+
+@receiver(users_updated, sender=User)
+def invalidate_updated_users_tokens(sender, user_ids, **kwargs):
+    def invalidate():
+        cache = get_token_cache()
+        for user_id in user_ids:
+            cache.invalidate_user(user_id)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: get_token_cache().invalidate_key(key))
@@ -0,0 +1,165 @@
+"""
+Write-behind logging of served recommendations
+
+RecommendationView hands each served list to RecommendationHistoryLogger,
+which only puts it on a bounded in-process queue. A background thread
+writes queued entries to UserRecommendationHistory with bulk_create
+whenever RECOMMENDATION_HISTORY_BATCH_SIZE entries are waiting or
+RECOMMENDATION_HISTORY_FLUSH_MS has passed, so requests never wait on the
+database.
+
+Under overload (queue more than half full) only a
+RECOMMENDATION_HISTORY_OVERLOAD_SAMPLE_RATE share of entries is kept, and
+entries are dropped outright when the queue is full. Every outcome is
+counted in artapi_recommendation_history_total. The queue is flushed at
+interpreter shutdown.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from backend.metrics import registry
+
+from .models import UserRecommendationHistory
+
+logger = logging.getLogger(__name__)
+
+HISTORY_EVENTS = registry.counter(
+    "artapi_recommendation_history_total",
+    "Recommendation history entries by outcome (queued, sampled_out, dropped, written, failed)",
+    ("result",),
+)
+HISTORY_QUEUE_DEPTH = registry.gauge(
+    "artapi_recommendation_history_queue_depth", "Entries waiting in the history queue"
+)
+
+_STOP = object()
+
+
+class RecommendationHistoryLogger:
+    def __init__(
+        self,
+        max_queue=10_000,
+        batch_size=200,
+        flush_interval=0.5,
+        overload_sample_rate=0.1,
+        compact=True,
+    ):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overload_sample_rate = overload_sample_rate
+        self.compact = compact
+        self._thread = threading.Thread(
+            target=self._run, name="recommendation-history", daemon=True
+        )
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if not self._started:
+                self._thread.start()
+                self._started = True
+                atexit.register(self.stop)
+
+    def log(self, user_id, source_artwork_id, artwork_ids):
+        """Queue one served recommendation list; never blocks"""
+        if self.queue.qsize() > self.max_queue // 2 and random.random() >= self.overload_sample_rate:
+            HISTORY_EVENTS.labels("sampled_out").inc()
+            return False
+        try:
+            self.queue.put_nowait((user_id, source_artwork_id, list(artwork_ids)))
+        except queue.Full:
+            HISTORY_EVENTS.labels("dropped").inc()
+            return False
+        HISTORY_EVENTS.labels("queued").inc()
+        return True
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued and stop the flusher thread"""
+        if not self._started or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("History queue full at shutdown; some entries are lost")
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def _write(self, batch):
+        HISTORY_QUEUE_DEPTH.set(self.queue.qsize())
+        if not batch:
+            return
+        rows = []
+        for user_id, source_artwork_id, artwork_ids in batch:
+            row = UserRecommendationHistory(user_id=user_id, source_artwork_id=source_artwork_id)
+            if self.compact:
+                row.recommended_ids_packed = UserRecommendationHistory.pack_artwork_ids(artwork_ids)
+            else:
+                row.recommended_artwork_ids = artwork_ids
+            rows.append(row)
+
+        try:
+            close_old_connections()
+            UserRecommendationHistory.objects.bulk_create(rows, batch_size=500)
+            HISTORY_EVENTS.labels("written").inc(len(rows))
+        except Exception:
+            logger.exception("Could not write %d recommendation history entries", len(rows))
+            HISTORY_EVENTS.labels("failed").inc(len(rows))
+
+
+# Global instance
+history_logger = None
+_history_logger_lock = threading.Lock()
+
+
+def get_history_logger():
+    """Get or create the process-wide history logger, started on first use"""
+    global history_logger
+    if history_logger is None:
+        with _history_logger_lock:
+            if history_logger is None:
+                instance = RecommendationHistoryLogger(
+                    max_queue=getattr(settings, "RECOMMENDATION_HISTORY_QUEUE_SIZE", 10_000),
+                    batch_size=getattr(settings, "RECOMMENDATION_HISTORY_BATCH_SIZE", 200),
+                    flush_interval=getattr(settings, "RECOMMENDATION_HISTORY_FLUSH_MS", 500) / 1000,
+                    overload_sample_rate=getattr(
+                        settings, "RECOMMENDATION_HISTORY_OVERLOAD_SAMPLE_RATE", 0.1
+                    ),
+                    compact=getattr(settings, "RECOMMENDATION_HISTORY_COMPACT", True),
+                )
+                instance.start()
+                history_logger = instance
+    return history_logger
@@ -0,0 +1,243 @@
+"""
+Per-artwork like counters
+
+LikeCounterStore keeps like counts in a numpy array indexed by artwork id,
+so responses and popularity ranking never run COUNT(*) over ArtworkLike.
+
+    - like/unlike views call record() after their transaction commits
+    - pending deltas are written behind to ArtworkLikeCount in batches:
+      missing rows are inserted, then one UPDATE ... SET likes = likes + d
+      per distinct delta, so concurrent worker processes never overwrite
+      each other
+    - a background thread flushes every LIKE_COUNTER_FLUSH_INTERVAL seconds
+      (sooner once LIKE_COUNTER_FLUSH_BATCH deltas are pending) and then
+      refreshes the array from ArtworkLikeCount, so workers that only serve
+      reads still pick up other processes' writes; request threads never
+      flush or scan the table themselves
+    - ArtworkLikeCount is seeded from ArtworkLike by migration 0005 and can
+      be recounted with `manage.py rebuild_like_counts` (with the workers
+      stopped); workers never rebuild it themselves, since a recount racing
+      another worker's unflushed deltas would count those likes twice
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ArtworkLike, ArtworkLikeCount
+
+logger = logging.getLogger(__name__)
+
+
+class LikeCounterStore:
+    def __init__(self, flush_interval=5.0, flush_batch=1000):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Flush and refresh in a background thread every flush_interval"""
+        if self._thread is None and self.flush_interval > 0:
+            self._thread = threading.Thread(
+                target=self._run, name="like-counters", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write what is still pending"""
+        self._stop.set()
+        self._wake.set()
+        self.flush(refresh=False)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _ensure_size(self, size):
+        if size > len(self.counts):
+            grown = np.zeros(max(size, 2 * len(self.counts)), dtype=np.int64)
+            grown[: len(self.counts)] = self.counts
+            self.counts = grown
+
+    # Reads
+
+    def get(self, artwork_id):
+        counts = self.counts
+        return int(counts[artwork_id]) if 0 <= artwork_id < len(counts) else 0
+
+    def get_many(self, artwork_ids):
+        return [self.get(artwork_id) for artwork_id in artwork_ids]
+
+    def as_array(self, size):
+        """Counts for artwork ids 0..size-1 (a read-only view when possible)"""
+        counts = self.counts
+        if len(counts) >= size:
+            return counts[:size]
+        padded = np.zeros(size, dtype=np.int64)
+        padded[: len(counts)] = counts
+        return padded
+
+    def apply_to(self, artworks):
+        """Set the live `likes` field on artwork dicts in place"""
+        counts = self.counts
+        for artwork in artworks:
+            artwork_id = artwork["id"]
+            artwork["likes"] = int(counts[artwork_id]) if 0 <= artwork_id < len(counts) else 0
+        return artworks
+
+    # Writes
+
+    def record(self, deltas):
+        """
+        Apply {artwork_id: delta} in memory and queue it for the database.
+        With a background thread, a full batch only wakes it; without one
+        (flush_interval 0) the deltas are written here, without a refresh.
+        """
+        with self._lock:
+            if deltas:
+                self._ensure_size(max(deltas) + 1)
+            for artwork_id, delta in deltas.items():
+                if delta:
+                    self.counts[artwork_id] = max(self.counts[artwork_id] + delta, 0)
+                    self._pending[artwork_id] += delta
+            due = (
+                len(self._pending) >= self.flush_batch
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if not due:
+            return
+        if self._thread is not None:
+            self._wake.set()
+        else:
+            self.flush(refresh=False)
+
+    def flush(self, refresh=True):
+        """Write pending deltas to ArtworkLikeCount, then refresh from it"""
+        if not self._flush_lock.acquire(blocking=False):
+            return  # Another thread is flushing
+        try:
+            with self._lock:
+                pending = {k: v for k, v in self._pending.items() if v}
+                self._pending.clear()
+                self._last_flush = time.monotonic()
+
+            if pending:
+                try:
+                    self._write(pending)
+                except Exception:
+                    logger.exception("Could not flush like counters; retrying later")
+                    with self._lock:
+                        for artwork_id, delta in pending.items():
+                            self._pending[artwork_id] += delta
+                    return
+            if refresh:
+                self.refresh()
+        finally:
+            self._flush_lock.release()
+
+    @staticmethod
+    def _write(pending):
+        by_delta = defaultdict(list)
+        for artwork_id, delta in pending.items():
+            by_delta[delta].append(artwork_id)
+
+        with transaction.atomic():
+            ArtworkLikeCount.objects.bulk_create(
+                [ArtworkLikeCount(artwork_id=artwork_id, likes=0) for artwork_id in pending],
+                ignore_conflicts=True,
+            )
+            for delta, artwork_ids in by_delta.items():
+                ArtworkLikeCount.objects.filter(artwork_id__in=artwork_ids).update(
+                    likes=F("likes") + delta, updated_at=timezone.now()
+                )
+
+    def refresh(self):
+        """Reload counts from ArtworkLikeCount, keeping unflushed deltas"""
+        rows = list(
+            ArtworkLikeCount.objects.filter(likes__gt=0).values_list("artwork_id", "likes")
+        )
+        counts = np.zeros(len(self.counts), dtype=np.int64)
+        if rows:
+            ids, likes = np.array(rows, dtype=np.int64).T
+            if ids.max() >= len(counts):
+                counts = np.zeros(int(ids.max()) + 1, dtype=np.int64)
+            counts[ids] = likes
+        with self._lock:
+            for artwork_id, delta in self._pending.items():
+                if artwork_id < len(counts):
+                    counts[artwork_id] = max(counts[artwork_id] + delta, 0)
+            self.counts = counts
+
+    def rebuild(self):
+        """Recount ArtworkLike into ArtworkLikeCount and reload"""
+        rows = (
+            ArtworkLike.objects.values("artwork_id")
+            .annotate(likes=Count("id"))
+            .values_list("artwork_id", "likes")
+        )
+        with transaction.atomic():
+            ArtworkLikeCount.objects.all().delete()
+            ArtworkLikeCount.objects.bulk_create(
+                [ArtworkLikeCount(artwork_id=artwork_id, likes=likes) for artwork_id, likes in rows],
+                batch_size=5000,
+            )
+        with self._lock:
+            self._pending.clear()
+        self.refresh()
+
+
+# Global instance
+like_counter = None
+_like_counter_lock = threading.Lock()
+
+
+def get_like_counter():
+    """Get or create the process-wide like counter store"""
+    global like_counter
+    if like_counter is None:
+        with _like_counter_lock:
+            if like_counter is None:
+                store = LikeCounterStore(
+                    flush_interval=getattr(settings, "LIKE_COUNTER_FLUSH_INTERVAL", 5.0),
+                    flush_batch=getattr(settings, "LIKE_COUNTER_FLUSH_BATCH", 1000),
+                )
+                store.refresh()
+                store.start()
+                atexit.register(store.stop)
+                like_counter = store
+    return like_counter
+
+
+def record_like_changes(liked=(), unliked=()):
+    """Count committed likes/unlikes once the surrounding transaction commits"""
+    deltas = defaultdict(int)
+    for artwork_id in liked:
+        deltas[artwork_id] += 1
+    for artwork_id in unliked:
+        deltas[artwork_id] -= 1
+    if not deltas:
+        return
+
+    transaction.on_commit(lambda: get_like_counter().record(dict(deltas)))
@@ -0,0 +1,44 @@
+"""
+Cached per-user like summaries for profile responses
+
+A summary holds the user's like count and their most recent liked artwork
+ids (at most PROFILE_LIKED_ARTWORKS_PREVIEW), so serializing a profile costs
+no queries on a cache hit and stays constant-size for heavy likers. Views
+that write ArtworkLike rows call invalidate_like_summary(). Summaries live
+in Django's default cache; configure a shared backend (Redis, Memcached)
+when running several worker processes so invalidation reaches all of them.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def like_summary_key(user_id):
+    return f"users:like-summary:{user_id}"
+
+
+def build_like_summary(user):
+    preview_size = getattr(settings, "PROFILE_LIKED_ARTWORKS_PREVIEW", 50)
+    recent = list(
+        user.artwork_likes.order_by("-liked_at", "-id").values_list("artwork_id", flat=True)[
+            : preview_size + 1
+        ]
+    )
+    count = len(recent) if len(recent) <= preview_size else user.artwork_likes.count()
+    return {"count": count, "recent": recent[:preview_size]}
+
+
+def get_like_summary(user):
+    """{"count": total likes, "recent": newest liked artwork ids}"""
+    key = like_summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_like_summary(user)
+        cache.set(key, summary, getattr(settings, "LIKE_SUMMARY_CACHE_TTL", 300))
+    return summary
+
+
+def invalidate_like_summary(user_id):
+    """Drop the cached summary once the surrounding transaction commits"""
+    transaction.on_commit(lambda: cache.delete(like_summary_key(user_id)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from backend.users.like_counters import LikeCounterStore
+from backend.users.models import ArtworkLikeCount
+
+
+class Command(BaseCommand):
+    help = "Recount ArtworkLike rows into the denormalized ArtworkLikeCount table"
+
+    def handle(self, *args, **options):
+        store = LikeCounterStore()
+        store.rebuild()
+        total = int(store.counts.sum())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt like counts: {ArtworkLikeCount.objects.count()} artworks, {total} likes"
+            )
+        )
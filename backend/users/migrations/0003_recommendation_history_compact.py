@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:39
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_artworklikecount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userrecommendationhistory',
+            name='recommended_ids_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userrecommendationhistory',
+            name='recommended_artwork_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userrecommendationhistory',
+            name='source_artwork_id',
+            field=models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:39
+
+import backend.users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_recommendation_history_compact'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', backend.users.models.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def seed_like_counts(apps, schema_editor):
+    """Recount existing likes, so counters start from the real totals"""
+    ArtworkLike = apps.get_model("users", "ArtworkLike")
+    ArtworkLikeCount = apps.get_model("users", "ArtworkLikeCount")
+    rows = (
+        ArtworkLike.objects.values("artwork_id")
+        .annotate(likes=Count("id"))
+        .values_list("artwork_id", "likes")
+    )
+    ArtworkLikeCount.objects.all().delete()
+    ArtworkLikeCount.objects.bulk_create(
+        [ArtworkLikeCount(artwork_id=artwork_id, likes=likes) for artwork_id, likes in rows],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_manager"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_like_counts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,32 @@
+import numpy as np
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.dispatch import Signal
+
+# Sent with user_ids after QuerySet.update() changed users, which bypasses
+# post_save; cached auth tokens of those users are retired on it
+users_updated = Signal()
+
+
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        user_ids = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        users_updated.send(sender=self.model, user_ids=user_ids)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
     """Extended user model with profile information"""
 
+    objects = UserManager()
+
     bio = models.TextField(blank=True, max_length=500)
     location = models.CharField(max_length=100, blank=True)
     birth_date = models.DateField(null=True, blank=True)
@@ -22,6 +43,10 @@ class User(AbstractUser):
 
     def get_liked_count(self):
         """Get total number of artworks liked by user"""
+        # Set by querysets annotated with Count("artwork_likes")
+        annotated = getattr(self, "liked_count", None)
+        if annotated is not None:
+            return annotated
         return self.artwork_likes.count()
 
 
@@ -42,14 +67,30 @@ class ArtworkLike(models.Model):
         return f"{self.user.username} likes artwork {self.artwork_id}"
 
 
+class ArtworkLikeCount(models.Model):
+    """Denormalized like count per artwork, maintained by LikeCounterStore"""
+
+    artwork_id = models.IntegerField(primary_key=True, validators=[MinValueValidator(0)])
+    likes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Artwork {self.artwork_id}: {self.likes} likes"
+
+
 class UserRecommendationHistory(models.Model):
     """Track recommendation history for analytics"""
 
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="recommendation_history"
     )
-    source_artwork_id = models.IntegerField(validators=[MinValueValidator(0)])
-    recommended_artwork_ids = models.JSONField()  # List of recommended artwork IDs
+    # Null for profile-based recommendations without a source artwork
+    source_artwork_id = models.IntegerField(
+        null=True, blank=True, validators=[MinValueValidator(0)]
+    )
+    recommended_artwork_ids = models.JSONField(null=True, blank=True)  # List of recommended artwork IDs
+    # Compact alternative to recommended_artwork_ids: little-endian uint32 ids
+    recommended_ids_packed = models.BinaryField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -57,3 +98,13 @@ class UserRecommendationHistory(models.Model):
 
     def __str__(self):
         return f"Recommendations for {self.user.username} from artwork {self.source_artwork_id}"
+
+    @staticmethod
+    def pack_artwork_ids(artwork_ids):
+        return np.asarray(artwork_ids, dtype="<u4").tobytes()
+
+    def get_recommended_artwork_ids(self):
+        """Recommended ids from whichever storage the row uses"""
+        if self.recommended_ids_packed is not None:
+            return np.frombuffer(bytes(self.recommended_ids_packed), dtype="<u4").tolist()
+        return self.recommended_artwork_ids or []
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
+from .like_summary import get_like_summary
 from .models import User, ArtworkLike, UserRecommendationHistory
 
 
@@ -38,10 +40,38 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    """Serializer for user profile"""
-
-    liked_count = serializers.ReadOnlyField(source="get_liked_count")
-    liked_artworks = serializers.ReadOnlyField(source="get_liked_artworks")
+    """
+    Serializer for user profile
+
+    liked_artworks holds only the most recent liked ids (see
+    PROFILE_LIKED_ARTWORKS_PREVIEW); page through the rest with
+    /api/users/profile/liked_artworks/.
+    """
+
+    liked_count = serializers.SerializerMethodField()
+    liked_artworks = serializers.SerializerMethodField()
+    liked_artworks_truncated = serializers.SerializerMethodField()
+
+    def _summary(self, obj):
+        # One cache lookup per serialized user
+        cached = getattr(obj, "_like_summary", None)
+        if cached is None:
+            cached = obj._like_summary = get_like_summary(obj)
+        return cached
+
+    def get_liked_count(self, obj):
+        # Querysets annotated with Count("artwork_likes") skip the summary
+        annotated = getattr(obj, "liked_count", None)
+        if annotated is not None:
+            return annotated
+        return self._summary(obj)["count"]
+
+    def get_liked_artworks(self, obj):
+        return self._summary(obj)["recent"]
+
+    def get_liked_artworks_truncated(self, obj):
+        summary = self._summary(obj)
+        return summary["count"] > len(summary["recent"])
 
     class Meta:
         model = User
@@ -57,6 +87,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "avatar",
             "liked_count",
             "liked_artworks",
+            "liked_artworks_truncated",
             "date_joined",
         ]
         read_only_fields = ["id", "username", "date_joined"]
@@ -93,9 +124,30 @@ class ArtworkLikeSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "liked_at"]
 
 
+class LikeOperationSerializer(serializers.Serializer):
+    """One queued like/unlike operation"""
+
+    artwork_id = serializers.IntegerField(min_value=0)
+    action = serializers.ChoiceField(choices=["like", "unlike"])
+
+
+class LikeSyncSerializer(serializers.Serializer):
+    """A batch of like/unlike operations, applied in order"""
+
+    operations = LikeOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=getattr(settings, "LIKE_SYNC_MAX_OPERATIONS", 500),
+    )
+
+
 class UserRecommendationHistorySerializer(serializers.ModelSerializer):
     """Serializer for recommendation history"""
 
+    recommended_artwork_ids = serializers.ListField(
+        source="get_recommended_artwork_ids", read_only=True
+    )
+
     class Meta:
         model = UserRecommendationHistory
         fields = ["id", "source_artwork_id", "recommended_artwork_ids", "created_at"]
@@ -0,0 +1,316 @@
+import atexit
+import contextlib
+import importlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from pipeline import synthetic_interactions
+
+from . import authentication, history_logger, like_counters, views
+from .models import ArtworkLike, ArtworkLikeCount, User, UserRecommendationHistory
+
+
+# No background thread: record() flushes synchronously
+@override_settings(LIKE_COUNTER_FLUSH_INTERVAL=0)
+class SyncLikesTests(APITestCase):
+    url = "/api/users/profile/sync_likes/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sync", email="sync@example.com", password="sync"
+        )
+        for artwork_id in (1, 2):
+            ArtworkLike.objects.create(user=self.user, artwork_id=artwork_id)
+        self.client.force_authenticate(self.user)
+
+        like_counters.like_counter = None
+        self.counter = like_counters.get_like_counter()
+        self.counter.rebuild()
+
+    def tearDown(self):
+        # The test database is gone by exit time
+        atexit.unregister(self.counter.stop)
+        like_counters.like_counter = None
+
+    def test_mixed_batch_round_trips(self):
+        operations = [
+            {"artwork_id": 3, "action": "like"},
+            {"artwork_id": 1, "action": "unlike"},
+            {"artwork_id": 2, "action": "like"},
+            {"artwork_id": 5, "action": "unlike"},
+            {"artwork_id": 4, "action": "like"},
+            {"artwork_id": 4, "action": "unlike"},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            # Savepoint, user lock, existing likes, insert, delete, count, release
+            with self.assertNumQueries(7):
+                response = self.client.post(
+                    self.url, {"operations": operations}, format="json"
+                )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["liked"], [2, 3])
+        self.assertEqual(response.data["unliked"], [1, 4, 5])
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["deleted"], 1)
+        self.assertEqual(response.data["liked_count"], 2)
+        self.assertEqual(
+            set(ArtworkLike.objects.filter(user=self.user).values_list("artwork_id", flat=True)),
+            {2, 3},
+        )
+        self.assertEqual(self.counter.get_many([1, 2, 3, 4, 5]), [0, 1, 1, 0, 0])
+
+    def test_repeated_batch_changes_nothing(self):
+        operations = [
+            {"artwork_id": 3, "action": "like"},
+            {"artwork_id": 1, "action": "unlike"},
+        ]
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    self.url, {"operations": operations}, format="json"
+                )
+
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(response.data["deleted"], 0)
+        self.assertEqual(response.data["liked_count"], 2)
+        self.assertEqual(self.counter.get_many([1, 2, 3]), [0, 1, 1])
+
+    def test_unlike_takes_the_user_lock(self):
+        with patch.object(views, "lock_user", wraps=views.lock_user) as lock:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(
+                    "/api/users/profile/unlike_artwork/", {"artwork_id": 1}, format="json"
+                )
+        self.assertEqual(response.status_code, 200)
+        lock.assert_called_once()
+        self.assertEqual(self.counter.get(1), 0)
+
+    def test_unknown_artwork_rejected(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                self.url,
+                {"operations": [{"artwork_id": 10**9, "action": "like"}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["artwork_ids"], [10**9])
+
+
+class LikeCounterRefreshTests(TransactionTestCase):
+    def test_full_batch_is_written_by_the_flush_thread(self):
+        store = like_counters.LikeCounterStore(flush_interval=60, flush_batch=1)
+        store.start()
+        try:
+            with self.assertNumQueries(0):
+                store.record({7: 1})
+            self.assertEqual(store.get(7), 1)
+
+            deadline = time.monotonic() + 5
+            while not ArtworkLikeCount.objects.filter(artwork_id=7, likes=1).exists():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.02)
+        finally:
+            store.stop()
+
+    def test_migration_seeds_counts_from_existing_likes(self):
+        user = User.objects.create_user(username="seed", email="seed@example.com", password="seed")
+        other = User.objects.create_user(
+            username="seed2", email="seed2@example.com", password="seed"
+        )
+        ArtworkLike.objects.bulk_create(
+            [
+                ArtworkLike(user=user, artwork_id=3),
+                ArtworkLike(user=other, artwork_id=3),
+                ArtworkLike(user=user, artwork_id=8),
+            ]
+        )
+        ArtworkLikeCount.objects.create(artwork_id=9, likes=4)  # stale
+
+        seed_migration = importlib.import_module(
+            "backend.users.migrations.0005_seed_artworklikecount"
+        )
+        seed_migration.seed_like_counts(django_apps, None)
+        self.assertEqual(
+            dict(ArtworkLikeCount.objects.values_list("artwork_id", "likes")), {3: 2, 8: 1}
+        )
+
+    def test_reader_picks_up_other_workers_counts(self):
+        writer = like_counters.LikeCounterStore(flush_interval=60)
+        reader = like_counters.LikeCounterStore(flush_interval=0.05)
+        reader.refresh()
+        reader.start()
+        try:
+            writer.record({7: 2})
+            writer.flush()
+
+            deadline = time.monotonic() + 5
+            while reader.get(7) != 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(reader.get(7), 2)
+        finally:
+            reader.stop()
+
+
+class RecommendationHistoryLoggerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="history", email="history@example.com", password="history"
+        )
+
+    def make_logger(self, start=True, **kwargs):
+        logger = history_logger.RecommendationHistoryLogger(**kwargs)
+        if start:
+            logger.start()
+            # The test database is gone by exit time
+            atexit.unregister(logger.stop)
+            self.addCleanup(logger.stop)
+        return logger
+
+    def wait_for_rows(self, count):
+        deadline = time.monotonic() + 5
+        while (
+            UserRecommendationHistory.objects.count() < count and time.monotonic() < deadline
+        ):
+            time.sleep(0.02)
+        return list(UserRecommendationHistory.objects.order_by("id"))
+
+    @staticmethod
+    def events(result):
+        return history_logger.HISTORY_EVENTS.values.get((result,), 0)
+
+    def test_full_batch_is_written_without_waiting_for_the_interval(self):
+        logger = self.make_logger(batch_size=3, flush_interval=60)
+        for source in range(3):
+            logger.log(self.user.pk, source, [source, 70_000, 4_000_000_000])
+
+        rows = self.wait_for_rows(3)
+        self.assertEqual([row.source_artwork_id for row in rows], [0, 1, 2])
+        self.assertEqual(rows[2].get_recommended_artwork_ids(), [2, 70_000, 4_000_000_000])
+        self.assertIsNone(rows[2].recommended_artwork_ids)
+
+    def test_partial_batch_is_written_after_the_interval(self):
+        logger = self.make_logger(batch_size=100, flush_interval=0.05, compact=False)
+        logger.log(self.user.pk, None, [1, 2])
+        rows = self.wait_for_rows(1)
+        self.assertEqual(rows[0].recommended_artwork_ids, [1, 2])
+
+    def test_full_queue_drops_and_counts(self):
+        logger = self.make_logger(start=False, max_queue=2, overload_sample_rate=1.0)
+        dropped = self.events("dropped")
+        self.assertTrue(logger.log(self.user.pk, 1, [2]))
+        self.assertTrue(logger.log(self.user.pk, 1, [3]))
+        self.assertFalse(logger.log(self.user.pk, 1, [4]))
+        self.assertEqual(self.events("dropped"), dropped + 1)
+
+    def test_overloaded_queue_keeps_the_sample_rate(self):
+        logger = self.make_logger(start=False, max_queue=10, overload_sample_rate=0.25)
+        for artwork_id in range(6):
+            logger.log(self.user.pk, artwork_id, [])  # below half full: all kept
+        self.assertEqual(logger.queue.qsize(), 6)
+
+        sampled_out = self.events("sampled_out")
+        with patch.object(history_logger.random, "random", side_effect=[0.1, 0.5, 0.9]):
+            kept = [logger.log(self.user.pk, 1, []) for _ in range(3)]
+        self.assertEqual(kept, [True, False, False])
+        self.assertEqual(self.events("sampled_out"), sampled_out + 2)
+
+    def test_stop_flushes_the_queue(self):
+        logger = self.make_logger(batch_size=1000, flush_interval=60)
+        for source in range(5):
+            logger.log(self.user.pk, source, [source])
+        logger.stop()
+
+        self.assertFalse(logger._thread.is_alive())
+        self.assertEqual(UserRecommendationHistory.objects.count(), 5)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    url = "/api/users/profile/me/"
+
+    def setUp(self):
+        authentication.token_cache = None
+        self.user = User.objects.create_user(
+            username="token", email="token@example.com", password="old-password"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        # Warm the cache
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIsNotNone(authentication.get_token_cache().get(self.token.key))
+
+    def tearDown(self):
+        authentication.token_cache = None
+
+    def assert_rejected(self):
+        self.assertIsNone(authentication.get_token_cache().get(self.token.key))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_cached_copies_do_not_share_state(self):
+        cache = authentication.get_token_cache()
+        first, _ = cache.get(self.token.key)
+        second, second_token = cache.get(self.token.key)
+        self.assertIsNot(first._state, second._state)
+        self.assertIs(second_token.user, second)
+
+    def test_logout_retires_the_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post("/api/users/logout/").status_code, 200)
+        self.assert_rejected()
+
+    def test_password_change_drops_the_cached_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new-password")
+            self.user.save()
+        self.assertIsNone(authentication.get_token_cache().get(self.token.key))
+        user, _ = authentication.CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+        self.assertTrue(user.check_password("new-password"))
+
+    def test_deactivation_on_save_retires_the_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assert_rejected()
+
+    def test_deactivation_through_queryset_update_retires_the_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assert_rejected()
+
+
+class SyntheticFixtureTests(TestCase):
+    def test_loading_fixtures_keeps_existing_likes(self):
+        user = User.objects.create_user(
+            username="real", email="real@example.com", password="real"
+        )
+        existing = ArtworkLike.objects.create(user=user, artwork_id=1)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        fixtures = os.path.join(directory, "likes.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            synthetic_interactions.main(
+                [
+                    "--users", "20",
+                    "--output", os.path.join(directory, "utility_matrix.csv"),
+                    "--fixtures", fixtures,
+                    "--fixture-users", "5",
+                ]
+            )
+            call_command("loaddata", fixtures, verbosity=0)
+
+        self.assertTrue(ArtworkLike.objects.filter(pk=existing.pk, user=user).exists())
+        synthetic = ArtworkLike.objects.filter(user__username__startswith="synthetic_user_")
+        self.assertGreater(synthetic.count(), 0)
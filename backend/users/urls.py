@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserRegistrationView, UserLoginView, UserProfileViewSet
+from .views import UserRegistrationView, UserLoginView, UserLogoutView, UserProfileViewSet
 
 router = DefaultRouter()
 router.register(r"profile", UserProfileViewSet, basename="user-profile")
@@ -8,5 +8,6 @@ router.register(r"profile", UserProfileViewSet, basename="user-profile")
 urlpatterns = [
     path("register/", UserRegistrationView.as_view(), name="user-register"),
     path("login/", UserLoginView.as_view(), name="user-login"),
+    path("logout/", UserLogoutView.as_view(), name="user-logout"),
     path("", include(router.urls)),
 ]
@@ -4,17 +4,44 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import login
+from django.contrib.auth import login, logout
+from django.db import transaction
+from django.db.models import Count
 
+from backend.metrics import LIKE_WRITES
+from backend.ml_models.model_loader import get_recommender
+
+from .like_counters import record_like_changes
+from .like_summary import get_like_summary, invalidate_like_summary
 from .models import User, ArtworkLike, UserRecommendationHistory
 from .serializers import (
     UserRegistrationSerializer,
     UserProfileSerializer,
     UserLoginSerializer,
     ArtworkLikeSerializer,
+    LikeSyncSerializer,
 )
 
 
+def lock_user(user):
+    """
+    Lock the user's row for the rest of the transaction, serializing that
+    user's like writes so like counter deltas match the rows written
+    """
+    User.objects.select_for_update().only("pk").get(pk=user.pk)
+
+
+def parse_artwork_id(value):
+    """Return value as a catalog artwork id, or None if it is not one"""
+    try:
+        artwork_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    if get_recommender().get_artwork_by_id(artwork_id) is None:
+        return None
+    return artwork_id
+
+
 class UserRegistrationView(APIView):
     """User registration endpoint"""
 
@@ -57,6 +84,17 @@ class UserLoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UserLogoutView(APIView):
+    """User logout endpoint; revokes the API token"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        logout(request)
+        return Response({"message": "Logout successful"})
+
+
 class UserProfileViewSet(ModelViewSet):
     """User profile management"""
 
@@ -65,7 +103,9 @@ class UserProfileViewSet(ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return User.objects.filter(id=self.request.user.id)
+        return User.objects.filter(id=self.request.user.id).annotate(
+            liked_count=Count("artwork_likes")
+        )
 
     @action(detail=False, methods=["get"])
     def me(self, request):
@@ -77,14 +117,25 @@ class UserProfileViewSet(ModelViewSet):
     def like_artwork(self, request):
         """Like an artwork"""
         artwork_id = request.data.get("artwork_id")
-        if not artwork_id:
+        if artwork_id is None:
             return Response(
                 {"error": "artwork_id is required"}, status=status.HTTP_400_BAD_REQUEST
             )
+        artwork_id = parse_artwork_id(artwork_id)
+        if artwork_id is None:
+            return Response(
+                {"error": "Unknown artwork_id"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-        like, created = ArtworkLike.objects.get_or_create(
-            user=request.user, artwork_id=int(artwork_id)
-        )
+        with transaction.atomic():
+            lock_user(request.user)
+            like, created = ArtworkLike.objects.get_or_create(
+                user=request.user, artwork_id=artwork_id
+            )
+            if created:
+                record_like_changes(liked=[artwork_id])
+                invalidate_like_summary(request.user.id)
+        LIKE_WRITES.labels("like", "created" if created else "exists").inc()
 
         if created:
             return Response(
@@ -103,29 +154,142 @@ class UserProfileViewSet(ModelViewSet):
     def unlike_artwork(self, request):
         """Unlike an artwork"""
         artwork_id = request.data.get("artwork_id")
-        if not artwork_id:
+        if artwork_id is None:
             return Response(
                 {"error": "artwork_id is required"}, status=status.HTTP_400_BAD_REQUEST
             )
-
-        try:
-            like = ArtworkLike.objects.get(
-                user=request.user, artwork_id=int(artwork_id)
+        artwork_id = parse_artwork_id(artwork_id)
+        if artwork_id is None:
+            return Response(
+                {"error": "Unknown artwork_id"}, status=status.HTTP_400_BAD_REQUEST
             )
-            like.delete()
-            return Response({"message": "Artwork unliked"})
-        except ArtworkLike.DoesNotExist:
+
+        # Count only what this request deleted, under the same user lock as
+        # like_artwork and sync_likes, so concurrent writes are counted once
+        with transaction.atomic():
+            lock_user(request.user)
+            deleted, _ = ArtworkLike.objects.filter(
+                user=request.user, artwork_id=artwork_id
+            ).delete()
+            if deleted:
+                record_like_changes(unliked=[artwork_id])
+                invalidate_like_summary(request.user.id)
+        if not deleted:
+            LIKE_WRITES.labels("unlike", "missing").inc()
             return Response(
                 {"error": "Like not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        LIKE_WRITES.labels("unlike", "deleted").inc()
+        return Response({"message": "Artwork unliked"})
+
+    @action(detail=False, methods=["post"])
+    def sync_likes(self, request):
+        """
+        Apply a batch of like/unlike operations, e.g. an offline queue
+
+        Operations are applied in order, so the last one per artwork wins.
+        Writes go through one bulk insert and one filtered delete inside a
+        single transaction, with the user's row locked so concurrent batches
+        see each other's likes and count each change once. Returns the
+        resulting state of the artworks in the batch and the user's total
+        like count.
+        """
+        serializer = LikeSyncSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        desired = {}
+        for operation in serializer.validated_data["operations"]:
+            desired[operation["artwork_id"]] = operation["action"] == "like"
+
+        recommender = get_recommender()
+        unknown = sorted(
+            artwork_id
+            for artwork_id in desired
+            if recommender.get_artwork_by_id(artwork_id) is None
+        )
+        if unknown:
+            return Response(
+                {"error": "Unknown artwork ids", "artwork_ids": unknown},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        liked = sorted(artwork_id for artwork_id, like in desired.items() if like)
+        unliked = sorted(artwork_id for artwork_id, like in desired.items() if not like)
+
+        with transaction.atomic():
+            lock_user(request.user)
+            existing = set(
+                ArtworkLike.objects.filter(
+                    user=request.user, artwork_id__in=list(desired)
+                ).values_list("artwork_id", flat=True)
+            )
+            to_create = [artwork_id for artwork_id in liked if artwork_id not in existing]
+            to_delete = [artwork_id for artwork_id in unliked if artwork_id in existing]
+
+            if to_create:
+                ArtworkLike.objects.bulk_create(
+                    [
+                        ArtworkLike(user=request.user, artwork_id=artwork_id)
+                        for artwork_id in to_create
+                    ],
+                    ignore_conflicts=True,
+                )
+            if to_delete:
+                ArtworkLike.objects.filter(
+                    user=request.user, artwork_id__in=to_delete
+                ).delete()
+            liked_count = ArtworkLike.objects.filter(user=request.user).count()
+            record_like_changes(liked=to_create, unliked=to_delete)
+            if to_create or to_delete:
+                invalidate_like_summary(request.user.id)
+
+        LIKE_WRITES.labels("like", "created").inc(len(to_create))
+        LIKE_WRITES.labels("like", "exists").inc(len(liked) - len(to_create))
+        LIKE_WRITES.labels("unlike", "deleted").inc(len(to_delete))
+        LIKE_WRITES.labels("unlike", "missing").inc(len(unliked) - len(to_delete))
 
-    @action(detail=False, methods=["get"])
-    def liked_artworks(self, request):
-        """Get user's liked artworks"""
-        likes = ArtworkLike.objects.filter(user=request.user).order_by("-liked_at")
         return Response(
             {
-                "likes": ArtworkLikeSerializer(likes, many=True).data,
-                "count": likes.count(),
+                "liked": liked,
+                "unliked": unliked,
+                "created": len(to_create),
+                "deleted": len(to_delete),
+                "liked_count": liked_count,
             }
         )
+
+    @action(detail=False, methods=["get"])
+    def liked_artworks(self, request):
+        """
+        Get user's liked artworks, newest first
+
+        Pass `page` and `page_size` to page through long histories (all likes
+        are returned otherwise), and `compact=1` for bare artwork ids
+        instead of serialized likes.
+        """
+        likes = ArtworkLike.objects.filter(user=request.user).order_by("-liked_at", "-id")
+        count = get_like_summary(request.user)["count"]
+        compact = request.GET.get("compact") in ("1", "true")
+        response_data = {"count": count}
+
+        if "page" in request.GET or "page_size" in request.GET:
+            try:
+                page = max(int(request.GET.get("page", 1)), 1)
+                page_size = min(max(int(request.GET.get("page_size", 100)), 1), 1000)
+            except ValueError:
+                return Response(
+                    {"error": "page and page_size must be integers"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            start = (page - 1) * page_size
+            likes = likes[start : start + page_size]
+            response_data.update(
+                page=page, page_size=page_size, has_next=start + page_size < count
+            )
+
+        if compact:
+            response_data["artwork_ids"] = list(likes.values_list("artwork_id", flat=True))
+        else:
+            response_data["likes"] = ArtworkLikeSerializer(likes, many=True).data
+        return Response(response_data)
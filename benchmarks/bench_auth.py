@@ -0,0 +1,95 @@
+"""
+Token authentication benchmark
+
+Compares DRF's TokenAuthentication with CachedTokenAuthentication on a
+throwaway test database. For each backend it reports the queries and time
+per call for
+
+    authenticate  authenticate() on a request carrying the token
+    profile_me    GET /api/users/profile/me/ through UserProfileViewSet
+
+measured once cold (first request for the token) and then warm. The
+cached backend should need zero queries for warm tokens.
+
+Usage:
+    python -m benchmarks.bench_auth --requests 2000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+logging.getLogger("backend").setLevel(logging.WARNING)
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from backend.users.authentication import CachedTokenAuthentication, get_token_cache
+from backend.users.models import User
+from backend.users.views import UserProfileViewSet
+
+BACKENDS = {
+    "token": TokenAuthentication,
+    "cached_token": CachedTokenAuthentication,
+}
+
+
+def run(func, n_requests):
+    """(queries on the first call, mean queries and median µs on the rest)"""
+    with CaptureQueriesContext(connection) as cold:
+        func()
+    timings = []
+    with CaptureQueriesContext(connection) as warm:
+        for _ in range(n_requests):
+            t0 = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - t0) * 1e6)
+    return len(cold), len(warm) / n_requests, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Warm calls per scenario")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username="bench", email="bench@example.com", password="bench")
+        token = Token.objects.create(user=user)
+        factory = APIRequestFactory()
+        header = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+        print(f"{'scenario':<28} {'cold queries':>12} {'warm queries':>13} {'median µs':>10}")
+        for name, backend in BACKENDS.items():
+            get_token_cache().clear()
+            authenticator = backend()
+            me = UserProfileViewSet.as_view({"get": "me"}, authentication_classes=[backend])
+
+            def authenticate():
+                authenticator.authenticate(Request(factory.get("/", **header)))
+
+            def profile_me():
+                response = me(factory.get("/api/users/profile/me/", **header))
+                assert response.status_code == 200, response.status_code
+
+            for scenario, func in (("authenticate", authenticate), ("profile_me", profile_me)):
+                get_token_cache().clear()
+                cold, warm, median = run(func, args.requests)
+                print(f"{name + '/' + scenario:<28} {cold:>12} {warm:>13.2f} {median:>10.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Micro-benchmarks for the recommender hot paths
+
+Builds synthetic model bundles for each catalog size, then times:
+
+    load_model              ArtworkRecommender(models_path)
+    user_preferences        get_user_preferences for a user with N likes
+    recommend_artwork       get_recommendations(artwork_id)
+    recommend_artwork_user  get_recommendations(artwork_id, user_id)
+    recommend_artwork_weighted
+                            recommend(artwork_id) with style-only weights
+    recommend_user          get_recommendations(user_id)
+    recommend_user_budget   recommend(user_id) within a 50 ms Deadline
+    search                  search("monet impressionism") over the inverted index
+    enrich_batch            enrich_artworks_batch on a 100-artwork page
+    enrich_batch_sparse     the same with fields=id,title,image_url
+    render_list             JSONRenderer on an enriched 100-artwork page
+    render_list_fast        FastJSONRenderer (orjson) on the same page
+    render_recommendations  JSONRenderer on an enriched recommendation payload
+    render_recommendations_fast
+                            FastJSONRenderer on the same payload
+    compress_list_gzip      gzip of the rendered page, as CompressionMiddleware does
+    compress_list_br        brotli of the rendered page
+
+Results are written as JSON and compared against a stored baseline
+(benchmarks/baseline.json is committed); the run exits with status 1 when
+any median regresses beyond --threshold. With --ci (the default when the
+CI environment variable is set) a missing baseline exits with status 2
+instead of passing.
+
+Usage:
+    python -m benchmarks.bench_recommender --sizes 1k,100k --output results.json
+    python -m benchmarks.bench_recommender --save-baseline
+    python -m benchmarks.bench_recommender --baseline benchmarks/baseline.json --ci
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import pickle
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+logging.getLogger("backend").setLevel(logging.WARNING)
+
+import numpy as np
+import pandas as pd
+from rest_framework.renderers import JSONRenderer
+from scipy.sparse import save_npz
+
+from backend import compression
+from backend.api.renderers import FastJSONRenderer
+from backend.ml_models.deadlines import Deadline
+from backend.ml_models.model_loader import ArtworkRecommender
+from backend.ml_models.wikiart_api_client import get_wikiart_client
+from pipeline.training_script import IncrementalTermCounter, build_artwork, fit_tfidf
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Users 0, 1 and 2 hold these many likes in every synthetic bundle
+HISTORY_USERS = {0: 0, 10: 1, 1000: 2}
+
+
+def build_bundle(path, n_artworks, seed=0):
+    """Write a synthetic model bundle with the layout ArtworkRecommender loads"""
+    rng = np.random.default_rng(seed)
+    n_artists = max(24, n_artworks // 100)
+    artists = rng.integers(1, n_artists + 1, n_artworks)
+    styles = rng.integers(1, 28, n_artworks)
+    genres = rng.integers(1, 11, n_artworks)
+
+    metadata = []
+    texts = []
+    for i in range(n_artworks):
+        entry, text = build_artwork(
+            {"artist": str(artists[i]), "style": str(styles[i]), "genre": str(genres[i])}, i
+        )
+        metadata.append(entry)
+        texts.append(text)
+
+    counter = IncrementalTermCounter("tfidf")
+    chunks = [counter.transform_chunk(texts[i : i + 50_000]) for i in range(0, n_artworks, 50_000)]
+    vectorizer, tfidf_matrix = fit_tfidf(chunks, counter, max_features=None)
+
+    # Dedicated history users plus background traffic
+    frames = []
+    for history, user_id in HISTORY_USERS.items():
+        liked = rng.choice(n_artworks, size=min(history, n_artworks), replace=False)
+        frames.append(pd.DataFrame({"user_id": user_id, "artwork_id": liked, "rating": 1}))
+    n_background = min(10 * n_artworks, 2_000_000)
+    frames.append(
+        pd.DataFrame(
+            {
+                "user_id": rng.integers(100, 100 + max(n_artworks // 10, 10), n_background),
+                "artwork_id": rng.integers(0, n_artworks, n_background),
+                "rating": rng.integers(0, 2, n_background),
+            }
+        )
+    )
+    utility_matrix = pd.concat(frames, ignore_index=True)
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "metadata.json"), "w") as f:
+        json.dump(metadata, f)
+    save_npz(os.path.join(path, "tfidf_matrix.npz"), tfidf_matrix)
+    with open(os.path.join(path, "vectorizer.pkl"), "wb") as f:
+        pickle.dump(vectorizer, f)
+    with open(os.path.join(path, "model_info.json"), "w") as f:
+        json.dump({"n_artworks": n_artworks, "model_version": "bench"}, f)
+    utility_matrix.to_csv(os.path.join(path, "utility_matrix.csv"), index=False)
+
+
+def load_quietly(models_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ArtworkRecommender(models_path)
+
+
+def measure(func, min_time=0.2, max_rounds=50):
+    """Run func until min_time has elapsed or max_rounds is reached"""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append((time.perf_counter() - t0) * 1000)
+        if time.perf_counter() - started >= min_time:
+            break
+
+    ordered = sorted(timings)
+    return {
+        "rounds": len(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.mean(timings),
+        "min_ms": ordered[0],
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+    }
+
+
+def run_catalog(size_label, n_artworks, histories, args, results):
+    with tempfile.TemporaryDirectory(prefix=f"bench-{size_label}-") as models_path:
+        print(f"Building {size_label} catalog ({n_artworks:,} artworks)...", flush=True)
+        build_bundle(models_path, n_artworks)
+
+        # First load persists the enrichment store, as a deployed model would
+        recommender = load_quietly(models_path)
+        wikiart_client = get_wikiart_client()
+
+        def record(name, func, history=None, **kwargs):
+            key = f"{name}[catalog={size_label}" + (f",history={history}]" if history is not None else "]")
+            results[key] = measure(func, args.min_time, kwargs.get("max_rounds", args.max_rounds))
+            print(f"  {key:<55} {results[key]['median_ms']:>10.3f} ms", flush=True)
+
+        record("load_model", lambda: load_quietly(models_path), max_rounds=3)
+
+        record("search", lambda: recommender.search("monet impressionism"))
+
+        page = recommender.metadata[:100]
+        record("enrich_batch", lambda: wikiart_client.enrich_artworks_batch(page))
+        sparse_fields = frozenset({"id", "title", "image_url"})
+        record(
+            "enrich_batch_sparse",
+            lambda: wikiart_client.enrich_artworks_batch(page, sparse_fields),
+        )
+        enriched_page = wikiart_client.enrich_artworks_batch(page)
+        list_payload = {"artworks": enriched_page, "total": n_artworks}
+        record("render_list", lambda: JSONRenderer().render(list_payload))
+        record("render_list_fast", lambda: FastJSONRenderer().render(list_payload))
+
+        rendered_page = FastJSONRenderer().render(list_payload)
+        record("compress_list_gzip", lambda: compression.compress(rendered_page, "gzip"))
+        record("compress_list_br", lambda: compression.compress(rendered_page, "br"))
+
+        record("recommend_artwork", lambda: recommender.get_recommendations(artwork_id=7))
+        style_only = recommender.resolve_weights({"artist": 0, "genre": 0})
+        record(
+            "recommend_artwork_weighted",
+            lambda: recommender.recommend(artwork_id=7, weights=style_only),
+        )
+        recommendations = wikiart_client.enrich_artworks_batch(
+            recommender.get_recommendations(artwork_id=7)
+        )
+        recommendations_payload = {"recommendations": recommendations, "count": len(recommendations)}
+        record("render_recommendations", lambda: JSONRenderer().render(recommendations_payload))
+        record(
+            "render_recommendations_fast",
+            lambda: FastJSONRenderer().render(recommendations_payload),
+        )
+
+        for history in histories:
+            user_id = HISTORY_USERS[history]
+            record(
+                "user_preferences",
+                lambda: recommender.get_user_preferences(user_id),
+                history,
+            )
+            record(
+                "recommend_artwork_user",
+                lambda: recommender.get_recommendations(artwork_id=7, user_id=user_id),
+                history,
+            )
+            record(
+                "recommend_user",
+                lambda: recommender.get_recommendations(user_id=user_id),
+                history,
+            )
+            record(
+                "recommend_user_budget",
+                lambda: recommender.recommend(user_id=user_id, deadline=Deadline(0.05)),
+                history,
+            )
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return (key, baseline ms, current ms) for every regression"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        before, after = previous["median_ms"], current["median_ms"]
+        if after > before * (1 + threshold) and after - before > min_delta_ms:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recommender hot paths")
+    parser.add_argument("--sizes", default="1k,100k,1m", help=f"Catalog sizes from {sorted(SIZES)}")
+    parser.add_argument("--histories", default="0,10,1000", help=f"User like counts from {sorted(HISTORY_USERS)}")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to spend per benchmark")
+    parser.add_argument("--max-rounds", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument(
+        "--ci",
+        action="store_true",
+        default=bool(os.environ.get("CI")),
+        help="Fail when there is no baseline to compare against",
+    )
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown ratio (0.25 = 25%%)")
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.05,
+        help="Ignore regressions smaller than this, to filter timer noise",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    histories = [int(h) for h in args.histories.split(",")]
+
+    results = {}
+    for size_label in args.sizes.split(","):
+        run_catalog(size_label, SIZES[size_label.lower()], histories, args, results)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 2 if args.ci else 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for key, before, after in regressions:
+        print(f"❌ {key}: {before:.3f} ms -> {after:.3f} ms ({after / before:.2f}x)")
+    if regressions:
+        return 1
+
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+End-to-end HTTP load generator for the Django API
+
+Replays a weighted mix of real API calls against a running server
+(`manage.py runserver`, gunicorn, uvicorn, ...). Standard library only.
+
+Endpoints in the mix:
+    list            GET  /api/artworks/?page=N
+    detail          GET  /api/artworks/<id>/
+    recommend       POST /api/recommendations/ (anonymous, artwork_id)
+    recommend_auth  POST /api/recommendations/ (token, artwork_id + user_id)
+    like            POST /api/users/profile/like_artwork/ then
+                    DELETE /api/users/profile/unlike_artwork/ on the next call
+
+Authenticated traffic uses tokens from users created through
+UserRegistrationView at startup.
+
+Closed loop (default): --concurrency workers send requests back to back.
+Open loop (--rate): requests are scheduled at a fixed arrival rate and
+latency is measured from the scheduled time, so queueing delay is counted
+instead of hidden (no coordinated omission).
+
+Usage:
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --duration 30
+    python -m benchmarks.loadtest --rate 200 --concurrency 64 \\
+        --mix list=50,detail=30,recommend=10,recommend_auth=5,like=5
+"""
+
+import argparse
+import http.client
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "list=40,detail=30,recommend=15,recommend_auth=10,like=5"
+
+
+class APIClient:
+    """
+    HTTP connection to the API, one per worker thread
+
+    Connections are closed after each response unless keepalive is set:
+    runserver's separate header/body writes interact with delayed ACKs on
+    reused connections and add ~40 ms per request that production servers
+    do not have.
+    """
+
+    def __init__(self, base_url, timeout, keepalive=False):
+        self.keepalive = keepalive
+        parts = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if token:
+            headers["Authorization"] = f"Token {token}"
+
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            self.connection.close()
+            raise
+        if not self.keepalive:
+            self.connection.close()
+        return response.status, data
+
+
+class TrafficMix:
+    """Builds the next request for each endpoint in a weighted mix"""
+
+    def __init__(self, mix, n_artworks, tokens, n_utility_users):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.n_artworks = max(n_artworks, 1)
+        self.tokens = tokens
+        self.n_utility_users = n_utility_users
+        self._liked = {}  # token -> artwork liked by the previous call
+        self._lock = threading.Lock()
+
+    def pick(self, rng):
+        return rng.choices(self.names, weights=self.weights)[0]
+
+    def build(self, name, rng):
+        """Return (method, path, body, token) for an endpoint"""
+        artwork_id = rng.randrange(self.n_artworks)
+
+        if name == "list":
+            page = rng.randrange(max(self.n_artworks // 20, 1)) + 1
+            return "GET", f"/api/artworks/?page={page}&page_size=20", None, None
+
+        if name == "detail":
+            return "GET", f"/api/artworks/{artwork_id}/", None, None
+
+        if name == "recommend":
+            return "POST", "/api/recommendations/", {"artwork_id": artwork_id}, None
+
+        token = rng.choice(self.tokens)
+        if name == "recommend_auth":
+            body = {"artwork_id": artwork_id, "user_id": rng.randrange(self.n_utility_users)}
+            return "POST", "/api/recommendations/", body, token
+
+        if name == "like":
+            with self._lock:
+                liked = self._liked.pop(token, None)
+                if liked is None:
+                    self._liked[token] = artwork_id
+            if liked is None:
+                return "POST", "/api/users/profile/like_artwork/", {"artwork_id": artwork_id}, token
+            return "DELETE", "/api/users/profile/unlike_artwork/", {"artwork_id": liked}, token
+
+        raise ValueError(f"Unknown endpoint in mix: {name}")
+
+
+class Stats:
+    """Thread-safe latency samples per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, latency, status):
+        with self._lock:
+            self.latencies[name].append(latency)
+            self.statuses[name][status] += 1
+            if status is None or status >= 400:
+                self.errors[name] += 1
+
+    def report(self, elapsed):
+        def summarize(samples, errors):
+            ordered = sorted(samples)
+
+            def percentile(p):
+                if not ordered:
+                    return None
+                return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+            return {
+                "requests": len(ordered),
+                "errors": errors,
+                "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(0.50),
+                "p90_ms": percentile(0.90),
+                "p99_ms": percentile(0.99),
+                "max_ms": ordered[-1] * 1000 if ordered else None,
+            }
+
+        with self._lock:
+            endpoints = {
+                name: dict(
+                    summarize(samples, self.errors[name]),
+                    statuses={str(k): v for k, v in self.statuses[name].items()},
+                )
+                for name, samples in sorted(self.latencies.items())
+            }
+            all_samples = [s for samples in self.latencies.values() for s in samples]
+            overall = summarize(all_samples, sum(self.errors.values()))
+        return {"elapsed_s": elapsed, "overall": overall, "endpoints": endpoints}
+
+
+def execute(client, mix, name, rng, stats, started_at):
+    method, path, body, token = mix.build(name, rng)
+    try:
+        status, _ = client.request(method, path, body, token)
+    except (OSError, http.client.HTTPException):
+        status = None
+    stats.record(name, time.perf_counter() - started_at, status)
+
+
+def run_closed_loop(args, mix, stats, deadline):
+    def worker(seed):
+        rng = random.Random(seed)
+        client = APIClient(args.url, args.timeout, args.keepalive)
+        while time.perf_counter() < deadline:
+            execute(client, mix, mix.pick(rng), rng, stats, time.perf_counter())
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(args, mix, stats, deadline):
+    """Dispatch at a fixed rate; latency counts time spent waiting for a worker"""
+    scheduled = queue.Queue()
+    interval = 1.0 / args.rate
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = APIClient(args.url, args.timeout, args.keepalive)
+        while True:
+            item = scheduled.get()
+            if item is None:
+                return
+            name, scheduled_at = item
+            execute(client, mix, name, rng, stats, scheduled_at)
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    rng = random.Random(args.seed)
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        scheduled.put((mix.pick(rng), next_at))
+        next_at += interval
+
+    for _ in threads:
+        scheduled.put(None)
+    for thread in threads:
+        thread.join()
+    backlog = scheduled.qsize()
+    if backlog:
+        print(f"⚠️ {backlog} scheduled requests were still queued at the end")
+
+
+def register_users(args, count):
+    """Create load-test users through the registration endpoint and return their tokens"""
+    client = APIClient(args.url, args.timeout)
+    run_id = uuid.uuid4().hex[:8]
+    tokens = []
+    for i in range(count):
+        password = f"Load-{run_id}-pass"
+        body = {
+            "username": f"loadtest_{run_id}_{i}",
+            "email": f"loadtest_{run_id}_{i}@example.com",
+            "password": password,
+            "password_confirm": password,
+        }
+        status, data = client.request("POST", "/api/users/register/", body)
+        if status != 201:
+            raise SystemExit(f"Registration failed ({status}): {data[:200]!r}")
+        tokens.append(json.loads(data)["token"])
+    return tokens
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test for the artwork API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=16, help="Worker threads (max in-flight requests)")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in requests/second")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=10, help="Users to register for authenticated traffic")
+    parser.add_argument("--utility-users", type=int, default=50, help="user_id range for recommend_auth")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--keepalive", action="store_true", help="Reuse connections between requests")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds of untimed traffic first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mix_weights = parse_mix(args.mix)
+
+    client = APIClient(args.url, args.timeout)
+    status, data = client.request("GET", "/api/artworks/?page_size=1")
+    if status != 200:
+        raise SystemExit(f"Server not ready ({status}): {data[:200]!r}")
+    n_artworks = json.loads(data)["total"]
+
+    needs_tokens = any(name in mix_weights for name in ("recommend_auth", "like"))
+    tokens = register_users(args, args.users) if needs_tokens else []
+    mix = TrafficMix(mix_weights, n_artworks, tokens, args.utility_users)
+
+    run = run_open_loop if args.rate else run_closed_loop
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else f"closed loop x{args.concurrency}"
+
+    if args.warmup:
+        run(args, mix, Stats(), time.perf_counter() + args.warmup)
+
+    print(f"Running {mode} for {args.duration:g}s against {args.url} ({n_artworks:,} artworks)")
+    stats = Stats()
+    started = time.perf_counter()
+    run(args, mix, stats, started + args.duration)
+    report = stats.report(time.perf_counter() - started)
+    report["mode"] = mode
+
+    header = f"{'endpoint':<16}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in list(report["endpoints"].items()) + [("overall", report["overall"])]:
+        print(
+            f"{name:<16}{row['requests']:>8}{row['errors']:>6}{row['throughput_rps']:>9.1f}"
+            + "".join(
+                f"{row[key]:>10.1f}" if row[key] is not None else f"{'-':>10}"
+                for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms")
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
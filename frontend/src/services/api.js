@@ -92,6 +92,13 @@ class ApiService {
   }
 
   logout() {
+    if (this.token) {
+      // Revoke the token server-side; the local session ends regardless
+      fetch(`${API_BASE_URL}/users/logout/`, {
+        method: "POST",
+        headers: this.getHeaders(),
+      }).catch(() => {});
+    }
     this.token = null;
     localStorage.removeItem("token");
     localStorage.removeItem("user");
@@ -150,6 +157,14 @@ class ApiService {
     return this.handleResponse(response);
   }
 
+  async searchArtworks(query, page = 1, pageSize = 20) {
+    const params = new URLSearchParams({ q: query, page, page_size: pageSize });
+    const response = await fetch(`${API_BASE_URL}/search?${params}`, {
+      headers: this.getHeaders(false),
+    });
+    return this.handleResponse(response);
+  }
+
   async getArtworkDetail(artworkId) {
     const response = await fetch(`${API_BASE_URL}/artworks/${artworkId}/`, {
       headers: this.getHeaders(false),
@@ -157,6 +172,15 @@ class ApiService {
     return this.handleResponse(response);
   }
 
+  async getArtworksByIds(artworkIds, fields = null) {
+    const response = await fetch(`${API_BASE_URL}/artworks/`, {
+      method: "POST",
+      headers: this.getHeaders(false),
+      body: JSON.stringify(fields ? { ids: artworkIds, fields } : { ids: artworkIds }),
+    });
+    return this.handleResponse(response);
+  }
+
   async getArtworkImage(artworkId) {
     const response = await fetch(
       `${API_BASE_URL}/artworks/${artworkId}/image/`,
@@ -183,7 +207,7 @@ class ApiService {
 
   async getModelStats() {
     const response = await fetch(`${API_BASE_URL}/model-stats/`, {
-      headers: this.getHeaders(false),
+      headers: this.getHeaders(),
     });
     return this.handleResponse(response);
   }
@@ -0,0 +1,307 @@
+"""
+Synthetic user-artwork interactions at load-test scale
+
+A vectorized replacement for the notebook's generate_utility_matrix. It
+generates millions of users and interactions in user blocks, so memory is
+bounded by the block size (and, for --format npz, by 9 bytes per interaction).
+
+Model:
+    - artwork popularity follows a Zipf law over a random ranking
+    - each user belongs to one of --clusters taste clusters; a cluster
+      prefers a few artists, styles and genres
+    - a --taste-rate share of each user's interactions comes from artworks
+      matching their cluster, the rest from global popularity
+    - likes are more likely on matching artworks, calibrated so the overall
+      like rate equals --like-rate
+
+Usage:
+    python -m pipeline.synthetic_interactions --users 1000000 --output big/utility_matrix.csv
+    python -m pipeline.synthetic_interactions --users 5000 --format npz \\
+        --output models/utility_matrix.npz --fixtures likes.json
+
+ArtworkLike fixture rows carry no primary key, so `loaddata` inserts them
+next to existing likes instead of overwriting rows with the same pk. Loading
+bypasses the like counters: run `manage.py rebuild_like_counts` afterwards.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MODELS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"
+)
+
+CHARACTERISTICS = ("artist", "style", "genre")
+
+
+class Catalog:
+    """Artwork attributes as integer-coded numpy arrays"""
+
+    def __init__(self, metadata):
+        self.ids = np.array([artwork["id"] for artwork in metadata], dtype=np.int64)
+        self.labels = {}
+        self.codes = {}
+        for name in CHARACTERISTICS:
+            labels, codes = np.unique(
+                np.array([str(artwork[name]) for artwork in metadata]), return_inverse=True
+            )
+            self.labels[name] = labels
+            self.codes[name] = codes.astype(np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def zipf_popularity(n_items, exponent, rng):
+    """Item sampling weights proportional to 1 / rank^exponent"""
+    ranks = rng.permutation(n_items) + 1
+    weights = 1.0 / np.power(ranks, exponent)
+    return weights / weights.sum()
+
+
+def build_clusters(catalog, n_clusters, popularity, rng, per_attribute=(3, 2, 2)):
+    """
+    Pick preferred artists/styles/genres per cluster and precompute the
+    popularity-weighted CDF over each cluster's matching artworks
+    """
+    clusters = []
+    for _ in range(n_clusters):
+        match = np.zeros(len(catalog), dtype=bool)
+        for name, count in zip(CHARACTERISTICS, per_attribute):
+            n_labels = len(catalog.labels[name])
+            chosen = rng.choice(n_labels, size=min(count, n_labels), replace=False)
+            match |= np.isin(catalog.codes[name], chosen)
+
+        items = np.flatnonzero(match)
+        if len(items) == 0:
+            items = np.arange(len(catalog))
+        cdf = np.cumsum(popularity[items])
+        clusters.append({"items": items, "cdf": cdf / cdf[-1], "match": match})
+    return clusters
+
+
+def sample_from_cdf(cdf, size, rng):
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), len(cdf) - 1)
+
+
+def generate_block(user_ids, user_clusters, interactions_per_user, catalog, clusters, global_cdf, args, rng):
+    """Generate deduplicated interactions for one block of users"""
+    users = np.repeat(user_ids, interactions_per_user)
+    cluster_of = np.repeat(user_clusters, interactions_per_user)
+    items = np.empty(len(users), dtype=np.int64)
+
+    from_taste = rng.random(len(users)) < args.taste_rate
+    popular = ~from_taste
+    items[popular] = sample_from_cdf(global_cdf, int(popular.sum()), rng)
+
+    for k, cluster in enumerate(clusters):
+        mask = from_taste & (cluster_of == k)
+        n = int(mask.sum())
+        if n:
+            items[mask] = cluster["items"][sample_from_cdf(cluster["cdf"], n, rng)]
+
+    # One interaction per (user, artwork)
+    pair_keys = np.unique(users * len(catalog) + items)
+    users = pair_keys // len(catalog)
+    items = pair_keys % len(catalog)
+
+    cluster_of = user_clusters[np.searchsorted(user_ids, users)]
+    matches = np.zeros(len(items), dtype=bool)
+    for k, cluster in enumerate(clusters):
+        mask = cluster_of == k
+        matches[mask] = cluster["match"][items[mask]]
+
+    # Calibrate so the block's expected like rate equals --like-rate
+    match_share = matches.mean() if len(matches) else 0.0
+    p_match = min(args.like_rate * args.taste_lift, 0.99, args.like_rate / max(match_share, 1e-9))
+    p_other = (args.like_rate - match_share * p_match) / max(1 - match_share, 1e-9)
+    p_other = float(np.clip(p_other, 0.0, 1.0))
+    ratings = rng.random(len(items)) < np.where(matches, p_match, p_other)
+
+    return users.astype(np.int64), items, ratings.astype(np.int8)
+
+
+class FixtureWriter:
+    """
+    Stream Django fixtures for synthetic users and their ArtworkLike rows
+    (likes without pks, so loading never overwrites existing ones)
+    """
+
+    def __init__(self, path, user_pk_offset, max_users):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write("[")
+        self.first = True
+        self.user_pk_offset = user_pk_offset
+        self.max_users = max_users
+        self.timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    def _write(self, obj):
+        self.file.write("\n" if self.first else ",\n")
+        self.file.write(json.dumps(obj))
+        self.first = False
+
+    def write_block(self, user_ids, users, items, ratings, catalog):
+        selected_users = user_ids[user_ids < self.max_users]
+        for user_id in selected_users.tolist():
+            self._write(
+                {
+                    "model": "users.user",
+                    "pk": user_id + self.user_pk_offset,
+                    "fields": {
+                        "username": f"synthetic_user_{user_id}",
+                        "password": "!",  # Unusable password
+                        "date_joined": self.timestamp,
+                        "created_at": self.timestamp,
+                        "updated_at": self.timestamp,
+                    },
+                }
+            )
+
+        liked = (ratings == 1) & (users < self.max_users)
+        for user_id, item in zip(users[liked].tolist(), items[liked].tolist()):
+            self._write(
+                {
+                    "model": "users.artworklike",
+                    "fields": {
+                        "user": user_id + self.user_pk_offset,
+                        "artwork_id": int(catalog.ids[item]),
+                        "liked_at": self.timestamp,
+                    },
+                }
+            )
+
+    def close(self):
+        self.file.write("\n]\n")
+        self.file.close()
+
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    with open(args.metadata, "r") as f:
+        catalog = Catalog(json.load(f))
+
+    popularity = zipf_popularity(len(catalog), args.zipf, rng)
+    global_cdf = np.cumsum(popularity)
+    clusters = build_clusters(catalog, args.clusters, popularity, rng)
+
+    user_clusters = rng.integers(0, args.clusters, size=args.users).astype(np.int32)
+    interactions_per_user = np.minimum(
+        1 + rng.poisson(max(args.mean_interactions - 1, 0), size=args.users),
+        len(catalog),
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    fixtures = (
+        FixtureWriter(args.fixtures, args.fixture_user_offset, args.fixture_users)
+        if args.fixtures
+        else None
+    )
+
+    started = time.perf_counter()
+    n_interactions = 0
+    n_likes = 0
+    binary_columns = {"user_id": [], "artwork_id": [], "rating": []}
+
+    for block_start in range(0, args.users, args.block_users):
+        block_end = min(block_start + args.block_users, args.users)
+        user_ids = np.arange(block_start, block_end, dtype=np.int64)
+
+        users, items, ratings = generate_block(
+            user_ids,
+            user_clusters[block_start:block_end],
+            interactions_per_user[block_start:block_end],
+            catalog,
+            clusters,
+            global_cdf,
+            args,
+            rng,
+        )
+
+        if args.format == "csv":
+            frame = pd.DataFrame(
+                {
+                    "user_id": users,
+                    "artwork_id": catalog.ids[items],
+                    "rating": ratings,
+                    "artist": catalog.labels["artist"][catalog.codes["artist"][items]],
+                    "style": catalog.labels["style"][catalog.codes["style"][items]],
+                    "genre": catalog.labels["genre"][catalog.codes["genre"][items]],
+                }
+            )
+            frame.to_csv(args.output, mode="w" if block_start == 0 else "a", header=block_start == 0, index=False)
+        else:
+            binary_columns["user_id"].append(users.astype(np.int32))
+            binary_columns["artwork_id"].append(catalog.ids[items].astype(np.int32))
+            binary_columns["rating"].append(ratings)
+
+        if fixtures is not None:
+            fixtures.write_block(user_ids, users, items, ratings, catalog)
+
+        n_interactions += len(users)
+        n_likes += int(ratings.sum())
+        elapsed = time.perf_counter() - started
+        print(
+            f"Users {block_end:,}/{args.users:,}: {n_interactions:,} interactions "
+            f"({n_interactions / elapsed:,.0f}/s)",
+            flush=True,
+        )
+
+    if args.format == "npz":
+        np.savez(
+            args.output,
+            **{name: np.concatenate(chunks) for name, chunks in binary_columns.items()},
+        )
+    if fixtures is not None:
+        fixtures.close()
+
+    summary = {
+        "users": args.users,
+        "interactions": n_interactions,
+        "like_rate": n_likes / max(n_interactions, 1),
+        "zipf_exponent": args.zipf,
+        "clusters": args.clusters,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"✅ {json.dumps(summary)}")
+    if fixtures is not None:
+        print(
+            f"⚠️ After 'manage.py loaddata {args.fixtures}', run "
+            f"'manage.py rebuild_like_counts' (workers stopped): loaddata does not "
+            f"update the ArtworkLikeCount counters"
+        )
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic utility matrix")
+    parser.add_argument("--metadata", default=os.path.join(DEFAULT_MODELS_PATH, "metadata.json"))
+    parser.add_argument("--output", required=True, help="Output file, e.g. models/utility_matrix.csv or .npz")
+    parser.add_argument("--format", choices=["csv", "npz"], default="csv")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--mean-interactions", type=float, default=12, help="Mean interactions per user, before removing repeats")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Popularity skew exponent")
+    parser.add_argument("--clusters", type=int, default=20, help="Number of taste clusters")
+    parser.add_argument("--taste-rate", type=float, default=0.7, help="Share of interactions drawn from the user's cluster")
+    parser.add_argument("--like-rate", type=float, default=0.55, help="Overall share of interactions that are likes")
+    parser.add_argument("--taste-lift", type=float, default=1.4, help="Like-probability multiplier for matching artworks")
+    parser.add_argument("--block-users", type=int, default=50_000, help="Users generated per block")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures", default=None, help="Also write a Django fixture with users and ArtworkLike rows")
+    parser.add_argument("--fixture-users", type=int, default=1000, help="Only include the first N users in fixtures")
+    parser.add_argument("--fixture-user-offset", type=int, default=100_000, help="Added to synthetic user ids to form User primary keys")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    generate(parse_args(argv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,420 @@
-from datasets import load_dataset
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
+"""
+Streaming training pipeline for the artwork recommender
+
+Reads an artwork dump in chunks, builds TF-IDF features incrementally and
+writes the model bundle loaded by ArtworkRecommender:
+
+    models/vectorizer.pkl
+    models/tfidf_matrix.npz
+    models/metadata.json
+    models/model_info.json
+
+Only the sparse term-count matrix (a few non-zeros per artwork) is kept in
+memory; records and feature strings are dropped after each chunk and the
+catalog metadata is streamed straight to disk.
+
+Usage:
+    python -m pipeline.training_script --input artworks.jsonl --output models
+    python -m pipeline.training_script --input huggingface --max-items 10000
+    python -m pipeline.training_script --input dump.parquet --vectorizer hashing
+"""
+
+import argparse
+import json
+import os
 import pickle
+import sys
+import time
+
 import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, diags, save_npz, vstack
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer,
+)
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import normalize
+
+# Same analyzer settings as the notebook's TfidfVectorizer
+TOKEN_PATTERN = r"\b\w+\b"
+
+CHARACTERISTICS = ("artist", "style", "genre")
 
 
 def load_wikiart_dataset():
+    from datasets import load_dataset
+
     dataset = load_dataset("huggan/wikiart", streaming=True, split="train")
     return dataset
+
+
+def iter_record_chunks(source, chunk_size, fmt="auto"):
+    """
+    Yield lists of artwork records (dicts) from a local dump or the
+    Hugging Face stream, never holding more than one chunk
+    """
+    if fmt == "auto":
+        if source == "huggingface":
+            fmt = "huggingface"
+        else:
+            fmt = os.path.splitext(source)[1].lstrip(".").lower()
+
+    if fmt == "huggingface":
+        chunk = []
+        for item in load_wikiart_dataset():
+            # Drop the decoded image, only the labels are needed
+            chunk.append({k: item.get(k) for k in CHARACTERISTICS})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    elif fmt in ("jsonl", "ndjson"):
+        with open(source, "r", encoding="utf-8") as f:
+            chunk = []
+            for line in f:
+                if line.strip():
+                    chunk.append(json.loads(line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    elif fmt == "metadata":
+        # An existing metadata.json catalog, as used for compaction
+        with open(source, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+        for start in range(0, len(catalog), chunk_size):
+            yield [
+                {name: (None if artwork[name] == "Unknown" else artwork[name]) for name in CHARACTERISTICS}
+                for artwork in catalog[start : start + chunk_size]
+            ]
+
+    elif fmt == "csv":
+        for frame in pd.read_csv(source, chunksize=chunk_size, dtype=str):
+            yield frame.to_dict("records")
+
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet dumps requires pyarrow (pip install pyarrow)")
+
+        parquet_file = pq.ParquetFile(source)
+        columns = [c for c in parquet_file.schema_arrow.names if c.lower() in CHARACTERISTICS]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pylist()
+
+    else:
+        raise SystemExit(f"Unsupported input format: {fmt!r}")
+
+
+def extract_characteristic(item, name):
+    """Read one characteristic, accepting the casings seen in WikiArt dumps"""
+    for field in (name, name.title(), name.upper()):
+        value = item.get(field)
+        if value is not None and str(value).strip().lower() not in ("none", "null", "", "nan"):
+            return str(value).strip()
+    return None
+
+
+def build_artwork(item, artwork_id):
+    """Return (metadata entry, feature text) for one record, as in the notebook"""
+    values = {name: extract_characteristic(item, name) for name in CHARACTERISTICS}
+
+    features = [
+        f"{name}_{value.replace(' ', '_').replace('-', '_')}"
+        for name, value in values.items()
+        if value
+    ]
+    text_feature = " ".join(features) if features else f"artwork_id_{artwork_id} category_general"
+
+    metadata = {
+        "id": artwork_id,
+        "artist": values["artist"] or "Unknown",
+        "style": values["style"] or "Unknown",
+        "genre": values["genre"] or "Unknown",
+        "likes": 0,
+    }
+    return metadata, text_feature
+
+
+class IncrementalTermCounter:
+    """
+    Term-count matrices built chunk by chunk
+
+    The "tfidf" mode grows an explicit vocabulary; the "hashing" mode maps
+    terms to a fixed number of hashed columns and keeps no vocabulary.
+    """
+
+    def __init__(self, mode="tfidf", n_features=2**18):
+        self.mode = mode
+        self.n_features = n_features
+        self.vocabulary = {}
+        self.analyzer = TfidfVectorizer(
+            lowercase=True, token_pattern=TOKEN_PATTERN
+        ).build_analyzer()
+        self.hasher = HashingVectorizer(
+            n_features=n_features,
+            lowercase=True,
+            token_pattern=TOKEN_PATTERN,
+            alternate_sign=False,
+            norm=None,
+        )
+
+    def transform_chunk(self, texts):
+        if self.mode == "hashing":
+            return self.hasher.transform(texts).tocsr()
+
+        indptr = [0]
+        indices = []
+        for text in texts:
+            for token in self.analyzer(text):
+                indices.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.float64)
+        # Columns beyond the current vocabulary are added by later chunks,
+        # so each chunk is padded to the final width in fit_tfidf()
+        counts = csr_matrix(
+            (data, indices, indptr), shape=(len(texts), max(len(self.vocabulary), 1))
+        )
+        counts.sum_duplicates()
+        return counts
+
+
+def fit_tfidf(count_chunks, counter, max_df=0.99, max_features=1000):
+    """
+    Turn per-chunk term counts into the final TF-IDF matrix and a fitted
+    vectorizer that can transform new artworks the same way
+    """
+    if counter.mode == "hashing":
+        n_columns = counter.n_features
+    else:
+        n_columns = max(len(counter.vocabulary), 1)
+
+    counts = vstack(
+        [chunk if chunk.shape[1] == n_columns else _pad_columns(chunk, n_columns) for chunk in count_chunks],
+        format="csr",
+    )
+    n_documents = counts.shape[0]
+    document_frequency = np.bincount(counts.indices, minlength=n_columns)
+
+    if counter.mode == "hashing":
+        vectorizer = make_pipeline(counter.hasher, TfidfTransformer())
+        transformer = vectorizer[-1]
+    else:
+        # Apply the notebook's max_df / max_features pruning on the full counts
+        keep = (document_frequency > 0) & (document_frequency <= max_df * n_documents)
+        kept_columns = np.flatnonzero(keep)
+        if max_features and len(kept_columns) > max_features:
+            order = np.argsort(-document_frequency[kept_columns], kind="stable")
+            kept_columns = np.sort(kept_columns[order[:max_features]])
+
+        kept = set(kept_columns.tolist())
+        terms = sorted(term for term, column in counter.vocabulary.items() if column in kept)
+        old_columns = np.array([counter.vocabulary[term] for term in terms], dtype=np.int64)
+        counts = counts[:, old_columns]
+        document_frequency = document_frequency[old_columns]
+
+        vectorizer = TfidfVectorizer(
+            vocabulary={term: i for i, term in enumerate(terms)},
+            lowercase=True,
+            token_pattern=TOKEN_PATTERN,
+        )
+        transformer = vectorizer
+
+    # smooth_idf=True, as TfidfVectorizer computes it
+    idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    transformer.idf_ = idf
+
+    tfidf_matrix = normalize(counts @ diags(idf), norm="l2", copy=False).tocsr()
+    return vectorizer, tfidf_matrix
+
+
+def _pad_columns(matrix, n_columns):
+    matrix = matrix.tocsr()
+    return csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_columns))
+
+
+class MetadataWriter:
+    """Stream metadata entries to a JSON array file"""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write("[")
+        self.count = 0
+
+    def write_many(self, entries):
+        for entry in entries:
+            self.file.write(",\n  " if self.count else "\n  ")
+            self.file.write(json.dumps(entry))
+            self.count += 1
+
+    def close(self):
+        self.file.write("\n]\n")
+        self.file.close()
+
+
+def train(args):
+    os.makedirs(args.output, exist_ok=True)
+    staged = {}
+
+    def staging_path(filename):
+        # Keep the real extension: save_npz appends ".npz" otherwise
+        staged[filename] = os.path.join(args.output, f".partial-{filename}")
+        return staged[filename]
+
+    counter = IncrementalTermCounter(args.vectorizer, args.n_features)
+    metadata_writer = MetadataWriter(staging_path("metadata.json"))
+    count_chunks = []
+    unique = {name: set() for name in CHARACTERISTICS}
+
+    started = time.perf_counter()
+    n_artworks = 0
+    try:
+        for records in iter_record_chunks(args.input, args.chunk_size, args.format):
+            if args.max_items is not None:
+                records = records[: max(args.max_items - n_artworks, 0)]
+            if not records:
+                break
+
+            entries = []
+            texts = []
+            for offset, item in enumerate(records):
+                entry, text = build_artwork(item, n_artworks + offset)
+                entries.append(entry)
+                texts.append(text)
+                for name in CHARACTERISTICS:
+                    if entry[name] != "Unknown":
+                        unique[name].add(entry[name])
+
+            count_chunks.append(counter.transform_chunk(texts))
+            metadata_writer.write_many(entries)
+            n_artworks += len(records)
+
+            elapsed = time.perf_counter() - started
+            print(
+                f"Processed {n_artworks:,} artworks "
+                f"({n_artworks / elapsed:,.0f}/s, {elapsed:.1f}s elapsed)",
+                flush=True,
+            )
+    finally:
+        metadata_writer.close()
+
+    if n_artworks == 0:
+        raise SystemExit("No artworks found in input")
+
+    print("Computing IDF weights and normalizing...")
+    vectorizer, tfidf_matrix = fit_tfidf(
+        count_chunks, counter, max_df=args.max_df, max_features=args.max_features
+    )
+    del count_chunks
+
+    save_npz(staging_path("tfidf_matrix.npz"), tfidf_matrix)
+    with open(staging_path("vectorizer.pkl"), "wb") as f:
+        pickle.dump(vectorizer, f)
+
+    model_info = build_model_info(args, n_artworks, tfidf_matrix, vectorizer, unique)
+    with open(staging_path("model_info.json"), "w") as f:
+        json.dump(model_info, f, indent=2)
+
+    # Swap the whole bundle in only once every file is complete
+    for filename, partial_path in staged.items():
+        os.replace(partial_path, os.path.join(args.output, filename))
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Wrote {n_artworks:,} artworks x {tfidf_matrix.shape[1]:,} features "
+        f"to {args.output} in {elapsed:.1f}s ({n_artworks / elapsed:,.0f} artworks/s)"
+    )
+    return model_info
+
+
+def build_model_info(args, n_artworks, tfidf_matrix, vectorizer, unique):
+    """model_info.json in the notebook's format, keeping existing project fields"""
+    model_info = {}
+    existing_path = os.path.join(args.output, "model_info.json")
+    if os.path.exists(existing_path):
+        with open(existing_path, "r") as f:
+            previous = json.load(f)
+        for key in ("project_title", "student", "rating_pattern"):
+            if key in previous:
+                model_info[key] = previous[key]
+
+    vocabulary_size = (
+        len(vectorizer.vocabulary) if args.vectorizer == "tfidf" else int(tfidf_matrix.shape[1])
+    )
+    model_info.update(
+        {
+            "n_artworks": n_artworks,
+            "n_features": int(tfidf_matrix.shape[1]),
+            "vocabulary_size": vocabulary_size,
+            "unique_artists": len(unique["artist"]),
+            "unique_genres": len(unique["genre"]),
+            "unique_styles": len(unique["style"]),
+            "model_version": args.model_version,
+            "characteristics": {"1": "artist", "2": "style", "3": "genre"},
+            "algorithm": "TF-IDF + Cosine Similarity",
+            "vectorizer": args.vectorizer,
+        }
+    )
+    model_info.setdefault("rating_pattern", "[0,1] - Binary Like/Dislike")
+    return model_info
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the artwork recommender from an artwork dump")
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="JSONL/CSV/Parquet dump with artist, style and genre columns, or 'huggingface'",
+    )
+    parser.add_argument(
+        "--format",
+        default="auto",
+        choices=["auto", "jsonl", "ndjson", "csv", "parquet", "huggingface", "metadata"],
+        help="Input format (default: from file extension)",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"),
+        help="Directory for the model bundle (default: models/)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Records per chunk")
+    parser.add_argument("--max-items", type=int, default=None, help="Stop after this many artworks")
+    parser.add_argument(
+        "--vectorizer",
+        choices=["tfidf", "hashing"],
+        default="tfidf",
+        help="'hashing' keeps no vocabulary in memory (default: tfidf)",
+    )
+    parser.add_argument(
+        "--n-features",
+        type=int,
+        default=2**18,
+        help="Hashed feature columns for --vectorizer hashing",
+    )
+    parser.add_argument("--max-df", type=float, default=0.99, help="Drop terms in more than this fraction of artworks")
+    parser.add_argument(
+        "--max-features",
+        type=int,
+        default=1000,
+        help="Keep only the most frequent terms (0 for no limit)",
+    )
+    parser.add_argument("--model-version", default="1.0", help="Version recorded in model_info.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    train(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
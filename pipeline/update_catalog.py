@@ -0,0 +1,226 @@
+"""
+Incremental catalog updates for the artwork recommender
+
+`append` adds new artworks without refitting: the saved vectorizer
+transforms them with the current IDF weights, and their rows are appended
+to tfidf_matrix.npz, metadata.json, the enrichment store, the search index
+and the precomputed neighbor table. Running servers pick up the new bundle
+through the recommender's hot reload without rebuilding any of them.
+
+Terms that the saved vocabulary has never seen are ignored until the next
+`compact`, which refits IDF (and the vocabulary) over the whole catalog.
+model_info.json tracks how many artworks were appended since the last
+refit so compaction can be scheduled when drift matters.
+
+Usage:
+    python -m pipeline.update_catalog append --input new_artworks.jsonl
+    python -m pipeline.update_catalog compact
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from scipy.sparse import load_npz, save_npz, vstack
+
+from backend.ml_models.enrichment_store import ENRICHMENT_FILENAME, EnrichmentStore
+from backend.ml_models.model_loader import compute_model_version
+from backend.ml_models.neighbors import NEIGHBORS_FILENAME, NeighborTable
+from backend.ml_models.search_index import SEARCH_INDEX_FILENAME, SearchIndex
+from backend.ml_models.wikiart_api_client import WikiArtAPIClient
+from pipeline.training_script import build_artwork, iter_record_chunks, train
+
+DEFAULT_MODELS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"
+)
+
+
+def load_bundle(models_path):
+    """Load the vectorizer, matrix, catalog and model info from a bundle"""
+    with open(os.path.join(models_path, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    tfidf_matrix = load_npz(os.path.join(models_path, "tfidf_matrix.npz")).tocsr()
+    with open(os.path.join(models_path, "metadata.json"), "r") as f:
+        metadata = json.load(f)
+    with open(os.path.join(models_path, "model_info.json"), "r") as f:
+        model_info = json.load(f)
+    return vectorizer, tfidf_matrix, metadata, model_info
+
+
+def count_unknown_term_artworks(vectorizer, texts):
+    """Artworks with at least one term missing from a fitted vocabulary"""
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is None:
+        # Hashing pipelines map every term to a column
+        return 0
+    analyzer = vectorizer.build_analyzer()
+    return sum(
+        1 for text in texts if any(token not in vocabulary for token in analyzer(text))
+    )
+
+
+def _write_atomic(path, write):
+    partial_path = os.path.join(os.path.dirname(path), f".partial-{os.path.basename(path)}")
+    write(partial_path)
+    os.replace(partial_path, path)
+
+
+def append_artworks(models_path, source, chunk_size=10_000, fmt="auto"):
+    """Append artworks from a dump to an existing bundle; returns how many"""
+    started = time.perf_counter()
+    vectorizer, tfidf_matrix, metadata, model_info = load_bundle(models_path)
+
+    # Derived artifacts of the current version; stale ones are left to the
+    # loader to rebuild
+    previous_version = compute_model_version(models_path, model_info)
+    enrichment_path = os.path.join(models_path, ENRICHMENT_FILENAME)
+    store = EnrichmentStore.load(enrichment_path, previous_version)
+    search_index_path = os.path.join(models_path, SEARCH_INDEX_FILENAME)
+    search_index = SearchIndex.load(search_index_path, previous_version)
+    neighbors_path = os.path.join(models_path, NEIGHBORS_FILENAME)
+    neighbor_table = _load_neighbor_table(neighbors_path, previous_version)
+
+    next_id = metadata[-1]["id"] + 1 if metadata else 0
+    new_entries = []
+    new_rows = []
+    unknown_term_artworks = 0
+
+    for records in iter_record_chunks(source, chunk_size, fmt):
+        entries = []
+        texts = []
+        for item in records:
+            entry, text = build_artwork(item, next_id + len(new_entries) + len(entries))
+            entries.append(entry)
+            texts.append(text)
+
+        new_rows.append(vectorizer.transform(texts).tocsr())
+        unknown_term_artworks += count_unknown_term_artworks(vectorizer, texts)
+        new_entries.extend(entries)
+
+    if not new_entries:
+        print("No artworks to append")
+        return 0
+
+    first_row = len(metadata)
+    tfidf_matrix = vstack([tfidf_matrix] + new_rows, format="csr")
+    metadata.extend(new_entries)
+
+    _write_atomic(
+        os.path.join(models_path, "tfidf_matrix.npz"),
+        lambda path: save_npz(path, tfidf_matrix),
+    )
+    _write_atomic(
+        os.path.join(models_path, "metadata.json"),
+        lambda path: _dump_json(path, metadata),
+    )
+
+    # Extend the derived artifacts instead of rebuilding them on next load
+    model_version = compute_model_version(models_path, model_info)
+    client = WikiArtAPIClient()
+    if store is not None:
+        store.extend(new_entries, client, model_version)
+        store.save(enrichment_path)
+    if search_index is not None:
+        search_index.extend(new_entries, first_row, client, model_version, vectorizer)
+        search_index.save(search_index_path)
+    if neighbor_table is not None:
+        neighbor_table.extend(tfidf_matrix, first_row)
+        neighbor_table.save(neighbors_path, model_version)
+
+    model_info["n_artworks"] = len(metadata)
+    model_info["appended_since_refit"] = model_info.get("appended_since_refit", 0) + len(new_entries)
+    model_info["unknown_term_artworks_since_refit"] = (
+        model_info.get("unknown_term_artworks_since_refit", 0) + unknown_term_artworks
+    )
+    # Written last: servers reload when model_info.json changes
+    _write_atomic(
+        os.path.join(models_path, "model_info.json"),
+        lambda path: _dump_json(path, model_info, indent=2),
+    )
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Appended {len(new_entries):,} artworks (ids {next_id}-{metadata[-1]['id']}) "
+        f"in {elapsed:.2f}s; catalog now has {len(metadata):,} artworks"
+    )
+    if unknown_term_artworks:
+        print(
+            f"⚠️ {unknown_term_artworks} artworks use terms outside the saved vocabulary; "
+            f"run 'compact' to include them"
+        )
+    return len(new_entries)
+
+
+def compact(models_path, chunk_size=50_000, max_df=0.99, max_features=1000):
+    """Refit IDF and the vocabulary over the current catalog"""
+    vectorizer, _, _, model_info = load_bundle(models_path)
+
+    mode = model_info.get("vectorizer", "tfidf")
+    n_features = vectorizer[0].n_features if mode == "hashing" else 2**18
+
+    args = SimpleNamespace(
+        input=os.path.join(models_path, "metadata.json"),
+        format="metadata",
+        output=models_path,
+        chunk_size=chunk_size,
+        max_items=None,
+        vectorizer=mode,
+        n_features=n_features,
+        max_df=max_df,
+        max_features=max_features,
+        model_version=model_info.get("model_version", "1.0"),
+    )
+    return train(args)
+
+
+def _load_neighbor_table(path, model_version):
+    """The persisted neighbor table of a model version, whatever its k"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        k = int(data["k"])
+    return NeighborTable.load(path, model_version, k=k, max_entries=sys.maxsize)
+
+
+def _dump_json(path, payload, indent=None):
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=indent)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update the artwork catalog without a full retrain")
+    parser.add_argument("--models", default=DEFAULT_MODELS_PATH, help="Model bundle directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    append_parser = subparsers.add_parser("append", help="Append new artworks using the saved vectorizer")
+    append_parser.add_argument("--input", required=True, help="JSONL/CSV/Parquet dump of new artworks")
+    append_parser.add_argument(
+        "--format",
+        default="auto",
+        choices=["auto", "jsonl", "ndjson", "csv", "parquet"],
+    )
+    append_parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    compact_parser = subparsers.add_parser("compact", help="Refit IDF over the whole catalog")
+    compact_parser.add_argument("--chunk-size", type=int, default=50_000)
+    compact_parser.add_argument("--max-df", type=float, default=0.99)
+    compact_parser.add_argument("--max-features", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "append":
+        append_artworks(args.models, args.input, args.chunk_size, args.format)
+    else:
+        compact(args.models, args.chunk_size, args.max_df, args.max_features)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())